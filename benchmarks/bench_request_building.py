@@ -0,0 +1,44 @@
+"""
+Measures the client-side cost of building a request, with a transport that
+never touches the network.
+
+    python benchmarks/bench_request_building.py [iterations]
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from simplerelevance.api import SimpleRelevance
+from simplerelevance.transport import Response, Transport
+
+
+class NullTransport(Transport):
+    response = Response(200, 'OK', {}, '{}')
+
+    def request(self, method, url, body=None, headers=None, timeout=None):
+        return self.response
+
+
+CALLS = [
+    ('users', lambda c: c.users(user_email='user@example.com')),
+    ('items', lambda c: c.items(item_external_id=42, market='chicago')),
+    ('actions', lambda c: c.actions(user_guid=1, item_guid=2)),
+    ('attributes', lambda c: c.attributes(1, 3, attribute_name='color')),
+    ('user_delete', lambda c: c.user_delete(1)),
+    ('attribute_update', lambda c: c.attribute_update(1, 3, 4, 5, 'c', 'r')),
+    ('predictions', lambda c: c.predictions('user@example.com')),
+]
+
+
+def main(iterations=20000):
+    client = SimpleRelevance('key', 'business', transport=NullTransport())
+
+    for name, call in CALLS:
+        seconds = timeit.timeit(lambda: call(client), number=iterations)
+        print '%-20s %8.2f us/call' % (name, seconds / iterations * 1e6)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
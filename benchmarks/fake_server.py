@@ -0,0 +1,258 @@
+"""
+Local stand-in for the SimpleRelevance API, serving users/, items/,
+actions/ and attributes/ from memory, with optional latency and error
+injection.
+
+    python benchmarks/fake_server.py [--port 8000] [--latency 0.01]
+        [--jitter 0.005] [--error-rate 0.01]
+"""
+import BaseHTTPServer
+import SocketServer
+import argparse
+import itertools
+import json
+import random
+import threading
+import time
+import urlparse
+import zlib
+
+
+class FakeAPI(object):
+    def __init__(self):
+        self.users = {}
+        self.items = {}
+        self.actions = []
+        self.attributes = {}
+        self._guids = itertools.count(1)
+        self._lock = threading.RLock()
+
+    def guid(self):
+        with self._lock:
+            return next(self._guids)
+
+    def user(self, data):
+        email = data.get('email')
+        with self._lock:
+            for user in self.users.values():
+                if user['email'] == email:
+                    return user
+            user = {
+                'guid': self.guid(),
+                'email': email,
+                'external_id': data.get('user_id') or email,
+                'zipcode': data.get('zipcode'),
+            }
+            self.users[user['guid']] = user
+            return user
+
+    def item(self, data):
+        external_id = data.get('item_id') or data.get('item_name')
+        with self._lock:
+            guid = self.guid()
+            item = {
+                'guid': guid,
+                'name': data.get('item_name'),
+                'external_id': external_id,
+                'item_type': data.get('item_type'),
+                'purchases': {'1': {'item_guid': guid}},
+            }
+            self.items[guid] = item
+            return item
+
+    def find_items(self, query):
+        external_id = query.get('item_external_id')
+        if external_id is not None:
+            for item in self.items.values():
+                if str(item['external_id']) == external_id:
+                    return [item]
+            # Unknown items are created on the fly, so lookups always
+            # resolve, like a catalog that was uploaded beforehand.
+            return [self.item({'item_id': external_id})]
+
+        if 'item_guid' in query:
+            item = self.items.get(int(query['item_guid']))
+            return [item] if item else []
+
+        return self.items.values()
+
+    def find_users(self, query):
+        if 'user_email' in query:
+            return [self.user({'email': query['user_email']})]
+        if 'user_external_id' in query:
+            return [self.user({'email': query['user_external_id'],
+                               'user_id': query['user_external_id']})]
+        return self.users.values()
+
+
+def paginate(records, query):
+    if 'page' not in query:
+        return list(records)
+
+    size = int(query.get('page_size') or 100)
+    start = (int(query['page']) - 1) * size
+    return list(records)[start:start + size]
+
+
+class Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    wbufsize = -1
+
+    def setup(self):
+        # Idle keep-alive connections are closed after this long.
+        self.timeout = self.server.keep_alive
+        BaseHTTPServer.BaseHTTPRequestHandler.setup(self)
+
+    def log_message(self, format, *args):
+        pass
+
+    def respond(self, status, payload):
+        body = json.dumps(payload)
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        if ('gzip' in self.headers.get('Accept-Encoding', '') and
+                len(body) >= 1024):
+            compressor = zlib.compressobj(6, zlib.DEFLATED,
+                                          16 + zlib.MAX_WBITS)
+            body = compressor.compress(body) + compressor.flush()
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def handle_request(self):
+        server = self.server
+        if server.latency or server.jitter:
+            time.sleep(server.latency + random.uniform(0, server.jitter))
+
+        if server.error_rate and random.random() < server.error_rate:
+            return self.respond(503, {'error': 'injected failure'})
+
+        parts = urlparse.urlsplit(self.path)
+        endpoint = parts.path.rstrip('/').rsplit('/', 1)[-1]
+        query = dict(urlparse.parse_qsl(parts.query))
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length)
+        if self.headers.get('Content-Encoding') == 'gzip':
+            body = zlib.decompress(body, 16 + zlib.MAX_WBITS)
+        data = dict(urlparse.parse_qsl(body))
+
+        api = server.api
+        method = self.command
+
+        if endpoint == 'users':
+            if method == 'GET':
+                results = api.find_users(query)
+            elif method == 'POST':
+                results = [api.user(data)]
+            else:
+                api.users.pop(int(data.get('user_guid') or 0), None)
+                results = []
+        elif endpoint == 'items':
+            if method == 'GET' and 'email' in query:
+                results = list(api.items.values())[:10]
+            elif method == 'GET':
+                results = api.find_items(query)
+            elif method == 'POST':
+                results = [api.item(data)]
+            else:
+                api.items.pop(int(data.get('item_guid') or 0), None)
+                results = []
+        elif endpoint == 'actions':
+            if method == 'GET':
+                results = [
+                    a for a in api.actions
+                    if query.get('datetime_start', '') <= a['datetime'] and
+                    a['datetime'] <= query.get('datetime_end', '~')
+                ]
+            else:
+                data.setdefault('datetime',
+                                time.strftime('%Y-%m-%d %H:%M:%S'))
+                api.actions.append(data)
+                results = [data]
+        elif endpoint == 'attributes':
+            if method == 'GET':
+                results = [
+                    a for a in api.attributes.values()
+                    if all(str(a.get(k)) == query[k]
+                           for k in ('class_id', 'attribute_name')
+                           if k in query)
+                ]
+            elif method == 'PUT':
+                guid = int(data.get('guid') or api.guid())
+                api.attributes[guid] = dict(data, guid=guid)
+                results = [api.attributes[guid]]
+            else:
+                api.attributes.pop(int(data.get('guid') or 0), None)
+                results = []
+        else:
+            return self.respond(404, {'error': 'unknown endpoint'})
+
+        self.respond(200, {'results': paginate(results, query)})
+
+    do_GET = do_POST = do_PUT = do_DELETE = handle_request
+
+
+class FakeServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, port=0, latency=0.0, jitter=0.0, error_rate=0.0,
+                 keep_alive=None):
+        """
+        :param port: Port to listen on, 0 picks a free one.
+        :type port: int
+
+        :param latency: Seconds added to every response.
+        :type latency: float
+
+        :param jitter: Up to this many more seconds, at random.
+        :type jitter: float
+
+        :param error_rate: Share of requests answered with a 503.
+        :type error_rate: float
+
+        :param keep_alive: Seconds an idle connection is kept open, None
+         keeps it until the client closes it.
+        :type keep_alive: float
+        """
+        BaseHTTPServer.HTTPServer.__init__(self, ('127.0.0.1', port), Handler)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.keep_alive = keep_alive
+        self.api = FakeAPI()
+        self._thread = None
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:%d/api/v3/' % self.server_address[1]
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Local stand-in for the SimpleRelevance API.'
+    )
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = FakeServer(args.port, args.latency, args.jitter, args.error_rate)
+    print 'Serving on %s' % server.url
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
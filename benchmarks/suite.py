@@ -0,0 +1,194 @@
+"""
+Drives every public method of SimpleRelevance against the local fake
+server and reports requests per second, p50/p99 latency and memory, so
+client modes can be compared without touching the live API.
+
+    python benchmarks/suite.py [--calls 200] [--concurrency 4]
+        [--latency 0.005] [--error-rate 0.0] [--mode default]
+"""
+import argparse
+import os
+import resource
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from fake_server import FakeServer
+from simplerelevance.api import SimpleRelevance
+from simplerelevance.cache import GuidCache, PredictionCache
+from simplerelevance.constants.actiontype import ActionType
+from simplerelevance.constants.attributeclassid import AttributeClassID
+from simplerelevance.transport import PooledTransport
+
+
+def client_for(mode, url, concurrency):
+    """
+    Build the client a ``--mode`` describes.
+    """
+    transport = PooledTransport(pool_size=concurrency, per_host=concurrency)
+    options = {}
+
+    if mode == 'no-keepalive':
+        transport = PooledTransport(pool_size=0, per_host=concurrency)
+    elif mode == 'no-guid-cache':
+        options['guid_cache'] = GuidCache(max_size=0)
+    elif mode == 'prediction-cache':
+        options['prediction_cache'] = PredictionCache()
+    elif mode == 'no-single-flight':
+        options['single_flight'] = False
+    elif mode != 'default':
+        raise ValueError("'%s' is not a known mode." % mode)
+
+    client = SimpleRelevance('key', 'business', transport=transport,
+                             **options)
+    client.api_url = url
+
+    return client
+
+
+def scenarios(client, calls, concurrency):
+    """
+    Name, record count and callable for every public method; the callable
+    gets the call number.
+    """
+    records = calls * 10
+    items = [{'item_name': 'bulk %d' % i, 'data_dict': {'price': i}}
+             for i in xrange(records)]
+
+    return [
+        ('user_add', calls, lambda i: client.user_add(
+            'user%d@example.com' % i, data_dict={'plan': 'free'})),
+        ('users', calls, lambda i: client.users(
+            user_email='user%d@example.com' % i)),
+        ('item_add', calls, lambda i: client.item_add(
+            'item %d' % i, data_dict={'price': i}, variants=[{'sku': i}])),
+        ('item_update', calls, lambda i: client.item_update(
+            'item %d' % i, i + 1, data_dict={'price': i})),
+        ('items', calls, lambda i: client.items(
+            item_external_id=i % 50 + 1)),
+        ('action_add', calls, lambda i: client.action_add(
+            i % 50 + 1, user_email='user%d@example.com' % (i % 20),
+            action_type=ActionType.PURCHASES)),
+        ('action_update', calls, lambda i: client.action_update(
+            i % 50 + 1, user_email='user%d@example.com' % (i % 20))),
+        ('actions', calls, lambda i: client.actions(
+            action_type=ActionType.PURCHASES)),
+        ('attribute_update', calls, lambda i: client.attribute_update(
+            AttributeClassID.ITEM, i + 1, None, i + 1, 'color', 'red')),
+        ('attributes', calls, lambda i: client.attributes(
+            AttributeClassID.ITEM, i + 1, return_type='simple')),
+        ('attribute_delete', calls, lambda i: client.attribute_delete(
+            i + 1, attribute_name='color')),
+        ('predictions', calls, lambda i: client.predictions(
+            'user%d@example.com' % (i % 20))),
+        ('item_delete', calls, lambda i: client.item_delete(i + 1)),
+        ('user_delete', calls, lambda i: client.user_delete(i + 1)),
+        ('iter_users', calls, lambda i: list(client.iter_users(
+            page_size=5))),
+        ('iter_items', calls, lambda i: list(client.iter_items(
+            page_size=50))),
+        ('iter_actions', calls, lambda i: list(client.iter_actions(
+            page_size=100))),
+        ('predictions_many', records, lambda i: client.predictions_many(
+            ['user%d@example.com' % j for j in xrange(10)], concurrency)),
+        ('item_add_many', records, lambda i: client.item_add_many(
+            items[i * 10:(i + 1) * 10], concurrency)),
+        ('user_add_many', records, lambda i: client.user_add_many(
+            [{'email': 'many%d@example.com' % j}
+             for j in xrange(i * 10, (i + 1) * 10)], concurrency)),
+        ('action_add_many', records, lambda i: client.action_add_many(
+            [{'item_id': j % 50 + 1,
+              'user_email': 'user%d@example.com' % (j % 20)}
+             for j in xrange(i * 10, (i + 1) * 10)], concurrency)),
+    ]
+
+
+def percentile(latencies, q):
+    if not latencies:
+        return 0.0
+    return latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+
+
+def run(name, records, call, calls, concurrency):
+    latencies = []
+    errors = [0]
+    counter = iter(xrange(calls))
+    lock = threading.Lock()
+
+    def worker():
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                return
+
+            started = time.time()
+            try:
+                call(i)
+            except Exception:
+                errors[0] += 1
+            latency = time.time() - started
+            with lock:
+                latencies.append(latency)
+
+    started = time.time()
+    workers = [threading.Thread(target=worker) for _ in xrange(concurrency)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.time() - started
+
+    latencies.sort()
+    print '%-18s %10.1f %9.2f %9.2f %7d %9d' % (
+        name,
+        records / elapsed,
+        percentile(latencies, 0.5) * 1000,
+        percentile(latencies, 0.99) * 1000,
+        errors[0],
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark the client against a local fake server.'
+    )
+    parser.add_argument('--calls', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--mode', default='default',
+                        choices=['default', 'no-keepalive', 'no-guid-cache',
+                                 'prediction-cache', 'no-single-flight'])
+    parser.add_argument('--only', nargs='*',
+                        help='Only run these methods.')
+    args = parser.parse_args()
+
+    server = FakeServer(latency=args.latency, jitter=args.jitter,
+                        error_rate=args.error_rate).start()
+    client = client_for(args.mode, server.url, args.concurrency)
+
+    print 'mode=%s calls=%d concurrency=%d latency=%.3fs error_rate=%.2f' % (
+        args.mode, args.calls, args.concurrency, args.latency,
+        args.error_rate
+    )
+    print '%-18s %10s %9s %9s %7s %9s' % (
+        'method', 'records/s', 'p50 ms', 'p99 ms', 'errors', 'maxrss KB'
+    )
+
+    for name, records, call in scenarios(client, args.calls,
+                                         args.concurrency):
+        if args.only and name not in args.only:
+            continue
+        run(name, records, call, args.calls, args.concurrency)
+
+    client.close()
+    server.stop()
+
+
+if __name__ == '__main__':
+    main()
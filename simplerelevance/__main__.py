@@ -0,0 +1,5 @@
+import sys
+
+from simplerelevance.cli import main
+
+sys.exit(main())
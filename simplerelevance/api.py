@@ -1,14 +1,40 @@
+import Queue
 import base64
+import contextlib
 import json
+import threading
+import time
 import urllib
 import urllib2
+from simplerelevance import bulk
+from simplerelevance import decoder
+from simplerelevance import pagination
+from simplerelevance.cache import GuidCache
+from simplerelevance.catalog import AttributeCatalog
 from simplerelevance.constants.actiontype import ActionType
 from simplerelevance.constants.endpoint import EndPoint
-from simplerelevance.utils import pair_required
+from simplerelevance.constants.params import Params
+from simplerelevance.exceptions import (
+    APIError, DeadlineExceeded, UnresolvedError
+)
+from simplerelevance.executor import BoundedExecutor
+from simplerelevance.metrics import Metrics
+from simplerelevance.retry import CircuitBreaker, HedgePolicy, RetryPolicy
+from simplerelevance.singleflight import SingleFlight
+from simplerelevance.table import ColumnTable
+from simplerelevance.transport import PooledTransport, gzip_compress
+from simplerelevance.utils import compact, pair_required
 
 
 class SimpleRelevance(object):
-    def __init__(self, api_key, business_name, async=0):
+    def __init__(self, api_key, business_name, async=0, transport=None,
+                 guid_cache=None, prediction_cache=None, loads=None,
+                 decode_async_writes=True, outbox=None, timeout=None,
+                 retry=None, circuit_breaker=None, rate_limiter=None,
+                 metrics=None, single_flight=None, compress_threshold=None,
+                 attribute_catalog=None, recommender=None,
+                 prediction_budget=None, hedging=None, write_dedup=None,
+                 executor=None):
         """
         :param api_key: Your password is your API key.
         get it from https://www.simplerelevance.com/dashboard/api-key
@@ -25,11 +51,150 @@ class SimpleRelevance(object):
         response times by a factor of 2 or 3.
         :type async: int
 
+        :param transport: Sends the requests over the wire, defaults to
+        a ``PooledTransport`` which keeps connections alive between calls.
+        :type transport: simplerelevance.transport.Transport
+
+        :param guid_cache: Remembers the item and user guids looked up by
+        ``action_update``, so repeated actions skip those lookups.
+        :type guid_cache: simplerelevance.cache.GuidCache
+
+        :param prediction_cache: Serves ``predictions`` from memory when
+        given, refreshing them in the background.
+        :type prediction_cache: simplerelevance.cache.PredictionCache
+
+        :param loads: Decodes a JSON response body, defaults to the fastest
+        JSON library installed.
+        :type loads: callable
+
+        :param decode_async_writes: When false and ``async`` is set, writes
+        return the raw response body instead of decoding it.
+        :type decode_async_writes: bool
+
+        :param outbox: When given, ``post``, ``put`` and ``delete`` log the
+        request to it and return straight away; it is delivered in the
+        background. Actions are logged before their guids are looked up.
+        :type outbox: simplerelevance.outbox.Outbox
+
+        :param timeout: Seconds any call may take, retries included. See
+        ``deadline`` to bound a single call.
+        :type timeout: float
+
+        :param retry: How GET requests are retried, defaults to
+        ``RetryPolicy()``. Writes are never retried.
+        :type retry: simplerelevance.retry.RetryPolicy
+
+        :param circuit_breaker: Makes calls fail fast while the API is
+        failing, defaults to ``CircuitBreaker()``. False disables it.
+        :type circuit_breaker: simplerelevance.retry.CircuitBreaker
+
+        :param rate_limiter: Holds requests back to stay within the API
+        quota.
+        :type rate_limiter: simplerelevance.ratelimit.RateLimiter
+
+        :param metrics: Records latency, counts and sizes of every request,
+        defaults to ``Metrics()``. False disables it.
+        :type metrics: simplerelevance.metrics.Metrics
+
+        :param single_flight: Makes identical GET requests made at the same
+        time share one request, defaults to ``SingleFlight()``. False
+        disables it.
+        :type single_flight: simplerelevance.singleflight.SingleFlight
+
+        :param compress_threshold: Gzip ``post`` and ``put`` bodies of at
+        least this many bytes. None sends every body as is.
+        :type compress_threshold: int
+
+        :param attribute_catalog: Loaded in the background once the client
+        is created and kept up to date with its attribute writes, so
+        ``attribute_guid`` resolves names locally.
+        :type attribute_catalog: simplerelevance.catalog.AttributeCatalog
+
+        :param recommender: Learns from the actions sent by the client and
+        answers ``predictions`` when the API does not within
+        ``prediction_budget``.
+        :type recommender: simplerelevance.recommend.CooccurrenceEngine
+
+        :param prediction_budget: Seconds ``predictions`` waits for the API
+        before answering from ``recommender``.
+        :type prediction_budget: float
+
+        :param hedging: Sends a second copy of GET requests that are slower
+        than usual, see ``HedgePolicy``. Needs ``metrics``. True uses
+        ``HedgePolicy()``.
+        :type hedging: simplerelevance.retry.HedgePolicy
+
+        :param write_dedup: Answers repeated ``action_add``,
+        ``action_update``, ``user_add``, ``item_add`` and ``item_update``
+        calls locally instead of sending them again.
+        :type write_dedup: simplerelevance.dedup.WriteDeduplicator
+
+        :param executor: Runs the calls made through ``submit``, defaults
+        to 4 workers with up to 1000 calls waiting. The default transport
+        keeps an idle connection per worker, and does not cap the
+        connections open at once. Shut down by ``close``.
+        :type executor: simplerelevance.executor.BoundedExecutor
+
         """
         self.api_url = "https://www.simplerelevance.com/api/v3/"
         self.api_key = api_key
         self.async = async
         self.business_name = business_name
+        if executor is None:
+            executor = BoundedExecutor(4, max_queue=1000)
+        self.executor = executor
+        self.transport = transport or PooledTransport(
+            pool_size=max(10, executor.max_workers)
+        )
+        self.guid_cache = guid_cache or GuidCache()
+        self.prediction_cache = prediction_cache
+        self.loads = loads or decoder.loads
+        self.decode_async_writes = decode_async_writes
+        self.timeout = timeout
+        self.retry = retry or RetryPolicy()
+        if circuit_breaker is None:
+            circuit_breaker = CircuitBreaker()
+        self.circuit_breaker = circuit_breaker or None
+        self.rate_limiter = rate_limiter
+        if metrics is None:
+            metrics = Metrics()
+        self.metrics = metrics or None
+        if single_flight is None:
+            single_flight = SingleFlight()
+        self.single_flight = single_flight or None
+        self.compress_threshold = compress_threshold
+        self.recommender = recommender
+        self.prediction_budget = prediction_budget
+        if hedging is True:
+            hedging = HedgePolicy()
+        self.hedging = hedging or None
+        self.write_dedup = write_dedup
+        self._hedge_executor = None
+        if self.hedging is not None:
+            self._hedge_executor = BoundedExecutor(hedging.max_workers)
+            self._hedge_slots = threading.BoundedSemaphore(
+                hedging.max_workers
+            )
+        self._local = threading.local()
+
+        authorization = 'Basic {0}'.format(base64.b64encode(
+            "{0}:{1}".format(self.business_name, self.api_key)
+        ))
+        self._headers = {'Authorization': authorization}
+        self._form_headers = {
+            'Authorization': authorization,
+            'Content-type': 'application/x-www-form-urlencoded',
+        }
+        self._gzip_form_headers = dict(self._form_headers,
+                                       **{'Content-Encoding': 'gzip'})
+
+        self.outbox = outbox
+        if outbox is not None:
+            outbox.start(self._deliver)
+
+        self.attribute_catalog = attribute_catalog
+        if attribute_catalog is not None:
+            attribute_catalog.start(self._fetch_attributes)
 
     def authorize(self, request):
         """
@@ -38,14 +203,108 @@ class SimpleRelevance(object):
 
         :rtype: urllib2.Request
         """
-        base64encoded = base64.encodestring(
-            "{0}:{1}".format(self.business_name, self.api_key)
-        ).replace('\n', '')
-        request.add_header('Authorization', 'Basic {0}'.format(base64encoded))
+        request.add_header('Authorization', self._headers['Authorization'])
 
         return request
 
-    def request_opener(self, request, method=None):
+    def stats(self):
+        """
+        Snapshot of the request metrics, see ``Metrics.stats``.
+
+        :rtype: dict
+        """
+        if self.metrics is None:
+            return {}
+
+        return self.metrics.stats()
+
+    def close(self, wait=True):
+        """
+        Release the connections held by the transport, after giving the
+        outbox a few seconds to drain. What it could not deliver is sent
+        after the next start.
+
+        :param wait: Wait for the calls made through ``submit`` to finish,
+         those still queued included. When false they are cancelled.
+        :type wait: bool
+        """
+        self.executor.shutdown(wait, cancel=not wait)
+        if self.attribute_catalog is not None:
+            self.attribute_catalog.stop()
+        if self._hedge_executor is not None:
+            self._hedge_executor.shutdown(wait=False)
+        if self.outbox is not None:
+            self.outbox.close()
+        self.transport.close()
+
+    @contextlib.contextmanager
+    def deadline(self, seconds):
+        """
+         Bound the calls made by this thread inside the ``with`` block to
+        ``seconds`` in total, retries included:
+
+            with client.deadline(0.2):
+                client.predictions(email)
+
+         A request cut short by the deadline does not count as a failure of
+        the API for the circuit breaker.
+
+        :param seconds: Time allowed for the block.
+        :type seconds: float
+        """
+        previous = getattr(self._local, 'deadline', None)
+        deadline = time.time() + seconds
+        if previous is not None:
+            deadline = min(deadline, previous)
+
+        self._local.deadline = deadline
+        try:
+            yield
+        finally:
+            self._local.deadline = previous
+
+    def submit(self, method, *args, **kwargs):
+        """
+         Run a call on the client's ``executor`` and return straight away,
+        for fanning out without blocking:
+
+            futures = [client.submit('predictions', email)
+                       for email in emails]
+            results = [future.result() for future in futures]
+
+         The call keeps the deadline of the submitting thread, so time
+        spent queued counts against it.
+
+        :param method: Name of a method of the client, or any callable.
+        :type method: str
+
+        :rtype: Future
+        """
+        if isinstance(method, basestring):
+            method = getattr(self, method)
+
+        return self.executor.submit(
+            self._submitted, getattr(self._local, 'deadline', None),
+            method, args, kwargs
+        )
+
+    def _submitted(self, deadline, method, args, kwargs):
+        self._local.deadline = deadline
+        try:
+            return method(*args, **kwargs)
+        finally:
+            self._local.deadline = None
+
+    def _deadline(self):
+        deadline = getattr(self._local, 'deadline', None)
+        if self.timeout is not None:
+            client_deadline = time.time() + self.timeout
+            if deadline is None or client_deadline < deadline:
+                deadline = client_deadline
+
+        return deadline
+
+    def request_opener(self, request, method=None, decode=True):
         """
          Provides simple JSON serializing on data, and return simple
         exception where an error occurred.
@@ -56,6 +315,10 @@ class SimpleRelevance(object):
         :param method: Request method.
         :type method: str
 
+        :param decode: Decode the JSON response body, otherwise it is
+         returned as is.
+        :type decode: bool
+
         :rtype: dict
         """
 
@@ -66,12 +329,232 @@ class SimpleRelevance(object):
             else:
                 raise ValueError("'%s' is not supported.")
 
+        url = request.get_full_url()
+        endpoint = None
+        if url.startswith(self.api_url):
+            endpoint = url[len(self.api_url):].split('?', 1)[0]
+
+        return self._send(request.get_method(), url, request.get_data(),
+                          decode, endpoint)
+
+    def _request(self, method, endpoint, url, body, headers, timeout):
+        if self.metrics is None:
+            return self.transport.request(method, url, body, headers, timeout)
+
+        started = time.time()
         try:
-            return urllib2.urlopen(self.authorize(request)).read()
-        except urllib2.URLError as e:
-            raise urllib2.URLError("%s:\n\t%s" % (e.code, e.read()))
+            response = self.transport.request(method, url, body, headers,
+                                              timeout)
+        except urllib2.URLError:
+            self.metrics.record(endpoint, method, time.time() - started,
+                                len(body or ''), 0, True)
+            raise
+
+        self.metrics.record(endpoint, method, time.time() - started,
+                            len(body or ''), len(response.body),
+                            response.status >= 400)
+
+        return response
+
+    def _hedged_request(self, endpoint, url, headers, timeout):
+        delay = None
+        if self.metrics is not None:
+            delay = self.hedging.delay(self.metrics, endpoint)
+        # With every hedging worker busy, the request would only queue
+        # behind the others, so the caller sends it unhedged.
+        if (delay is None or (timeout is not None and delay >= timeout) or
+                not self._hedge_slots.acquire(False)):
+            return self._request('GET', endpoint, url, None, headers,
+                                 timeout)
+
+        answers = Queue.Queue()
+
+        def attempt(hedge, timeout):
+            try:
+                answers.put((hedge, self._request('GET', endpoint, url, None,
+                                                  headers, timeout), None))
+            except urllib2.URLError as e:
+                answers.put((hedge, None, e))
+            finally:
+                self._hedge_slots.release()
+
+        # Timed waits poll in Python 2, which would slow down every
+        # request, so the caller blocks on the queue and a timer, which is
+        # cancelled once there is an answer, posts into it instead.
+        started = time.time()
+        timer = threading.Timer(delay, answers.put, [(None, None, None)])
+        timer.daemon = True
+        self._hedge_executor.submit(attempt, False, timeout)
+        timer.start()
+        pending = 1
+
+        try:
+            while True:
+                hedge, response, error = answers.get()
+                if hedge is None:
+                    # The hedge takes a token like any request, but never
+                    # waits for one, nor for a worker.
+                    if not self._hedge_slots.acquire(False):
+                        continue
+                    if self.hedging.allow() and (
+                            self.rate_limiter is None or
+                            self.rate_limiter.acquire('GET', 0)):
+                        if timeout is not None:
+                            timeout -= time.time() - started
+                        self._hedge_executor.submit(attempt, True, timeout)
+                        pending += 1
+                    else:
+                        self._hedge_slots.release()
+                    continue
+
+                # A failure only counts once the other request failed too;
+                # the slower request is left to finish on its own.
+                pending -= 1
+                if error is None:
+                    if hedge:
+                        self.hedging.win()
+                    return response
+                if not pending:
+                    raise error
+        finally:
+            timer.cancel()
+
+    def _send(self, method, url, body=None, decode=True, endpoint=None):
+        if body is None:
+            headers = self._headers
+        elif (self.compress_threshold is not None and method != 'DELETE' and
+                len(body) >= self.compress_threshold):
+            body = gzip_compress(body)
+            headers = self._gzip_form_headers
+        else:
+            headers = self._form_headers
+
+        deadline = self._deadline()
+        caller_deadline = getattr(self._local, 'deadline', None)
+        attempts = self.retry.max_attempts if method == 'GET' else 1
+        attempt = 0
+
+        while True:
+            attempt += 1
+            timeout = None
+            if deadline is not None:
+                timeout = deadline - time.time()
+                if timeout <= 0:
+                    raise DeadlineExceeded('deadline exceeded for %s' % url)
+
+            # The token comes first: a call refused by the rate limiter must
+            # not hold the half-open breaker's only trial.
+            if (self.rate_limiter is not None and
+                    not self.rate_limiter.acquire(method, timeout)):
+                raise DeadlineExceeded('rate limited past deadline for %s'
+                                       % url)
+            if deadline is not None:
+                timeout = deadline - time.time()
+
+            if self.circuit_breaker is not None:
+                self.circuit_breaker.allow()
+
+            retryable = True
+            api_failure = True
+            try:
+                if (method == 'GET' and self.hedging is not None and
+                        self.hedging.applies(endpoint)):
+                    response = self._hedged_request(endpoint, url, headers,
+                                                    timeout)
+                else:
+                    response = self._request(method, endpoint, url, body,
+                                             headers, timeout)
+            except urllib2.URLError as e:
+                error = e
+                if (caller_deadline is not None and
+                        time.time() >= caller_deadline):
+                    # The caller's own budget ran out, which says nothing
+                    # about the health of the API.
+                    if self.circuit_breaker is not None:
+                        self.circuit_breaker.release()
+                    raise error
+            except BaseException:
+                if self.circuit_breaker is not None:
+                    self.circuit_breaker.release()
+                raise
+            else:
+                if response.status < 400:
+                    break
+
+                error = APIError(response.status, response.body)
+                retryable = response.status in self.retry.retry_statuses
+                if response.status < 500:
+                    if not retryable:
+                        # The API is up, the request was refused.
+                        if self.circuit_breaker is not None:
+                            self.circuit_breaker.success()
+                        raise error
+                    # A 429 or 408 says to come back later, not that the
+                    # API is failing.
+                    api_failure = False
+
+            if self.circuit_breaker is not None:
+                if api_failure:
+                    self.circuit_breaker.failure()
+                else:
+                    self.circuit_breaker.release()
+
+            if not retryable or attempt >= attempts:
+                raise error
+
+            delay = self.retry.delay(attempt)
+            if deadline is not None and time.time() + delay >= deadline:
+                raise error
+            time.sleep(delay)
+
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.success()
+
+        if not decode:
+            return response.body
+
+        return self.loads(response.body)
+
+    def _write_once(self, endpoint, data, idempotency_key=None):
+        if self.write_dedup is None:
+            return self.post(endpoint, data)
+
+        return self.write_dedup.do(
+            (endpoint, tuple(sorted(data.items()))),
+            lambda: self.post(endpoint, data),
+            idempotency_key,
+            endpoint
+        )
+
+    def _decode_writes(self):
+        return self.decode_async_writes or not self.async
+
+    def _deliver(self, method, endpoint, data):
+        # Data read back from the outbox log comes out as unicode.
+        data = dict(
+            (k.encode('utf-8'),
+             v.encode('utf-8') if isinstance(v, unicode) else v)
+            for k, v in data.items()
+        )
+
+        # Actions are logged before their guids are resolved. An item or
+        # user the API does not know will not turn up on a retry.
+        user = None
+        if endpoint == EndPoint.ACTIONS and 'item_id' in data:
+            try:
+                user = self._resolve_action(data)
+            except (IndexError, KeyError, TypeError) as e:
+                raise UnresolvedError('cannot resolve action %r: %r'
+                                      % (data, e))
+
+        response = self._send(method, self.api_url + endpoint,
+                              urllib.urlencode(data), False, endpoint)
+        if user is not None:
+            self._learn(data, *user)
 
-    def get(self, endpoint, params):
+        return response
+
+    def get(self, endpoint, params, label=None):
         """
         :param endpoint: API endpoint to send request to. ex; users/
         :type endpoint: str
@@ -79,14 +562,31 @@ class SimpleRelevance(object):
         :param params: Data parameters to encode and send through request.
         :type params: dict
 
+        :param label: Name the request is counted under in ``metrics`` and
+         known by to ``hedging``, defaults to ``endpoint``.
+        :type label: str
+
         :rtype: dict
         """
-        params = urllib.urlencode(params)
-
-        return self.request_opener(
-            urllib2.Request("%s%s?%s" % (self.api_url, endpoint, params))
+        url = self.api_url + endpoint + '?' + urllib.urlencode(params)
+        label = label or endpoint
+        if self.single_flight is None:
+            return self._send('GET', url, endpoint=label)
+
+        # Callers share the body and decode their own copy, so none of
+        # them sees another one's changes to the result.
+        timeout = None
+        deadline = self._deadline()
+        if deadline is not None:
+            timeout = max(0, deadline - time.time())
+
+        body = self.single_flight.do(
+            url, lambda: self._send('GET', url, None, False, label),
+            timeout
         )
 
+        return self.loads(body)
+
     def post(self, endpoint, data):
         """
         :param endpoint: API endpoint for sending request to. ex; users/
@@ -98,11 +598,12 @@ class SimpleRelevance(object):
         :rtype: dict
         """
         data['async'] = self.async
-        data = urllib.urlencode(data)
+        if self.outbox is not None:
+            return self.outbox.append('POST', endpoint, data)
 
-        return self.request_opener(
-            urllib2.Request("%s%s" % (self.api_url, endpoint), data)
-        )
+        return self._send('POST', self.api_url + endpoint,
+                          urllib.urlencode(data), self._decode_writes(),
+                          endpoint)
 
     def delete(self, endpoint, data):
         """
@@ -116,12 +617,12 @@ class SimpleRelevance(object):
 
         :rtype: dict
         """
-        data = urllib.urlencode(data)
+        if self.outbox is not None:
+            return self.outbox.append('DELETE', endpoint, data)
 
-        return self.request_opener(
-            request=urllib2.Request("%s%s" % (self.api_url, endpoint), data),
-            method='DELETE'
-        )
+        return self._send('DELETE', self.api_url + endpoint,
+                          urllib.urlencode(data), self._decode_writes(),
+                          endpoint)
 
     def put(self, endpoint, data):
         """
@@ -135,17 +636,18 @@ class SimpleRelevance(object):
 
         :rtype: dict
         """
-        data = urllib.urlencode(data)
+        if self.outbox is not None:
+            return self.outbox.append('PUT', endpoint, data)
 
-        return self.request_opener(
-            request=urllib2.Request("%s%s" % (self.api_url, endpoint), data),
-            method='PUT'
-        )
+        return self._send('PUT', self.api_url + endpoint,
+                          urllib.urlencode(data), self._decode_writes(),
+                          endpoint)
 
     def users(self, user_email=None, user_external_id=None,
               city=None, state=None, market=None, zipcode=None,
               radius=None, attribute_guids_or=None, attribute_guids_and=None,
-              batch_guids=None, return_time_of_day=None):
+              batch_guids=None, return_time_of_day=None, page=None,
+              page_size=None):
         """
          The following request params either filter user returns or
         modify what information is returned, as described:
@@ -192,18 +694,66 @@ class SimpleRelevance(object):
          which defaults to false in the interest of speed.
         :type return_time_of_day: str
 
+        :param page: Page of results to return, starting at 1.
+        :type page: int
+
+        :param page_size: Number of results per page.
+        :type page_size: int
+
         :rtype: dict
         """
         pair_required(city, state)
 
-        params = {}
-        for k, v in locals().items():
-            if v is not self and k and v:
-                params[k] = v
+        params = compact(Params.USERS, (
+            user_email, user_external_id, city, state, market, zipcode,
+            radius, attribute_guids_or, attribute_guids_and, batch_guids,
+            return_time_of_day, page, page_size
+        ))
 
         return self.get(EndPoint.USERS, params)
 
-    def user_add(self, email, zipcode=None, user_id=None, data_dict={}):
+    def iter_users(self, page_size=100, prefetch=True, **filters):
+        """
+         Iterate over every user matching ``filters`` (the arguments of
+        ``users``), walking through the pages lazily so memory use does not
+        grow with the number of results.
+
+        :param page_size: Number of users fetched per request.
+        :type page_size: int
+
+        :param prefetch: Fetch the next page in the background while the
+         current one is consumed.
+        :type prefetch: bool
+
+        :rtype: generator
+        """
+        return pagination.iter_pages(
+            lambda page: self.users(page=page, page_size=page_size,
+                                    **filters),
+            page_size,
+            prefetch
+        )
+
+    def users_table(self, fields=None, page_size=100, **filters):
+        """
+         Load every user matching ``filters`` (the arguments of
+        ``users``) page by page into a ``ColumnTable``, which takes a
+        fraction of the memory of a list of dicts.
+
+        :param fields: Fields to keep, None keeps them all.
+        :type fields: tuple
+
+        :param page_size: Number of users fetched per request.
+        :type page_size: int
+
+        :rtype: simplerelevance.table.ColumnTable
+        """
+        return ColumnTable.from_records(
+            self.iter_users(page_size, **filters), fields
+        )
+
+    def user_add(self, email, zipcode=None, user_id=None, data_dict={},
+                 idempotency_key=None):
         """
          The only required parameter is "email". Optional are zipcode,
         user_id, data_dict. The data_dict can contain and reserved an
@@ -223,6 +773,10 @@ class SimpleRelevance(object):
         duplicate keys for unrelated attributes(Optional).
         :type data_dict: list of dict
 
+        :param idempotency_key: Repeats of this call with the same key are
+         answered locally, see ``write_dedup``.
+        :type idempotency_key: str
+
         :rtype: dict
         """
         post_data = {
@@ -234,7 +788,41 @@ class SimpleRelevance(object):
         if zipcode:
             post_data['zipcode'] = zipcode
 
-        return self.post(EndPoint.USERS, post_data)
+        response = self._write_once(EndPoint.USERS, post_data,
+                                    idempotency_key)
+        if self.recommender is not None and user_id:
+            self.recommender.alias(('user_email', email),
+                                   ('user_id', user_id))
+
+        return response
+
+    def user_add_many(self, users, max_workers=4, max_in_flight=None,
+                      on_result=None):
+        """
+         Add a large number of users in parallel. Encoding and sending
+        happen on the worker pool.
+
+        :param users: Dicts taking the same keys as the ``user_add``
+         arguments. A generator is fine, it is read as records are sent.
+        :type users: iterable
+
+        :param max_workers: Requests sent at the same time. Keep it within
+         the transport's ``per_host`` limit.
+        :type max_workers: int
+
+        :param max_in_flight: Users submitted but not finished yet,
+         reading the input pauses until there is room.
+        :type max_in_flight: int
+
+        :param on_result: Called as ``on_result(index, user, result,
+         error)`` for every user, as the result's ``failed`` only lists
+         the first ``bulk.FAILED_SAMPLE`` failures.
+        :type on_result: callable
+
+        :rtype: simplerelevance.bulk.BulkResult
+        """
+        return bulk.add_records(self.user_add, users, max_workers,
+                                max_in_flight, on_result)
 
     def user_delete(self, user_guid, user_external_id=None):
         """
@@ -248,18 +836,19 @@ class SimpleRelevance(object):
 
         :rtype: dict
         """
-        data = {}
-        for k, v in locals().items():
-            if v is not self and k and v:
-                data[k] = v
+        data = compact(Params.USER_DELETE, (user_guid, user_external_id))
+
+        response = self.delete(EndPoint.USERS, data)
+        self.guid_cache.invalidate_user(user_guid, user_external_id)
 
-        return self.delete(EndPoint.USERS, data)
+        return response
 
     def items(self, item_name=None, item_external_id=None, item_guid=None,
               city=None, state=None, latitude=None, longtitude=None,
               market=None, zipcode=None, radius=None, attribute_guids_or=None,
               attribute_guids_and=None, variant_filters=None, batch_guids=None,
-              skip_useraction_return=False, filter_expired=True):
+              skip_useraction_return=False, filter_expired=True, page=None,
+              page_size=None):
         """
          Get items, can filter item returns or modify what information
         returned.
@@ -326,20 +915,68 @@ class SimpleRelevance(object):
          that are set to be available in our system.
         :type filter_expired: bool
 
+        :param page: Page of results to return, starting at 1.
+        :type page: int
+
+        :param page_size: Number of results per page.
+        :type page_size: int
+
         :rtype: dict
         """
         pair_required(city, state)
         pair_required(latitude, longtitude)
 
-        params = {}
-        for k, v in locals().items():
-            if v is not self and k and v:
-                params[k] = v
+        params = compact(Params.ITEMS, (
+            item_name, item_external_id, item_guid, city, state, latitude,
+            longtitude, market, zipcode, radius, attribute_guids_or,
+            attribute_guids_and, variant_filters, batch_guids,
+            skip_useraction_return, filter_expired, page, page_size
+        ))
 
         return self.get(EndPoint.ITEMS, params)
 
+    def iter_items(self, page_size=100, prefetch=True, **filters):
+        """
+         Iterate over every item matching ``filters`` (the arguments of
+        ``items``), walking through the pages lazily so memory use does not
+        grow with the number of results.
+
+        :param page_size: Number of items fetched per request.
+        :type page_size: int
+
+        :param prefetch: Fetch the next page in the background while the
+         current one is consumed.
+        :type prefetch: bool
+
+        :rtype: generator
+        """
+        return pagination.iter_pages(
+            lambda page: self.items(page=page, page_size=page_size,
+                                    **filters),
+            page_size,
+            prefetch
+        )
+
+    def items_table(self, fields=None, page_size=100, **filters):
+        """
+         Load every item matching ``filters`` (the arguments of
+        ``items``) page by page into a ``ColumnTable``, which takes a
+        fraction of the memory of a list of dicts.
+
+        :param fields: Fields to keep, None keeps them all.
+        :type fields: tuple
+
+        :param page_size: Number of items fetched per request.
+        :type page_size: int
+
+        :rtype: simplerelevance.table.ColumnTable
+        """
+        return ColumnTable.from_records(
+            self.iter_items(page_size, **filters), fields
+        )
+
     def item_add(self, item_name, item_type=None, data_dict={},
-                 variants=[]):
+                 variants=[], idempotency_key=None):
         """
         Add new item.
 
@@ -371,6 +1008,10 @@ class SimpleRelevance(object):
          variant at all.
         :type variants: list of dict
 
+        :param idempotency_key: Repeats of this call with the same key are
+         answered locally, see ``write_dedup``.
+        :type idempotency_key: str
+
         :rtype: dict
         """
 
@@ -382,10 +1023,38 @@ class SimpleRelevance(object):
         if item_type:
             post_data['item_type'] = item_type
 
-        return self.post(EndPoint.ITEMS, post_data)
+        return self._write_once(EndPoint.ITEMS, post_data, idempotency_key)
+
+    def item_add_many(self, items, max_workers=4, max_in_flight=None,
+                      on_result=None):
+        """
+         Add a large number of items in parallel. Encoding ``data_dict``
+        and ``variants`` and sending happen on the worker pool.
+
+        :param items: Dicts taking the same keys as the ``item_add``
+         arguments. A generator is fine, it is read as records are sent.
+        :type items: iterable
+
+        :param max_workers: Requests sent at the same time. Keep it within
+         the transport's ``per_host`` limit.
+        :type max_workers: int
+
+        :param max_in_flight: Items submitted but not finished yet,
+         reading the input pauses until there is room.
+        :type max_in_flight: int
+
+        :param on_result: Called as ``on_result(index, item, result,
+         error)`` for every item, as the result's ``failed`` only lists
+         the first ``bulk.FAILED_SAMPLE`` failures.
+        :type on_result: callable
+
+        :rtype: simplerelevance.bulk.BulkResult
+        """
+        return bulk.add_records(self.item_add, items, max_workers,
+                                max_in_flight, on_result)
 
     def item_update(self, item_name, item_id, item_type=None,
-                    data_dict={}, variants=[]):
+                    data_dict={}, variants=[], idempotency_key=None):
         """
         Update an item match with `item_id`.
 
@@ -420,6 +1089,10 @@ class SimpleRelevance(object):
          variant at all.
         :type variants: list of dict
 
+        :param idempotency_key: Repeats of this call with the same key are
+         answered locally, see ``write_dedup``.
+        :type idempotency_key: str
+
         :rtype: dict
         """
         if item_id in ['', 0, None] or not item_id:
@@ -434,7 +1107,7 @@ class SimpleRelevance(object):
         if item_type:
             post_data['item_type'] = item_type
 
-        return self.post(EndPoint.ITEMS, post_data)
+        return self._write_once(EndPoint.ITEMS, post_data, idempotency_key)
 
     def item_delete(self, item_guid, item_external_id=None):
         """
@@ -450,20 +1123,20 @@ class SimpleRelevance(object):
 
         :rtype: dict
         """
-        data = {}
+        data = compact(Params.ITEM_DELETE, (item_guid, item_external_id))
 
-        for k, v in locals().items():
-            if v is not self and k and v:
-                data[k] = v
+        response = self.delete(EndPoint.ITEMS, data)
+        self.guid_cache.invalidate_item(item_guid, item_external_id)
 
-        return self.delete(EndPoint.ITEMS, data)
+        return response
 
     def actions(self, user_guid=None, item_guid=None, city=None, state=None,
                 latitude=None, longitude=None, action_type=ActionType.CLICKS,
                 market=None, zipcode=None, radius=None,
                 item_attribute_guids_or=None, item_attribute_guids_and=None,
                 user_attribute_guids_or=None, user_attribute_guids_and=None,
-                datetime_start=None, datetime_end=None):
+                datetime_start=None, datetime_end=None, page=None,
+                page_size=None):
         """
          Get Actions, can filter action returns or modify what information
         returned
@@ -533,18 +1206,67 @@ class SimpleRelevance(object):
          Both or neither are required.
         :type datetime_end: str
 
+        :param page: Page of results to return, starting at 1.
+        :type page: int
+
+        :param page_size: Number of results per page.
+        :type page_size: int
+
         :rtype: dict
         """
         pair_required(city, state)
         pair_required(datetime_start, datetime_end)
 
-        params = {}
-        for k, v in locals().items():
-            if v is not self and k and v:
-                params[k] = v
+        params = compact(Params.ACTIONS, (
+            user_guid, item_guid, city, state, latitude, longitude,
+            action_type, market, zipcode, radius, item_attribute_guids_or,
+            item_attribute_guids_and, user_attribute_guids_or,
+            user_attribute_guids_and, datetime_start, datetime_end, page,
+            page_size
+        ))
 
         return self.get(EndPoint.ACTIONS, params)
 
+    def iter_actions(self, page_size=100, prefetch=True, **filters):
+        """
+         Iterate over every action matching ``filters`` (the arguments of
+        ``actions``), walking through the pages lazily so memory use does not
+        grow with the number of results.
+
+        :param page_size: Number of actions fetched per request.
+        :type page_size: int
+
+        :param prefetch: Fetch the next page in the background while the
+         current one is consumed.
+        :type prefetch: bool
+
+        :rtype: generator
+        """
+        return pagination.iter_pages(
+            lambda page: self.actions(page=page, page_size=page_size,
+                                      **filters),
+            page_size,
+            prefetch
+        )
+
+    def actions_table(self, fields=None, page_size=100, **filters):
+        """
+         Load every action matching ``filters`` (the arguments of
+        ``actions``) page by page into a ``ColumnTable``, which takes a
+        fraction of the memory of a list of dicts.
+
+        :param fields: Fields to keep, None keeps them all.
+        :type fields: tuple
+
+        :param page_size: Number of actions fetched per request.
+        :type page_size: int
+
+        :rtype: simplerelevance.table.ColumnTable
+        """
+        return ColumnTable.from_records(
+            self.iter_actions(page_size, **filters), fields
+        )
+
     def action_add(self, item_id, item_name=None, user_email=None,
                    user_id=None, action_type=ActionType.CLICKS):
         """
@@ -603,25 +1325,178 @@ class SimpleRelevance(object):
 
         :rtype: dict
         """
-        data = {}
+        data = compact(Params.ACTION_UPDATE, (
+            item_id, item_name, user_email, user_id, action_type
+        ))
 
-        for k, v in locals().items():
-            if v is not self and k and v:
-                data[k] = v
+        if self.write_dedup is None:
+            return self._post_action(data)
+
+        # Repeats are absorbed before the guid lookups, not just the post.
+        return self.write_dedup.do(
+            (EndPoint.ACTIONS, tuple(sorted(data.items()))),
+            lambda: self._post_action(dict(data))
+        )
+
+    def _post_action(self, data):
+        if self.outbox is not None:
+            # Logged unresolved, the guids are looked up on delivery, so
+            # the action is kept even while the API is down.
+            data['async'] = self.async
+            return self.outbox.append('POST', EndPoint.ACTIONS, data)
+
+        user_email, user_id = self._resolve_action(data)
+        response = self.post(EndPoint.ACTIONS, data)
+        self._learn(data, user_email, user_id)
+
+        return response
+
+    def _resolve_action(self, data):
+        """
+        Replace the item id, user email and user id of an action by what
+        the API expects, in place.
+
+        :return: The user email and user id the action was given.
+        :rtype: tuple
+        """
+        user_email = data.get('user_email')
+        user_id = data.get('user_id')
 
         # dirty patching api
-        items = self.items(item_external_id=data.pop('item_id'))
-        data['item_guid'] = items['results'][0]['purchases']['1']['item_guid']
+        data['item_guid'] = self.item_guid(data.pop('item_id'))
+
+        if 'user_email' in data:
+            data['user_guid'] = self.user_guid(data.pop('user_email'))
 
-        if user_email:
-            users = self.users(user_email=data.pop('user_email'))
-            data['user_guid'] = users['results'][0]['guid']
+        if 'user_id' in data:
+            data['user_external_id'] = self.user_external_id(
+                data.pop('user_id')
+            )
+
+        return user_email, user_id
+
+    def _learn(self, action, user_email=None, user_id=None):
+        # The recommender knows users by email, as predictions asks for
+        # them, and by external id, for actions sent without an email.
+        if self.recommender is None:
+            return
 
         if user_id:
-            users = self.users(user_external_id=self.pop('user_id'))
-            data['user_external_id'] = users['results'][0]['external_id']
+            user = ('user_id', user_id)
+            if user_email:
+                self.recommender.alias(('user_email', user_email), user)
+        else:
+            user = ('user_email', user_email)
+
+        # Users seeded with ``add_actions`` are known by guid.
+        if action.get('user_guid') is not None:
+            self.recommender.alias(action['user_guid'], user)
 
-        return self.post(EndPoint.ACTIONS, data)
+        self.recommender.add(user, action['item_guid'],
+                             action.get('action_type') or ActionType.CLICKS)
+
+    def _local_user(self, email):
+        """
+        :return: How the recommender knows the user with this email, None
+         when it does not.
+        """
+        # Users seeded with ``add_actions`` and not seen since are known by
+        # guid, found without a request if it is cached.
+        for user in (('user_email', email),
+                     self.guid_cache.users.get(('user_email', email))):
+            if user is not None and self.recommender.knows(user):
+                return user
+
+        return None
+
+    def action_add_many(self, actions, max_workers=4, max_in_flight=None,
+                        chunk_size=1000, on_result=None):
+        """
+         Add a large number of actions. Each distinct item and user is
+        resolved to its guid once per chunk rather than once per action,
+        and the actions are posted in parallel.
+
+        :param actions: Dicts taking the same keys as the ``action_add``
+         arguments. A generator is fine, it is read ``chunk_size`` at a time.
+        :type actions: iterable
+
+        :param max_workers: Requests sent at the same time. Keep it within
+         the transport's ``per_host`` limit.
+        :type max_workers: int
+
+        :param max_in_flight: Actions submitted but not finished yet,
+         reading the input pauses until there is room.
+        :type max_in_flight: int
+
+        :param chunk_size: Actions read and resolved together.
+        :type chunk_size: int
+
+        :param on_result: Called as ``on_result(index, action, result,
+         error)`` for every action, as the result's ``failed`` only lists
+         the first ``bulk.FAILED_SAMPLE`` failures.
+        :type on_result: callable
+
+        :rtype: simplerelevance.bulk.BulkResult
+        """
+        return bulk.add_actions(self, actions, max_workers, max_in_flight,
+                                chunk_size, on_result)
+
+    def item_guid(self, item_external_id):
+        """
+        Resolve an item's guid from its external_id, using ``guid_cache``
+        before asking the API.
+
+        :param item_external_id: The "external_id" the item was uploaded
+         with.
+        :type item_external_id: int
+
+        :rtype: str
+        """
+        guid = self.guid_cache.items.get(item_external_id)
+        if guid is None:
+            items = self.items(item_external_id=item_external_id)
+            guid = items['results'][0]['purchases']['1']['item_guid']
+            self.guid_cache.items.set(item_external_id, guid)
+
+        return guid
+
+    def user_guid(self, user_email):
+        """
+        Resolve a user's guid from their email, using ``guid_cache``
+        before asking the API.
+
+        :param user_email: Email address of the user.
+        :type user_email: str
+
+        :rtype: str
+        """
+        key = ('user_email', user_email)
+        guid = self.guid_cache.users.get(key)
+        if guid is None:
+            users = self.users(user_email=user_email)
+            guid = users['results'][0]['guid']
+            self.guid_cache.users.set(key, guid)
+
+        return guid
+
+    def user_external_id(self, user_id):
+        """
+        Resolve a user's external_id from their ID, using ``guid_cache``
+        before asking the API.
+
+        :param user_id: ID of the user.
+        :type user_id: int
+
+        :rtype: str
+        """
+        key = ('user_external_id', user_id)
+        external_id = self.guid_cache.users.get(key)
+        if external_id is None:
+            users = self.users(user_external_id=user_id)
+            external_id = users['results'][0]['external_id']
+            self.guid_cache.users.set(key, external_id)
+
+        return external_id
 
     def action_delete(self):
         """
@@ -653,14 +1528,49 @@ class SimpleRelevance(object):
 
         :rtype: dict
         """
-        params = {}
-
-        for k, v in locals().items():
-            if v is not self and k and v:
-                params[k] = v
+        params = compact(Params.ATTRIBUTES, (
+            class_id, guid, attribute_name, guidlist, return_type
+        ))
+        # 0 is a valid class, user attributes.
+        if class_id is not None:
+            params['class_id'] = class_id
 
         return self.get(EndPoint.ATTRIBUTES, params)
 
+    def _fetch_attributes(self, class_id, attribute_name=None):
+        return self.attributes(class_id, None, attribute_name,
+                               return_type='simple').get('results') or []
+
+    def attribute_guid(self, class_id, attribute_name, attribute_value=None):
+        """
+         Resolve an attribute's guid from its name and value, from
+        ``attribute_catalog`` when there is one and by asking the API
+        otherwise.
+
+        :param class_id: User (0) or item (1) attribute.
+        :type class_id: int
+
+        :param attribute_name: Name of the attribute.
+        :type attribute_name: str
+
+        :param attribute_value: Value of the attribute, needed when the
+         name has several.
+        :type attribute_value: str
+
+        :return: Guid of the attribute, None when there is no such
+         attribute.
+        :rtype: int
+        """
+        if self.attribute_catalog is not None:
+            return self.attribute_catalog.guid(class_id, attribute_name,
+                                               attribute_value)
+
+        attributes = AttributeCatalog(refresh_interval=None)
+        for attribute in self._fetch_attributes(class_id, attribute_name):
+            attributes.add(class_id, attribute)
+
+        return attributes.guid(class_id, attribute_name, attribute_value)
+
     def attribute_add(self):
         raise NotImplementedError(
             """All attributes should be initially created as part of a POST to
@@ -698,13 +1608,19 @@ class SimpleRelevance(object):
 
         :rtype: dict
         """
-        data = {}
+        data = compact(Params.ATTRIBUTE_UPDATE, (
+            class_id, guid, user_guid, item_guid, attribute_name,
+            attribute_value
+        ))
+        if class_id is not None:
+            data['class_id'] = class_id
 
-        for k, v in locals().items():
-            if v is not self and k and v:
-                data[k] = v
+        response = self.put(EndPoint.ATTRIBUTES, data)
+        if self.attribute_catalog is not None and isinstance(response, dict):
+            for attribute in response.get('results') or []:
+                self.attribute_catalog.add(class_id, attribute)
 
-        return self.put(EndPoint.ATTRIBUTES, data)
+        return response
 
     def attribute_delete(self, guid, user_guid=None, item_guid=None,
                          attribute_name=None):
@@ -726,20 +1642,82 @@ class SimpleRelevance(object):
 
         :rtype: dict
         """
-        data = {}
+        data = compact(Params.ATTRIBUTE_DELETE, (
+            guid, user_guid, item_guid, attribute_name
+        ))
 
-        for k, v in locals().items():
-            if v is not self and k and v:
-                data[k] = v
+        response = self.delete(EndPoint.ATTRIBUTES, data)
+        # Removing an attribute from one user or item leaves it in place.
+        if (self.attribute_catalog is not None and not user_guid and
+                not item_guid):
+            if guid:
+                self.attribute_catalog.remove(guid)
+            elif attribute_name:
+                self.attribute_catalog.remove_name(attribute_name)
 
-        return self.delete(EndPoint.ATTRIBUTES, data)
+        return response
 
     def predictions(self, email):
         """
+         With a ``recommender`` and a ``prediction_budget``, an API answer
+        that is late or failed is replaced by local predictions, marked
+        with ``'source': 'local'`` and listing ``item_guid`` and ``score``
+        of each predicted item.
+
         :param email: The email to fetch for.
         :type email: str
 
         :rtype: dict
         """
-        return self.get(EndPoint.PREDICTIONS, {'email': email})
+        def fetch():
+            # Counted apart from items/, which shares the endpoint.
+            return self.get(EndPoint.PREDICTIONS, {'email': email},
+                            'predictions')
+
+        if self.recommender is None or self.prediction_budget is None:
+            return self._predictions(email, fetch)
+
+        try:
+            with self.deadline(self.prediction_budget):
+                return self._predictions(email, fetch)
+        except urllib2.URLError:
+            # Only a user the recommender knows can be answered locally.
+            user = self._local_user(email)
+            if user is None:
+                raise
+
+        predictions = self.recommender.predict(user)
+        return {
+            'results': [
+                {'item_guid': item_guid, 'score': score}
+                for item_guid, score in predictions
+            ],
+            'source': 'local',
+        }
+
+    def _predictions(self, email, fetch):
+        if self.prediction_cache is None:
+            return fetch()
+
+        return self.prediction_cache.get(email, fetch)
+
+    def predictions_many(self, emails, max_workers=4):
+        """
+        Fetch the predictions of several users in parallel.
+
+        :param emails: The emails to fetch for.
+        :type emails: iterable
+
+        :param max_workers: Requests sent at the same time.
+        :type max_workers: int
+
+        :return: Mapping of each email to its predictions, or to the
+         exception raised while fetching them.
+        :rtype: dict
+        """
+        runner = bulk.BulkRunner(max_workers)
+        try:
+            return runner.map(self.predictions, set(emails))
+        finally:
+            runner.finish()
 
@@ -0,0 +1,77 @@
+from simplerelevance.api import SimpleRelevance
+from simplerelevance.executor import BoundedExecutor
+
+
+def _deferred(name):
+    def method(self, *args, **kwargs):
+        return self.client.submit(name, *args, **kwargs)
+
+    method.__name__ = name
+    method.__doc__ = getattr(SimpleRelevance, name).__doc__
+
+    return method
+
+
+class AsyncSimpleRelevance(object):
+    """
+     Non-blocking counterpart of ``SimpleRelevance``. Every public method
+    takes the same arguments but returns a ``Future`` straight away; the
+    call itself runs on a bounded pool of workers sharing one pool of
+    keep-alive connections.
+
+     Requests are built and responses decoded by a wrapped
+    ``SimpleRelevance``, so both clients behave the same.
+    """
+
+    def __init__(self, api_key, business_name, async=0, transport=None,
+                 max_concurrency=10, max_queue=None, reject='block'):
+        """
+        :param api_key: Your password is your API key.
+        :type api_key: str
+
+        :param business_name: Business name you signed up with.
+        :type business_name: str
+
+        :param async: See ``SimpleRelevance``.
+        :type async: int
+
+        :param transport: Sends the requests over the wire, defaults to a
+         ``PooledTransport`` sized for ``max_concurrency``.
+        :type transport: simplerelevance.transport.Transport
+
+        :param max_concurrency: Most requests in flight at the same time,
+         anything beyond waits its turn.
+        :type max_concurrency: int
+
+        :param max_queue: Most calls waiting their turn, None for no limit.
+        :type max_queue: int
+
+        :param reject: What to do with a call made while ``max_queue`` are
+         waiting, see ``BoundedExecutor``.
+        :type reject: str
+        """
+        self.executor = BoundedExecutor(max_concurrency, max_queue, reject)
+        self.client = SimpleRelevance(api_key, business_name, async,
+                                      transport, executor=self.executor)
+
+    def close(self, wait=True):
+        """
+        :param wait: Wait for calls already submitted to finish.
+        :type wait: bool
+        """
+        self.client.close(wait)
+
+    users = _deferred('users')
+    user_add = _deferred('user_add')
+    user_delete = _deferred('user_delete')
+    items = _deferred('items')
+    item_add = _deferred('item_add')
+    item_update = _deferred('item_update')
+    item_delete = _deferred('item_delete')
+    actions = _deferred('actions')
+    action_add = _deferred('action_add')
+    action_update = _deferred('action_update')
+    attributes = _deferred('attributes')
+    attribute_update = _deferred('attribute_update')
+    attribute_delete = _deferred('attribute_delete')
+    predictions = _deferred('predictions')
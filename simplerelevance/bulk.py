@@ -0,0 +1,268 @@
+import itertools
+import sys
+import threading
+import time
+
+from simplerelevance.constants.endpoint import EndPoint
+from simplerelevance.executor import BoundedExecutor
+from simplerelevance.retry import transient
+
+# Failures a BulkRunner keeps in its result, so memory stays flat however
+# many records fail; on_result sees every one of them.
+FAILED_SAMPLE = 100
+
+
+class BulkResult(object):
+    """
+    Summary of a bulk call: how many records went through, which ones
+    failed and why, and how fast it went.
+    """
+
+    def __init__(self, keep_failed=None):
+        """
+        :param keep_failed: Most failures listed in ``failed``, the rest
+         are only counted in ``failures``. None lists them all.
+        :type keep_failed: int
+        """
+        self.succeeded = 0
+        self.failures = 0
+        self.failed = []
+        self.keep_failed = keep_failed
+        self.started = time.time()
+        self.finished = None
+
+    @property
+    def total(self):
+        return self.succeeded + self.failures
+
+    @property
+    def elapsed(self):
+        return (self.finished or time.time()) - self.started
+
+    @property
+    def throughput(self):
+        """
+        Records per second.
+
+        :rtype: float
+        """
+        elapsed = self.elapsed
+        if not elapsed:
+            return 0.0
+        return self.total / elapsed
+
+    def __repr__(self):
+        return '<BulkResult succeeded=%d failed=%d %.1f/s>' % (
+            self.succeeded, self.failures, self.throughput
+        )
+
+
+class BulkRunner(object):
+    """
+     Sends records through a ``BoundedExecutor``, never holding more than
+    ``max_in_flight`` of them at once: ``submit`` blocks until there is
+    room, which keeps memory flat however long the input is.
+    """
+
+    def __init__(self, max_workers=4, max_in_flight=None, on_result=None,
+                 retry=None):
+        """
+        :param max_workers: Requests sent at the same time.
+        :type max_workers: int
+
+        :param max_in_flight: Records submitted but not finished yet,
+         defaults to twice ``max_workers``.
+        :type max_in_flight: int
+
+        :param on_result: Called as ``on_result(index, record, result,
+         error)`` once for every record, from a worker thread. The result
+         only lists the first ``FAILED_SAMPLE`` failures.
+        :type on_result: callable
+
+        :param retry: How a record, or a lookup, failing with a transient
+         error is retried before it counts as failed. Writes are sent again,
+         so the API may see them twice. None tries once.
+        :type retry: simplerelevance.retry.RetryPolicy
+        """
+        self.executor = BoundedExecutor(max_workers)
+        self.on_result = on_result
+        self.retry = retry
+        self.result = BulkResult(FAILED_SAMPLE)
+
+        self._slots = threading.BoundedSemaphore(
+            max_in_flight or max_workers * 2
+        )
+        self._lock = threading.Lock()
+
+    def _done(self, index, record, result, error):
+        with self._lock:
+            if error is None:
+                self.result.succeeded += 1
+            else:
+                self.result.failures += 1
+                keep = self.result.keep_failed
+                if keep is None or len(self.result.failed) < keep:
+                    self.result.failed.append((index, record, error))
+
+        if self.on_result is not None:
+            self.on_result(index, record, result, error)
+
+    def fail(self, index, record, error):
+        """
+        Count ``record`` as failed without sending it.
+        """
+        self._done(index, record, None, error)
+
+    def _call(self, fn, *args, **kwargs):
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                if (self.retry is None or
+                        attempt >= self.retry.max_attempts or
+                        not transient(e)):
+                    raise
+            time.sleep(self.retry.delay(attempt))
+
+    def submit(self, index, record, fn, *args, **kwargs):
+        self._slots.acquire()
+
+        def run():
+            try:
+                result = self._call(fn, *args, **kwargs)
+            except Exception:
+                self._done(index, record, None, sys.exc_info()[1])
+            else:
+                self._done(index, record, result, None)
+            finally:
+                self._slots.release()
+
+        self.executor.submit(run)
+
+    def map(self, fn, keys):
+        """
+        Call ``fn`` once for each key, in parallel, and wait for them all.
+
+        :return: Mapping of key to its result or the exception it raised.
+        :rtype: dict
+        """
+        futures = dict((key, self.executor.submit(self._call, fn, key))
+                       for key in keys)
+        resolved = {}
+        for key, future in futures.items():
+            error = future.exception()
+            resolved[key] = error if error is not None else future.result()
+
+        return resolved
+
+    def finish(self):
+        """
+        Wait for everything submitted and return the summary.
+
+        :rtype: BulkResult
+        """
+        self.executor.shutdown(wait=True)
+        self.result.finished = time.time()
+
+        return self.result
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def add_actions(client, actions, max_workers=4, max_in_flight=None,
+                chunk_size=1000, on_result=None, retry=None):
+    """
+     Post ``actions`` read ``chunk_size`` at a time. The distinct items and
+    users in a chunk are resolved to guids once each, then every action of
+    the chunk is posted without any further lookup.
+
+    :param client: Client to send requests with.
+    :type client: simplerelevance.api.SimpleRelevance
+
+    :param actions: Dicts with the arguments of ``action_add``.
+    :type actions: iterable
+
+    :rtype: BulkResult
+    """
+    def post(data, record):
+        # A copy, as posting adds to it. Only actions the API took are
+        # learned from.
+        response = client.post(EndPoint.ACTIONS, dict(data))
+        client._learn(data, record.get('user_email'), record.get('user_id'))
+        return response
+
+    if client.outbox is not None:
+        # Logged as given, the guids are looked up on delivery.
+        return add_records(client.action_update, actions, max_workers,
+                           max_in_flight, on_result, retry)
+
+    runner = BulkRunner(max_workers, max_in_flight, on_result, retry)
+
+    for chunk in chunked(enumerate(actions), chunk_size):
+        item_guids = runner.map(
+            client.item_guid, set(r['item_id'] for _, r in chunk
+                                  if r.get('item_id'))
+        )
+        user_guids = runner.map(
+            client.user_guid,
+            set(r['user_email'] for _, r in chunk if r.get('user_email'))
+        )
+        user_external_ids = runner.map(
+            client.user_external_id,
+            set(r['user_id'] for _, r in chunk if r.get('user_id'))
+        )
+
+        for index, record in chunk:
+            data = dict((k, v) for k, v in record.items() if v)
+            if 'item_id' not in data:
+                runner.fail(index, record, ValueError('`item_id` is required'))
+                continue
+
+            data['item_guid'] = item_guids[data.pop('item_id')]
+            if 'user_email' in data:
+                data['user_guid'] = user_guids[data.pop('user_email')]
+            if 'user_id' in data:
+                data['user_external_id'] = user_external_ids[
+                    data.pop('user_id')
+                ]
+
+            errors = [v for v in data.values() if isinstance(v, Exception)]
+            if errors:
+                runner.fail(index, record, errors[0])
+                continue
+
+            runner.submit(index, record, post, data, record)
+
+    return runner.finish()
+
+
+def add_records(add, records, max_workers=4, max_in_flight=None,
+                on_result=None, retry=None):
+    """
+     Call ``add(**record)`` for every record on the worker pool, so the
+    JSON encoding and the request of each record both happen off the
+    calling thread.
+
+    :param add: Bound client method, such as ``client.user_add``.
+    :type add: callable
+
+    :param records: Dicts of keyword arguments for ``add``.
+    :type records: iterable
+
+    :rtype: BulkResult
+    """
+    runner = BulkRunner(max_workers, max_in_flight, on_result, retry)
+
+    for index, record in enumerate(records):
+        runner.submit(index, record, add, **record)
+
+    return runner.finish()
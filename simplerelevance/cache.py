@@ -0,0 +1,253 @@
+import threading
+import time
+from collections import OrderedDict
+
+from simplerelevance.executor import BoundedExecutor
+
+
+class LRUCache(object):
+    """
+    Thread-safe mapping that holds at most ``max_size`` entries, dropping
+    the least recently used one first, and forgets entries older than
+    ``ttl`` seconds.
+    """
+
+    def __init__(self, max_size=10000, ttl=300):
+        """
+        :param max_size: Most entries kept. 0 disables caching.
+        :type max_size: int
+
+        :param ttl: Seconds an entry stays valid. None keeps entries until
+         they are evicted.
+        :type ttl: int
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value, expires = self._data.pop(key)
+            except KeyError:
+                self.misses += 1
+                return default
+
+            if expires is not None and expires < time.time():
+                self.misses += 1
+                return default
+
+            self._data[key] = (value, expires)
+            self.hits += 1
+
+            return value
+
+    def set(self, key, value):
+        if self.max_size <= 0:
+            return
+
+        expires = None
+        if self.ttl is not None:
+            expires = time.time() + self.ttl
+
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = (value, expires)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def invalidate_value(self, value):
+        """
+        Drop every entry pointing at ``value``.
+        """
+        with self._lock:
+            for key in [k for k, v in self._data.items() if v[0] == value]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        """
+        :rtype: dict
+        """
+        return {
+            'size': len(self._data),
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+
+class GuidCache(object):
+    """
+     Remembers which guid belongs to an item external_id or to a user
+    email/external_id, so repeated actions on the same item or user don't
+    have to look them up again.
+    """
+
+    def __init__(self, max_size=10000, ttl=300):
+        """
+        :param max_size: Most items, and separately most users, remembered.
+         0 disables caching.
+        :type max_size: int
+
+        :param ttl: Seconds a resolved guid is trusted.
+        :type ttl: int
+        """
+        self.items = LRUCache(max_size, ttl)
+        self.users = LRUCache(max_size, ttl)
+
+    def invalidate_item(self, item_guid=None, item_external_id=None):
+        if item_external_id:
+            self.items.invalidate(item_external_id)
+        if item_guid:
+            self.items.invalidate_value(item_guid)
+
+    def invalidate_user(self, user_guid=None, user_external_id=None):
+        if user_external_id:
+            self.users.invalidate(('user_external_id', user_external_id))
+            self.users.invalidate_value(user_external_id)
+        if user_guid:
+            self.users.invalidate_value(user_guid)
+
+    def clear(self):
+        self.items.clear()
+        self.users.clear()
+
+    def stats(self):
+        """
+        :rtype: dict
+        """
+        return {
+            'items': self.items.stats(),
+            'users': self.users.stats(),
+        }
+
+
+class PredictionCache(object):
+    """
+     Caches predictions per email with stale-while-revalidate: for ``ttl``
+    seconds a cached prediction is served as is, for ``stale_ttl`` seconds
+    more it is still served straight away while a fresh one is fetched in
+    the background. Only a missing or long expired entry makes the caller
+    wait for the API.
+    """
+
+    def __init__(self, max_size=10000, ttl=300, stale_ttl=3600,
+                 refresh_workers=2):
+        """
+        :param max_size: Most emails remembered.
+        :type max_size: int
+
+        :param ttl: Seconds a prediction is fresh.
+        :type ttl: int
+
+        :param stale_ttl: Seconds after ``ttl`` a prediction may still be
+         served while it is refreshed.
+        :type stale_ttl: int
+
+        :param refresh_workers: Background refreshes run at the same time.
+        :type refresh_workers: int
+        """
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+        self.refresh_time = 0.0
+        self.refresh_time_max = 0.0
+
+        self._entries = LRUCache(max_size, ttl + stale_ttl)
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._executor = BoundedExecutor(refresh_workers)
+
+    def get(self, key, fetch):
+        """
+        :param key: Cache key, the email.
+        :type key: str
+
+        :param fetch: Called without arguments to get a fresh value.
+        :type fetch: callable
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            with self._lock:
+                self.misses += 1
+            return self._fetch(key, fetch)
+
+        value, fetched = entry
+        if time.time() - fetched <= self.ttl:
+            with self._lock:
+                self.hits += 1
+            return value
+
+        with self._lock:
+            self.stale_hits += 1
+            if key not in self._refreshing:
+                self._refreshing.add(key)
+                self._executor.submit(self._refresh, key, fetch)
+
+        return value
+
+    def _fetch(self, key, fetch):
+        started = time.time()
+        value = fetch()
+        self._entries.set(key, (value, time.time()))
+
+        elapsed = time.time() - started
+        with self._lock:
+            self.refreshes += 1
+            self.refresh_time += elapsed
+            self.refresh_time_max = max(self.refresh_time_max, elapsed)
+
+        return value
+
+    def _refresh(self, key, fetch):
+        try:
+            self._fetch(key, fetch)
+        except Exception:
+            with self._lock:
+                self.refresh_errors += 1
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def invalidate(self, key):
+        self._entries.invalidate(key)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self):
+        """
+        :rtype: dict
+        """
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            'size': len(self._entries),
+            'hits': self.hits,
+            'stale_hits': self.stale_hits,
+            'misses': self.misses,
+            'hit_rate': float(self.hits + self.stale_hits) / lookups
+            if lookups else 0.0,
+            'refreshes': self.refreshes,
+            'refresh_errors': self.refresh_errors,
+            'refresh_time_avg': self.refresh_time / self.refreshes
+            if self.refreshes else 0.0,
+            'refresh_time_max': self.refresh_time_max,
+        }
@@ -0,0 +1,197 @@
+import json
+import os
+import struct
+import threading
+import time
+import urllib2
+import urlparse
+import zlib
+
+from simplerelevance.transport import (GZIP_WBITS, PooledTransport,
+                                       Response, Transport)
+
+_length = struct.Struct('>I')
+
+
+def exchange_key(method, url, body=None):
+    """
+     Identify a request by method, path and parameters, in a stable
+    order. Scheme and host are left out, so a cassette recorded against
+    one server replays against another serving the same paths.
+
+     The key is unicode, as it is once read back from the cassette's JSON,
+    so non-ASCII parameters match on replay.
+
+    :rtype: unicode
+    """
+    parts = urlparse.urlsplit(url)
+    params = urlparse.parse_qsl(parts.query, keep_blank_values=True)
+    if body:
+        params.extend(urlparse.parse_qsl(body, keep_blank_values=True))
+
+    return u'%s %s?%s' % (
+        _text(method), _text(parts.path),
+        u'&'.join(u'%s=%s' % (_text(name), _text(value))
+                  for name, value in sorted(params))
+    )
+
+
+def _text(value):
+    if isinstance(value, unicode):
+        return value
+    return value.decode('utf-8', 'replace')
+
+
+def _key(method, url, body, headers):
+    # Compressed bodies are keyed by their content, so a cassette does not
+    # depend on ``compress_threshold``.
+    if body and (headers or {}).get('Content-Encoding') == 'gzip':
+        body = zlib.decompress(body, GZIP_WBITS)
+
+    return exchange_key(method, url, body)
+
+
+def read_index(path):
+    """
+     Map every exchange key of the cassette at ``path`` to the offsets of
+    its recorded responses, from the ``.idx`` file when there is one and
+    by scanning the cassette otherwise.
+
+    :rtype: dict
+    """
+    try:
+        with open(path + '.idx', 'rb') as index:
+            return json.load(index)
+    except (IOError, ValueError):
+        pass
+
+    index = {}
+    with open(path, 'rb') as cassette:
+        while True:
+            offset = cassette.tell()
+            header = cassette.read(_length.size)
+            if len(header) < _length.size:
+                break
+            size, = _length.unpack(header)
+            data = cassette.read(size)
+            if len(data) < size:
+                break
+            key = json.loads(zlib.decompress(data))['key']
+            index.setdefault(key, []).append(offset)
+
+    return index
+
+
+class RecordingTransport(Transport):
+    """
+     Sends requests through another transport and records every exchange
+    to a cassette at ``path``: zlib-compressed, length-prefixed JSON
+    records, plus a ``.idx`` file written by ``close`` mapping each request
+    to its records.
+    """
+
+    def __init__(self, path, transport=None):
+        """
+        :param path: Cassette file, appended to when it exists.
+        :type path: str
+
+        :param transport: Transport doing the actual requests, defaults to
+         a ``PooledTransport``.
+        :type transport: Transport
+        """
+        self.path = path
+        self.transport = transport or PooledTransport()
+
+        self._index = read_index(path) if os.path.exists(path) else {}
+        # The index is only rewritten by close, drop it meanwhile so a
+        # crash leaves a cassette that gets scanned rather than a stale one.
+        if os.path.exists(path + '.idx'):
+            os.remove(path + '.idx')
+        self._file = open(path, 'ab')
+        self._lock = threading.Lock()
+
+    def request(self, method, url, body=None, headers=None, timeout=None):
+        started = time.time()
+        response = self.transport.request(method, url, body, headers,
+                                          timeout)
+        elapsed = time.time() - started
+
+        key = _key(method, url, body, headers)
+        data = zlib.compress(json.dumps({
+            'key': key,
+            'status': response.status,
+            'reason': response.reason,
+            'headers': response.headers,
+            'body': response.body.encode('base64'),
+            'elapsed': elapsed,
+        }))
+
+        with self._lock:
+            offset = self._file.tell()
+            self._file.write(_length.pack(len(data)) + data)
+            self._file.flush()
+            self._index.setdefault(key, []).append(offset)
+
+        return response
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+            with open(self.path + '.idx', 'wb') as index:
+                json.dump(self._index, index)
+
+        self.transport.close()
+
+
+class ReplayTransport(Transport):
+    """
+     Answers requests from a cassette made by ``RecordingTransport``,
+    without any network. Lookups go through the index, so replaying costs
+    the same however large the cassette is. A request recorded several
+    times gets its responses in recorded order, the last one repeating.
+    """
+
+    def __init__(self, path, timing=False):
+        """
+        :param path: Cassette file.
+        :type path: str
+
+        :param timing: Take as long as the recorded request did, instead of
+         answering at once.
+        :type timing: bool
+        """
+        self.path = path
+        self.timing = timing
+
+        self._index = read_index(path)
+        self._file = open(path, 'rb')
+        self._played = {}
+        self._lock = threading.Lock()
+
+    def request(self, method, url, body=None, headers=None, timeout=None):
+        key = _key(method, url, body, headers)
+
+        with self._lock:
+            offsets = self._index.get(key)
+            if not offsets:
+                raise urllib2.URLError('no recorded response for %s' % key)
+
+            played = self._played.get(key, 0)
+            self._played[key] = played + 1
+
+            self._file.seek(offsets[min(played, len(offsets) - 1)])
+            size, = _length.unpack(self._file.read(_length.size))
+            record = json.loads(zlib.decompress(self._file.read(size)))
+
+        if self.timing:
+            time.sleep(record['elapsed'])
+
+        return Response(
+            record['status'],
+            record['reason'],
+            record['headers'],
+            record['body'].decode('base64')
+        )
+
+    def close(self):
+        self._file.close()
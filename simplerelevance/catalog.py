@@ -0,0 +1,288 @@
+import threading
+import time
+
+from simplerelevance.constants.attributeclassid import AttributeClassID
+
+
+def _field(attribute, name):
+    # The full and the "simple" answers do not name the fields alike.
+    value = attribute.get('attribute_' + name)
+    if value is None:
+        value = attribute.get(name)
+    return value
+
+
+class _Index(object):
+    """
+    Attributes of one class, by guid and by name then value.
+    """
+
+    def __init__(self, attributes=()):
+        self.by_guid = {}
+        self.by_name = {}
+        for attribute in attributes:
+            self.add(attribute)
+
+    def add(self, attribute):
+        guid = attribute.get('guid')
+        if guid is None:
+            return
+
+        self.remove(guid)
+        self.by_guid[guid] = attribute
+        self.by_name.setdefault(_field(attribute, 'name'), {})[
+            _field(attribute, 'value')
+        ] = guid
+
+    def remove(self, guid):
+        attribute = self.by_guid.pop(guid, None)
+        if attribute is None:
+            return
+
+        name = _field(attribute, 'name')
+        values = self.by_name.get(name, {})
+        if values.get(_field(attribute, 'value')) == guid:
+            del values[_field(attribute, 'value')]
+        if not values:
+            self.by_name.pop(name, None)
+
+    def remove_name(self, name):
+        for guid in self.by_name.get(name, {}).values():
+            self.remove(guid)
+
+
+class AttributeCatalog(object):
+    """
+     In-process copy of the attribute catalog, so attribute names and
+    values resolve to guids without asking the API.
+
+     Each class is loaded in the background, with
+    ``return_type="simple"``. The client adds and removes the attributes
+    it writes, and names the catalog does not know yet, including before
+    the load is over, are fetched on their own. The API has no change
+    feed, so changes made elsewhere are picked up by reloading every
+    ``refresh_interval`` seconds, swapping in the new index in one go.
+    Writes made while a class is reloaded are applied to its new index
+    too, as the reload may have missed them.
+    """
+
+    def __init__(self, class_ids=(AttributeClassID.USER,
+                                  AttributeClassID.ITEM),
+                 refresh_interval=300):
+        """
+        :param class_ids: Attribute classes to keep, see
+         ``AttributeClassID``.
+        :type class_ids: tuple
+
+        :param refresh_interval: Seconds between two reloads, None loads
+         only once.
+        :type refresh_interval: float
+        """
+        self.class_ids = class_ids
+        self.refresh_interval = refresh_interval
+
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refreshed = None
+
+        self._indexes = {}
+        # Writes made during a refresh, None when there is none running.
+        self._writes = None
+        self._fetch = None
+        self._lock = threading.RLock()
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, fetch):
+        """
+        Load the catalog and keep it fresh, in the background.
+
+        :param fetch: Called as ``fetch(class_id, attribute_name=None)``
+         and returns the matching attributes, such as a wrapper of
+         ``SimpleRelevance.attributes``.
+        :type fetch: callable
+        """
+        self._fetch = fetch
+
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run)
+            self._thread.daemon = True
+            self._thread.start()
+
+    def stop(self, timeout=5.0):
+        """
+        Stop refreshing in the background.
+
+        :param timeout: Seconds to wait for a refresh in flight, None waits
+         for as long as it takes. The thread is a daemon, so one that hangs
+         in the API past this doesn't hold up the process either.
+        :type timeout: float
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            if not self._thread.is_alive():
+                self._thread = None
+
+    def _run(self):
+        while True:
+            try:
+                self.refresh()
+            except Exception:
+                # Keep serving the current copy, the next refresh may
+                # do better.
+                pass
+
+            if (not self.refresh_interval or
+                    self._stop.wait(self.refresh_interval)):
+                return
+
+    def refresh(self):
+        """
+        Reload every class from the API.
+        """
+        with self._refresh_lock:
+            with self._lock:
+                self._writes = []
+            try:
+                for class_id in self.class_ids:
+                    index = _Index(self._fetch(class_id))
+                    with self._lock:
+                        for write in self._writes:
+                            self._apply(index, class_id, *write)
+                        self._indexes[class_id] = index
+            finally:
+                with self._lock:
+                    self._writes = None
+
+        self.refreshes += 1
+        self.refreshed = time.time()
+
+    @staticmethod
+    def _apply(index, class_id, kind, write_class_id, value):
+        if kind == 'add':
+            if write_class_id == class_id:
+                index.add(value)
+        elif kind == 'remove':
+            index.remove(value)
+        else:
+            index.remove_name(value)
+
+    def _record(self, kind, class_id, value):
+        # Called with the lock held.
+        if self._writes is not None:
+            self._writes.append((kind, class_id, value))
+
+    def _index(self, class_id):
+        index = self._indexes.get(class_id)
+        if index is None:
+            index = self._indexes[class_id] = _Index()
+        return index
+
+    def add(self, class_id, attribute):
+        """
+        Record an attribute created or changed by this process.
+
+        :param class_id: User (0) or item (1) attribute.
+        :type class_id: int
+
+        :param attribute: The attribute as returned by the API.
+        :type attribute: dict
+        """
+        with self._lock:
+            self._index(class_id).add(attribute)
+            self._record('add', class_id, attribute)
+
+    def remove(self, guid):
+        """
+        Forget an attribute deleted by this process.
+        """
+        with self._lock:
+            for index in self._indexes.values():
+                index.remove(guid)
+            self._record('remove', None, guid)
+
+    def remove_name(self, attribute_name):
+        """
+        Forget every value of an attribute deleted by this process.
+        """
+        with self._lock:
+            for index in self._indexes.values():
+                index.remove_name(attribute_name)
+            self._record('remove_name', None, attribute_name)
+
+    def get(self, guid):
+        """
+        :return: The attribute with this guid, None when unknown.
+        :rtype: dict
+        """
+        with self._lock:
+            for index in self._indexes.values():
+                attribute = index.by_guid.get(guid)
+                if attribute is not None:
+                    return attribute
+
+    def guids(self, class_id, attribute_name):
+        """
+        :return: Mapping of every value of the attribute to its guid,
+         fetching the attribute when it is not known yet.
+        :rtype: dict
+        """
+        with self._lock:
+            values = self._index(class_id).by_name.get(attribute_name)
+            if values is not None:
+                self.hits += 1
+                return dict(values)
+            self.misses += 1
+
+        if self._fetch is None:
+            return {}
+
+        attributes = self._fetch(class_id, attribute_name)
+        with self._lock:
+            index = self._index(class_id)
+            for attribute in attributes:
+                index.add(attribute)
+                self._record('add', class_id, attribute)
+            return dict(index.by_name.get(attribute_name, {}))
+
+    def guid(self, class_id, attribute_name, attribute_value=None):
+        """
+        :param class_id: User (0) or item (1) attribute.
+        :type class_id: int
+
+        :param attribute_name: Name of the attribute.
+        :type attribute_name: str
+
+        :param attribute_value: Value of the attribute, needed when the
+         name has several.
+        :type attribute_value: str
+
+        :return: Guid of the attribute, None when there is no such
+         attribute.
+        :rtype: int
+        """
+        values = self.guids(class_id, attribute_name)
+        if attribute_value is None and len(values) == 1:
+            return values.values()[0]
+
+        return values.get(attribute_value)
+
+    def stats(self):
+        """
+        :rtype: dict
+        """
+        with self._lock:
+            attributes = sum(len(index.by_guid)
+                             for index in self._indexes.values())
+
+        return {
+            'attributes': attributes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'refreshes': self.refreshes,
+            'refreshed': self.refreshed,
+        }
@@ -0,0 +1,160 @@
+import argparse
+import datetime
+import os
+import sys
+
+from simplerelevance.api import SimpleRelevance
+from simplerelevance.export import ActionExport, parse_datetime
+from simplerelevance.importer import Importer
+from simplerelevance.transport import PooledTransport
+
+
+def client_for(args):
+    """
+    Build a client from the command line options, falling back on the
+    SIMPLERELEVANCE_API_KEY and SIMPLERELEVANCE_BUSINESS_NAME environment
+    variables for the credentials.
+
+    :rtype: SimpleRelevance
+    """
+    api_key = args.api_key or os.environ.get('SIMPLERELEVANCE_API_KEY')
+    business_name = (args.business_name or
+                     os.environ.get('SIMPLERELEVANCE_BUSINESS_NAME'))
+    if not api_key or not business_name:
+        raise SystemExit('An API key and a business name are required.')
+
+    transport = PooledTransport(pool_size=args.workers,
+                                per_host=args.workers)
+    client = SimpleRelevance(api_key, business_name, int(args.async),
+                             transport)
+    if args.api_url:
+        client.api_url = args.api_url
+
+    return client
+
+
+def report(checkpoint, throughput):
+    sys.stderr.write('\r%d records, %d failed, %.1f records/s ' % (
+        checkpoint.records, checkpoint.failed, throughput
+    ))
+    sys.stderr.flush()
+
+
+def import_command(args):
+    client = client_for(args)
+    importer = Importer(client, args.kind, args.file, args.format,
+                        args.checkpoint, args.errors, args.workers,
+                        report=report)
+    try:
+        result = importer.run(args.restart)
+    except KeyboardInterrupt:
+        print '\nInterrupted, run the same command again to resume.'
+        return 130
+    finally:
+        client.close()
+        sys.stderr.write('\n')
+
+    print '%d succeeded, %d failed in %.1fs' % (
+        result.succeeded, result.failures, result.elapsed
+    )
+    for index, record, error in result.failed:
+        print 'Failed %r: %s' % (record, error)
+    if result.failures > len(result.failed):
+        print '... and %d more' % (result.failures - len(result.failed))
+    if result.failures:
+        print 'Failed records are in %s, import it to send them again' % (
+            importer.errors_path
+        )
+        return 1
+
+    return 0
+
+
+def export_command(args):
+    client = client_for(args)
+    filters = {}
+    if args.action_type is not None:
+        filters['action_type'] = args.action_type
+
+    export = ActionExport(client, args.file, parse_datetime(args.start),
+                          parse_datetime(args.end),
+                          datetime.timedelta(hours=args.shard_hours),
+                          args.format, args.workers, args.page_size,
+                          **filters)
+    try:
+        result = export.run()
+    except KeyboardInterrupt:
+        print 'Interrupted, run the same command again to resume.'
+        return 130
+    finally:
+        client.close()
+
+    records = sum(shard['records'] for shard in export.completed().values())
+    print '%d of %d shards exported, %d records in %s' % (
+        len(export.shards) - result.failures, len(export.shards),
+        records, args.file
+    )
+    for index, (start, end), error in result.failed:
+        print 'Failed %s to %s: %s' % (start, end, error)
+    if result.failures > len(result.failed):
+        print '... and %d more' % (result.failures - len(result.failed))
+
+    return 1 if result.failures else 0
+
+
+def parser():
+    """
+    :rtype: argparse.ArgumentParser
+    """
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--api-key')
+    common.add_argument('--business-name')
+    common.add_argument('--api-url', help='Send requests to another server.')
+    common.add_argument('--async', action='store_true',
+                        help='Let the API process writes asynchronously.')
+    common.add_argument('--workers', type=int, default=8,
+                        help='Requests sent at the same time.')
+
+    parser = argparse.ArgumentParser(prog='python -m simplerelevance')
+    commands = parser.add_subparsers()
+
+    importing = commands.add_parser(
+        'import', parents=[common],
+        help='Upload users, items or actions from a CSV or JSONL file.'
+    )
+    importing.add_argument('kind', choices=['users', 'items', 'actions'])
+    importing.add_argument('file')
+    importing.add_argument('--format', choices=['csv', 'jsonl'],
+                           help='Defaults to the file extension.')
+    importing.add_argument('--checkpoint',
+                           help='Defaults to FILE.checkpoint.')
+    importing.add_argument('--errors', help='Defaults to FILE.errors.')
+    importing.add_argument('--restart', action='store_true',
+                           help='Ignore the checkpoint.')
+    importing.set_defaults(command=import_command)
+
+    exporting = commands.add_parser(
+        'export', parents=[common],
+        help='Download the actions of a time range to a file.'
+    )
+    exporting.add_argument('file')
+    exporting.add_argument('--start', required=True,
+                           help='YYYY-MM-DD or YYYY-MM-DD HH:MM:SS')
+    exporting.add_argument('--end', required=True,
+                           help='YYYY-MM-DD or YYYY-MM-DD HH:MM:SS, '
+                                'excluded')
+    exporting.add_argument('--shard-hours', type=float, default=24,
+                           help='Length of the time range of a shard.')
+    exporting.add_argument('--format', choices=['jsonl', 'columns'],
+                           default='jsonl')
+    exporting.add_argument('--action-type', type=int,
+                           help='Defaults to the API default, clicks.')
+    exporting.add_argument('--page-size', type=int, default=1000)
+    exporting.set_defaults(command=export_command)
+
+    return parser
+
+
+def main(argv=None):
+    args = parser().parse_args(argv)
+    return args.command(args)
@@ -0,0 +1,37 @@
+class Params:
+    """
+    Names of the request parameters each method sends, in the same order
+    as the method's arguments.
+    """
+    USERS = (
+        'user_email', 'user_external_id', 'city', 'state', 'market',
+        'zipcode', 'radius', 'attribute_guids_or', 'attribute_guids_and',
+        'batch_guids', 'return_time_of_day', 'page', 'page_size'
+    )
+    USER_DELETE = ('user_guid', 'user_external_id')
+    ITEMS = (
+        'item_name', 'item_external_id', 'item_guid', 'city', 'state',
+        'latitude', 'longtitude', 'market', 'zipcode', 'radius',
+        'attribute_guids_or', 'attribute_guids_and', 'variant_filters',
+        'batch_guids', 'skip_useraction_return', 'filter_expired', 'page',
+        'page_size'
+    )
+    ITEM_DELETE = ('item_guid', 'item_external_id')
+    ACTIONS = (
+        'user_guid', 'item_guid', 'city', 'state', 'latitude', 'longitude',
+        'action_type', 'market', 'zipcode', 'radius',
+        'item_attribute_guids_or', 'item_attribute_guids_and',
+        'user_attribute_guids_or', 'user_attribute_guids_and',
+        'datetime_start', 'datetime_end', 'page', 'page_size'
+    )
+    ACTION_UPDATE = (
+        'item_id', 'item_name', 'user_email', 'user_id', 'action_type'
+    )
+    ATTRIBUTES = (
+        'class_id', 'guid', 'attribute_name', 'guidlist', 'return_type'
+    )
+    ATTRIBUTE_UPDATE = (
+        'class_id', 'guid', 'user_guid', 'item_guid', 'attribute_name',
+        'attribute_value'
+    )
+    ATTRIBUTE_DELETE = ('guid', 'user_guid', 'item_guid', 'attribute_name')
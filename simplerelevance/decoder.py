@@ -0,0 +1,24 @@
+try:
+    import ujson as backend
+except ImportError:
+    try:
+        import simplejson as backend
+    except ImportError:
+        import json as backend
+
+
+def loads(body):
+    """
+     Decode a JSON response body with the fastest backend installed:
+    ``ujson``, then ``simplejson``, then the standard ``json`` module.
+    An empty body decodes to an empty dict.
+
+    :param body: Raw response body.
+    :type body: str
+
+    :rtype: dict
+    """
+    if not body:
+        return {}
+
+    return backend.loads(body)
@@ -0,0 +1,94 @@
+import threading
+
+from simplerelevance.cache import LRUCache
+from simplerelevance.singleflight import SingleFlight
+
+
+class WriteDeduplicator(object):
+    """
+     Absorbs repeated writes locally. A write identical to one sent less
+    than ``window`` seconds ago, or to one still in flight, gets that
+    write's response instead of a request of its own. Writes given the
+    same idempotency key are absorbed for ``key_ttl`` seconds, whatever
+    their content.
+
+     Failed writes are not remembered, so repeating them sends them again.
+    """
+
+    def __init__(self, window=1.0, key_ttl=3600, max_size=100000):
+        """
+        :param window: Seconds during which identical writes are absorbed.
+        :type window: float
+
+        :param key_ttl: Seconds an idempotency key is remembered.
+        :type key_ttl: float
+
+        :param max_size: Most writes remembered, of each kind.
+        :type max_size: int
+        """
+        self.window = window
+        self.key_ttl = key_ttl
+
+        self.sent = 0
+        self.absorbed = 0
+
+        self._recent = LRUCache(max_size, window)
+        self._keys = LRUCache(max_size, key_ttl)
+        self._single_flight = SingleFlight()
+        self._lock = threading.Lock()
+
+    def do(self, key, send, idempotency_key=None, endpoint=None):
+        """
+        :param key: Identifies the write by content.
+        :type key: hashable
+
+        :param send: Sends the write and returns its response.
+        :type send: callable
+
+        :param idempotency_key: Identifies the write regardless of its
+         content.
+        :type idempotency_key: hashable
+
+        :param endpoint: Where the write goes, so the same idempotency key
+         can be used on different endpoints.
+        :type endpoint: str
+
+        :return: The response of the write, or of the one it repeats.
+        """
+        if idempotency_key is not None:
+            cache = self._keys
+            key = ('idempotency', endpoint, idempotency_key)
+        else:
+            cache = self._recent
+
+        response = cache.get(key)
+        if response is not None:
+            self._count(absorbed=True)
+            return response
+
+        calls = []
+
+        def once():
+            calls.append(True)
+            return send()
+
+        response = self._single_flight.do(key, once)
+        self._count(absorbed=not calls)
+        if calls:
+            cache.set(key, response)
+
+        return response
+
+    def _count(self, absorbed):
+        with self._lock:
+            if absorbed:
+                self.absorbed += 1
+            else:
+                self.sent += 1
+
+    def stats(self):
+        """
+        :rtype: dict
+        """
+        with self._lock:
+            return {'sent': self.sent, 'absorbed': self.absorbed}
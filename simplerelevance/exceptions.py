@@ -0,0 +1,43 @@
+import urllib2
+
+
+class APIError(urllib2.URLError):
+    """
+    The API answered with an error status.
+    """
+
+    def __init__(self, code, body):
+        """
+        :param code: HTTP status code.
+        :type code: int
+
+        :param body: Response body.
+        :type body: str
+        """
+        urllib2.URLError.__init__(self, "%s:\n\t%s" % (code, body))
+        self.code = code
+        self.body = body
+
+
+class CircuitOpenError(urllib2.URLError):
+    """
+    The request was not sent because the API has been failing.
+    """
+
+
+class DeadlineExceeded(urllib2.URLError):
+    """
+    The call ran out of time before it could complete.
+    """
+
+
+class RejectedError(RuntimeError):
+    """
+    The call was not queued because too many were already waiting.
+    """
+
+
+class UnresolvedError(LookupError):
+    """
+    The API does not know the item or user a request refers to.
+    """
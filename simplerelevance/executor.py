@@ -0,0 +1,254 @@
+import Queue
+import sys
+import threading
+
+from simplerelevance.exceptions import RejectedError
+
+try:
+    from concurrent.futures import Future
+except ImportError:
+    class Future(object):
+        """
+        Minimal stand-in for ``concurrent.futures.Future``, used when the
+        ``futures`` backport is not installed.
+        """
+
+        def __init__(self):
+            self._condition = threading.Condition()
+            self._state = 'PENDING'
+            self._result = None
+            self._exception = None
+            self._traceback = None
+            self._callbacks = []
+
+        def cancel(self):
+            with self._condition:
+                if self._state != 'PENDING':
+                    return self._state == 'CANCELLED'
+                self._state = 'CANCELLED'
+                self._condition.notify_all()
+            self._invoke_callbacks()
+            return True
+
+        def cancelled(self):
+            return self._state == 'CANCELLED'
+
+        def running(self):
+            return self._state == 'RUNNING'
+
+        def done(self):
+            return self._state in ('CANCELLED', 'FINISHED')
+
+        def set_running_or_notify_cancel(self):
+            with self._condition:
+                if self._state == 'CANCELLED':
+                    return False
+                self._state = 'RUNNING'
+                return True
+
+        def _wait(self, timeout):
+            with self._condition:
+                if not self.done():
+                    self._condition.wait(timeout)
+                if self._state == 'CANCELLED':
+                    raise RuntimeError('Future was cancelled.')
+                if not self.done():
+                    raise RuntimeError('Future timed out.')
+
+        def result(self, timeout=None):
+            self._wait(timeout)
+            if self._exception is not None:
+                raise self._exception.__class__, self._exception, \
+                    self._traceback
+            return self._result
+
+        def exception(self, timeout=None):
+            self._wait(timeout)
+            return self._exception
+
+        def add_done_callback(self, fn):
+            with self._condition:
+                if not self.done():
+                    self._callbacks.append(fn)
+                    return
+            fn(self)
+
+        def set_result(self, result):
+            with self._condition:
+                self._result = result
+                self._state = 'FINISHED'
+                self._condition.notify_all()
+            self._invoke_callbacks()
+
+        def set_exception_info(self, exception, traceback):
+            with self._condition:
+                self._exception = exception
+                self._traceback = traceback
+                self._state = 'FINISHED'
+                self._condition.notify_all()
+            self._invoke_callbacks()
+
+        def set_exception(self, exception):
+            self.set_exception_info(exception, None)
+
+        def _invoke_callbacks(self):
+            for callback in self._callbacks:
+                try:
+                    callback(self)
+                except Exception:
+                    pass
+
+
+class BoundedExecutor(object):
+    """
+     Runs callables on a fixed number of worker threads. Submitting never
+    starts more than ``max_workers`` calls at once; the rest wait in the
+    queue.
+
+     When ``max_queue`` calls are already waiting, ``reject`` decides what
+    happens to the next one: 'block' waits for room, 'abort' raises
+    ``RejectedError`` and 'caller_runs' runs it in the submitting thread,
+    which slows the producer down to the pace of the workers.
+    """
+
+    POLICIES = ('block', 'abort', 'caller_runs')
+
+    def __init__(self, max_workers=10, max_queue=None, reject='block'):
+        """
+        :param max_workers: Number of calls allowed to run at the same time.
+        :type max_workers: int
+
+        :param max_queue: Most calls waiting for a worker, None for no
+         limit.
+        :type max_queue: int
+
+        :param reject: What to do with a call submitted while the queue is
+         full, one of ``POLICIES``.
+        :type reject: str
+        """
+        if max_workers < 1:
+            raise ValueError('`max_workers` must be at least 1')
+        if reject not in self.POLICIES:
+            raise ValueError("'%s' is not a known policy." % reject)
+
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.reject = reject
+        self.rejected = 0
+        self._queue = Queue.Queue(max_queue or 0)
+        self._workers = []
+        self._exited = 0
+        self._lock = threading.Lock()
+        self._shutdown = False
+
+    def _start_worker(self):
+        with self._lock:
+            if len(self._workers) >= self.max_workers or self._shutdown:
+                return
+            worker = threading.Thread(target=self._work)
+            worker.daemon = True
+            worker.start()
+            self._workers.append(worker)
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                with self._lock:
+                    self._exited += 1
+                    last = self._exited == len(self._workers)
+                if last:
+                    # Calls that raced shutdown into the queue behind the
+                    # stop signals would never run.
+                    self._cancel_queued()
+                return
+
+            self._run(*item)
+
+    @staticmethod
+    def _run(future, fn, args, kwargs):
+        if not future.set_running_or_notify_cancel():
+            return
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException:
+            e_type, e, tb = sys.exc_info()
+            if hasattr(future, 'set_exception_info'):
+                future.set_exception_info(e, tb)
+            else:
+                future.set_exception(e)
+        else:
+            future.set_result(result)
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Schedule ``fn(*args, **kwargs)``.
+
+        :rtype: Future
+        """
+        if self._shutdown:
+            raise RuntimeError('Cannot submit after shutdown.')
+
+        future = Future()
+        item = (future, fn, args, kwargs)
+        if len(self._workers) < self.max_workers:
+            self._start_worker()
+
+        try:
+            self._queue.put(item, self.reject == 'block')
+            if self._shutdown:
+                # Shut down meanwhile, the call may be queued behind the
+                # stop signals; cancelling fails if it is already running.
+                future.cancel()
+        except Queue.Full:
+            with self._lock:
+                self.rejected += 1
+            if self.reject == 'abort':
+                raise RejectedError(
+                    '%d calls are already waiting.' % self.max_queue
+                )
+            self._run(*item)
+
+        return future
+
+    def pending(self):
+        """
+        :return: Number of calls waiting for a worker.
+        :rtype: int
+        """
+        return self._queue.qsize()
+
+    def _cancel_queued(self):
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except Queue.Empty:
+                return
+            if item is not None:
+                item[0].cancel()
+
+    def shutdown(self, wait=True, cancel=False):
+        """
+        Stop accepting work; let the workers finish what is queued.
+
+        :param wait: Block until every queued call has run.
+        :type wait: bool
+
+        :param cancel: Cancel the calls still waiting for a worker instead
+         of running them.
+        :type cancel: bool
+        """
+        with self._lock:
+            self._shutdown = True
+            workers = list(self._workers)
+
+        if cancel:
+            self._cancel_queued()
+
+        for _ in workers:
+            self._queue.put(None)
+
+        if wait:
+            for worker in workers:
+                worker.join()
@@ -0,0 +1,309 @@
+import datetime
+import json
+import os
+import struct
+import threading
+import zlib
+
+from simplerelevance import bulk
+
+DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+_length = struct.Struct('>I')
+
+_SECOND = datetime.timedelta(seconds=1)
+
+
+def shards(start, end, size):
+    """
+     Split ``start`` to ``end`` into consecutive windows of ``size``, the
+    last one possibly shorter. The API takes both ends of a window as
+    included, at second resolution, so each window ends a second before
+    the next starts and no action is fetched twice.
+
+    :param start: Start of the range.
+    :type start: datetime.datetime
+
+    :param end: End of the range, excluded.
+    :type end: datetime.datetime
+
+    :param size: Length of a window, at least a second.
+    :type size: datetime.timedelta
+
+    :rtype: list of tuple
+    """
+    if size < _SECOND:
+        raise ValueError('Shards must be at least a second long.')
+
+    windows = []
+    while start < end:
+        windows.append((start, min(start + size, end) - _SECOND))
+        start += size
+
+    return windows
+
+
+def read_jsonl(path):
+    """
+    Yield the records of a JSONL export.
+
+    :rtype: generator
+    """
+    with open(path, 'rb') as export:
+        for line in export:
+            yield json.loads(line)
+
+
+def read_columns(path):
+    """
+     Yield the records of a columnar export. Each shard is stored as one
+    block: a 4-byte length, then zlib-compressed JSON mapping every field
+    to the list of its values, one per record.
+
+    :rtype: generator
+    """
+    for columns in read_blocks(path):
+        names = columns.keys()
+        for values in zip(*[columns[name] for name in names]):
+            yield dict(zip(names, values))
+
+
+def read_blocks(path):
+    """
+    Yield the blocks of a columnar export, as a dict of columns each.
+
+    :rtype: generator
+    """
+    with open(path, 'rb') as export:
+        while True:
+            header = export.read(_length.size)
+            if len(header) < _length.size:
+                return
+            size, = _length.unpack(header)
+            yield json.loads(zlib.decompress(export.read(size)))
+
+
+def columns(records):
+    """
+    Turn records into a dict of columns, ``None`` filling the fields a
+    record does not have.
+
+    :rtype: dict
+    """
+    names = sorted(set(name for record in records for name in record))
+    return dict((name, [record.get(name) for record in records])
+                for name in names)
+
+
+def _discard(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class ActionExport(object):
+    """
+     Exports actions between two datetimes to ``path``, fetching time
+    shards in parallel and appending each one to the file as it completes.
+
+     Completed shards are listed in ``path`` + ``.shards``, one JSON line
+    each, once their records are written. Running the export again only
+    fetches the shards missing from that list, and drops whatever a shard
+    interrupted halfway left at the end of the file. Records are in time
+    order within a shard but shards land in completion order.
+    """
+
+    def __init__(self, client, path, start, end, shard_size,
+                 format='jsonl', max_workers=4, page_size=1000, **filters):
+        """
+        :param client: Client to fetch with.
+        :type client: simplerelevance.api.SimpleRelevance
+
+        :param path: Export file.
+        :type path: str
+
+        :param start: Start of the exported range.
+        :type start: datetime.datetime
+
+        :param end: End of the exported range, excluded.
+        :type end: datetime.datetime
+
+        :param shard_size: Range fetched by a single worker.
+        :type shard_size: datetime.timedelta
+
+        :param format: 'jsonl', or 'columns' for zlib-compressed column
+         blocks, see ``read_columns``. A columnar shard is held in memory
+         while it is fetched.
+        :type format: str
+
+        :param max_workers: Shards fetched at the same time.
+        :type max_workers: int
+
+        :param page_size: Actions fetched per request within a shard.
+        :type page_size: int
+
+        :param filters: Other arguments of ``actions``, such as
+         ``action_type``.
+        """
+        if format not in ('jsonl', 'columns'):
+            raise ValueError("'%s' is not a known format." % format)
+
+        self.client = client
+        self.path = path
+        self.shards = shards(start, end, shard_size)
+        self.format = format
+        self.max_workers = max_workers
+        self.page_size = page_size
+        self.filters = filters
+
+        self._lock = threading.Lock()
+
+    @property
+    def manifest_path(self):
+        return self.path + '.shards'
+
+    def completed(self):
+        """
+         Shards already exported, by start and end, along with where their
+        records end in the file.
+
+        :rtype: dict
+        """
+        done = {}
+        try:
+            with open(self.manifest_path, 'rb') as manifest:
+                for line in manifest:
+                    if line.endswith('\n'):
+                        shard = json.loads(line)
+                        done[shard['start'], shard['end']] = shard
+        except IOError:
+            pass
+
+        return done
+
+    def _fetch(self, start, end):
+        records = self.client.iter_actions(
+            self.page_size,
+            False,
+            datetime_start=start.strftime(DATETIME_FORMAT),
+            datetime_end=end.strftime(DATETIME_FORMAT),
+            **self.filters
+        )
+
+        # Spool the shard to disk, so nothing reaches the export before the
+        # shard is complete.
+        spool = '%s.%s.part' % (self.path, start.strftime('%Y%m%d%H%M%S'))
+        count = 0
+        try:
+            with open(spool, 'wb') as part:
+                if self.format == 'jsonl':
+                    for record in records:
+                        part.write(json.dumps(record) + '\n')
+                        count += 1
+                else:
+                    block = list(records)
+                    count = len(block)
+                    if block:
+                        data = zlib.compress(json.dumps(columns(block)))
+                        part.write(_length.pack(len(data)) + data)
+        except BaseException:
+            _discard(spool)
+            raise
+
+        return spool, count
+
+    def _export_shard(self, start, end):
+        # Appended on the worker, so a shard that cannot be written counts
+        # as failed.
+        spool, count = self._fetch(start, end)
+        try:
+            self._append(start, end, spool, count)
+        finally:
+            _discard(spool)
+
+        return count
+
+    def _append(self, start, end, spool, count):
+        with self._lock:
+            size = self._export.tell()
+            manifest_size = self._manifest.tell()
+            try:
+                with open(spool, 'rb') as part:
+                    while True:
+                        chunk = part.read(64 * 1024)
+                        if not chunk:
+                            break
+                        self._export.write(chunk)
+                self._export.flush()
+                os.fsync(self._export.fileno())
+
+                self._manifest.write(json.dumps({
+                    'start': start.strftime(DATETIME_FORMAT),
+                    'end': end.strftime(DATETIME_FORMAT),
+                    'records': count,
+                    'offset': self._export.tell(),
+                }) + '\n')
+                self._manifest.flush()
+            except EnvironmentError:
+                # Leave no part of the shard for the next ones to land
+                # after.
+                self._export.truncate(size)
+                self._export.seek(size)
+                self._manifest.truncate(manifest_size)
+                self._manifest.seek(manifest_size)
+                raise
+
+    def _manifest_size(self):
+        # Leave out a line torn by a crash.
+        with open(self.manifest_path, 'rb') as manifest:
+            return manifest.read().rfind('\n') + 1
+
+    def run(self):
+        """
+        Fetch every shard not exported yet.
+
+        :return: Summary counting shards, not records.
+        :rtype: simplerelevance.bulk.BulkResult
+        """
+        done = self.completed()
+        pending = [
+            (start, end) for start, end in self.shards
+            if (start.strftime(DATETIME_FORMAT),
+                end.strftime(DATETIME_FORMAT)) not in done
+        ]
+
+        # Anything past the last completed shard is from one interrupted
+        # while being appended.
+        size = max([shard['offset'] for shard in done.values()] or [0])
+        self._export = open(self.path, 'ab')
+        self._export.truncate(size)
+        self._export.seek(size)
+        self._manifest = open(self.manifest_path, 'ab')
+        self._manifest.truncate(self._manifest_size())
+
+        runner = bulk.BulkRunner(self.max_workers)
+        try:
+            for index, shard in enumerate(pending):
+                runner.submit(index, shard, self._export_shard, *shard)
+        finally:
+            result = runner.finish()
+            self._export.close()
+            self._manifest.close()
+
+        return result
+
+
+def parse_datetime(value):
+    """
+    Parse 'YYYY-MM-DD' or 'YYYY-MM-DD HH:MM:SS'.
+
+    :rtype: datetime.datetime
+    """
+    for format in (DATETIME_FORMAT, '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d'):
+        try:
+            return datetime.datetime.strptime(value, format)
+        except ValueError:
+            pass
+
+    raise ValueError("'%s' is not a date or datetime." % value)
@@ -0,0 +1,333 @@
+import csv
+import json
+import os
+import threading
+import time
+
+from simplerelevance import bulk
+from simplerelevance.retry import RetryPolicy
+
+# Arguments of user_add, item_add and action_add; any other field of a user
+# or item goes into its data_dict.
+FIELDS = {
+    'users': ('email', 'zipcode', 'user_id', 'data_dict'),
+    'items': ('item_name', 'item_type', 'data_dict', 'variants'),
+    'actions': ('item_id', 'item_name', 'user_email', 'user_id',
+                'action_type'),
+}
+
+JSON_FIELDS = ('data_dict', 'variants')
+
+
+def guess_format(path):
+    """
+    :return: 'csv' or 'jsonl', from the file extension.
+    :rtype: str
+    """
+    if path.lower().endswith('.csv'):
+        return 'csv'
+    return 'jsonl'
+
+
+def _lines(stream, offsets):
+    # Read with readline rather than iterating the file, whose read-ahead
+    # buffer would make tell() useless.
+    while True:
+        line = stream.readline()
+        if not line:
+            return
+        offsets.append(stream.tell())
+        yield line
+
+
+def read_records(stream, format, fieldnames=None):
+    """
+     Read records one at a time from ``stream``, starting at its current
+    position.
+
+    :param stream: File opened in binary mode.
+    :type stream: file
+
+    :param format: 'csv' or 'jsonl'.
+    :type format: str
+
+    :param fieldnames: CSV column names, read from the first line when
+     not given.
+    :type fieldnames: list
+
+    :return: Generator of ``(record, offset)``, where offset is the
+     position in ``stream`` just past the record.
+    :rtype: generator
+    """
+    offsets = []
+    lines = _lines(stream, offsets)
+
+    if format == 'jsonl':
+        for line in lines:
+            if line.strip():
+                yield json.loads(line), offsets[-1]
+        return
+
+    reader = csv.reader(lines)
+    if fieldnames is None:
+        fieldnames = next(reader, None) or []
+    for row in reader:
+        if row:
+            yield dict(zip(fieldnames, row)), offsets[-1]
+
+
+def arguments(kind, record):
+    """
+     Turn an input record into keyword arguments of ``user_add``,
+    ``item_add`` or ``action_add``. CSV values are strings: empty ones are
+    dropped and, for users and items, JSON columns are decoded and unknown
+    columns are moved into ``data_dict``. Unknown action columns are
+    dropped.
+
+    :param kind: 'users', 'items' or 'actions'.
+    :type kind: str
+
+    :param record: One record as read from the input.
+    :type record: dict
+
+    :rtype: dict
+    """
+    fields = FIELDS[kind]
+    data = dict((k, v) for k, v in record.items() if v not in ('', None))
+
+    extra = dict((k, data.pop(k)) for k in data.keys() if k not in fields)
+
+    if kind == 'actions':
+        # Actions are resolved on the calling thread, so this must not
+        # raise; a bad action_type is left for the API to refuse.
+        action_type = data.get('action_type')
+        if isinstance(action_type, basestring) and action_type.isdigit():
+            data['action_type'] = int(action_type)
+        return data
+
+    for name in JSON_FIELDS:
+        if isinstance(data.get(name), basestring):
+            data[name] = json.loads(data[name])
+    if extra:
+        data['data_dict'] = dict(extra, **data.get('data_dict', {}))
+
+    return data
+
+
+class Checkpoint(object):
+    """
+     How far an import got: every record before ``records`` is done, and
+    the input resumes at byte ``offset``. Written to a temporary file then
+    renamed, so a crash never leaves it half written.
+    """
+
+    def __init__(self, path):
+        """
+        :param path: Checkpoint file.
+        :type path: str
+        """
+        self.path = path
+        self.records = 0
+        self.offset = 0
+        self.fieldnames = None
+        self.succeeded = 0
+        self.failed = 0
+
+    def load(self):
+        try:
+            with open(self.path, 'rb') as checkpoint:
+                self.__dict__.update(json.load(checkpoint))
+        except IOError:
+            pass
+
+        return self
+
+    def save(self):
+        with open(self.path + '.tmp', 'wb') as checkpoint:
+            json.dump(dict((k, v) for k, v in self.__dict__.items()
+                           if k != 'path'), checkpoint)
+        os.rename(self.path + '.tmp', self.path)
+
+
+class Importer(object):
+    """
+     Streams a CSV or JSONL file into ``user_add``, ``item_add`` or
+    ``action_add`` in parallel. Memory stays flat however long the file
+    is, and a checkpoint next to the input lets an interrupted import
+    carry on where it stopped. Records that still fail after ``retry``
+    are written to an errors file, as read, and count as done.
+    """
+
+    def __init__(self, client, kind, path, format=None, checkpoint=None,
+                 errors=None, max_workers=8, chunk_size=1000,
+                 report=None, report_interval=1.0, retry=None):
+        """
+        :param client: Client to send requests with.
+        :type client: simplerelevance.api.SimpleRelevance
+
+        :param kind: 'users', 'items' or 'actions'.
+        :type kind: str
+
+        :param path: Input file.
+        :type path: str
+
+        :param format: 'csv' or 'jsonl', guessed from ``path`` when not
+         given.
+        :type format: str
+
+        :param checkpoint: Checkpoint file, defaults to ``path`` with
+         ``.checkpoint`` appended.
+        :type checkpoint: str
+
+        :param errors: File the failed records are appended to as JSON
+         lines, defaults to ``path`` with ``.errors`` appended. It can be
+         imported in turn.
+        :type errors: str
+
+        :param max_workers: Requests sent at the same time.
+        :type max_workers: int
+
+        :param chunk_size: Actions whose items and users are resolved
+         together, see ``action_add_many``.
+        :type chunk_size: int
+
+        :param report: Called as ``report(checkpoint, throughput)`` every
+         ``report_interval`` seconds and once at the end.
+        :type report: callable
+
+        :param report_interval: Seconds between two reports and checkpoint
+         saves.
+        :type report_interval: float
+
+        :param retry: How records failing with a connection error, a 5xx
+         answer or an open circuit are retried before being written off,
+         defaults to up to 10 attempts over a couple of minutes, which
+         outlasts the client's ``CircuitBreaker``. False tries once.
+        :type retry: simplerelevance.retry.RetryPolicy
+        """
+        if kind not in FIELDS:
+            raise ValueError("'%s' is not a known kind." % kind)
+
+        self.client = client
+        self.kind = kind
+        self.path = path
+        self.format = format or guess_format(path)
+        self.checkpoint = Checkpoint(checkpoint or path + '.checkpoint')
+        self.errors_path = errors or path + '.errors'
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+        self.report = report
+        self.report_interval = report_interval
+        if retry is None:
+            retry = RetryPolicy(max_attempts=10, backoff=1.0,
+                                max_backoff=30.0)
+        self.retry = retry or None
+
+        self._lock = threading.Lock()
+        self._start = 0
+        self._offsets = {}
+        self._done = set()
+        self._errors = None
+
+    def _records(self, stream):
+        checkpoint = self.checkpoint
+        stream.seek(checkpoint.offset)
+        if self.format == 'csv' and checkpoint.fieldnames is None:
+            checkpoint.fieldnames = next(csv.reader([stream.readline()]), [])
+            checkpoint.offset = stream.tell()
+
+        records = read_records(stream, self.format, checkpoint.fieldnames)
+        for index, (record, offset) in enumerate(records, checkpoint.records):
+            with self._lock:
+                self._offsets[index] = offset
+            yield record
+
+    def _on_result(self, index, record, result, error):
+        index += self._start
+        with self._lock:
+            checkpoint = self.checkpoint
+            if error is None:
+                checkpoint.succeeded += 1
+            else:
+                checkpoint.failed += 1
+                self._errors.write(json.dumps(record) + '\n')
+
+            # Move the checkpoint past every record finished without a gap
+            # before it; the others may still be in flight.
+            self._done.add(index)
+            while checkpoint.records in self._done:
+                self._done.remove(checkpoint.records)
+                checkpoint.offset = self._offsets.pop(checkpoint.records)
+                checkpoint.records += 1
+
+    def _save(self):
+        with self._lock:
+            self._errors.flush()
+            self.checkpoint.save()
+
+    def _reporter(self, stop, started):
+        done = self.checkpoint.succeeded + self.checkpoint.failed
+        while not stop.wait(self.report_interval):
+            self._save()
+            if self.report is not None:
+                processed = (self.checkpoint.succeeded +
+                             self.checkpoint.failed - done)
+                self.report(self.checkpoint,
+                            processed / (time.time() - started))
+
+    def _send(self, records):
+        if self.kind == 'actions':
+            return bulk.add_actions(
+                self.client,
+                (arguments(self.kind, record) for record in records),
+                self.max_workers,
+                chunk_size=self.chunk_size,
+                on_result=self._on_result,
+                retry=self.retry
+            )
+
+        # Converting on the workers turns a bad record into a failure of
+        # that record rather than of the import.
+        add = getattr(self.client, self.kind[:-1] + '_add')
+        return bulk.add_records(
+            lambda **record: add(**arguments(self.kind, record)),
+            records,
+            self.max_workers,
+            on_result=self._on_result,
+            retry=self.retry
+        )
+
+    def run(self, restart=False):
+        """
+        Import the file, carrying on from the checkpoint unless
+        ``restart`` is set.
+
+        :param restart: Ignore any checkpoint and start from the top.
+        :type restart: bool
+
+        :rtype: simplerelevance.bulk.BulkResult
+        """
+        if not restart:
+            self.checkpoint.load()
+        self._start = self.checkpoint.records
+
+        stop = threading.Event()
+        reporter = threading.Thread(target=self._reporter,
+                                    args=(stop, time.time()))
+        reporter.daemon = True
+
+        with open(self.path, 'rb') as stream:
+            self._errors = open(self.errors_path, 'wb' if restart else 'ab')
+            reporter.start()
+            try:
+                result = self._send(self._records(stream))
+            finally:
+                stop.set()
+                reporter.join()
+                self._save()
+                self._errors.close()
+
+        if self.report is not None:
+            self.report(self.checkpoint, result.throughput)
+
+        return result
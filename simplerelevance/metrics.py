@@ -0,0 +1,197 @@
+import bisect
+import threading
+
+
+class Histogram(object):
+    """
+    Counts observations into fixed buckets, Prometheus style.
+    """
+
+    def __init__(self, buckets):
+        """
+        :param buckets: Sorted upper bounds of the buckets.
+        :type buckets: tuple
+        """
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        """
+        Estimate the ``q`` quantile, by interpolating inside the bucket it
+        falls in.
+
+        :param q: Between 0 and 1.
+        :type q: float
+
+        :rtype: float
+        """
+        if not self.count:
+            return None
+
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for bound, count in zip(self.buckets, self.counts):
+            if count and seen + count >= rank:
+                return lower + (bound - lower) * (rank - seen) / count
+            seen += count
+            lower = bound
+
+        return self.buckets[-1]
+
+
+class _Series(object):
+    def __init__(self, buckets):
+        self.requests = 0
+        self.errors = 0
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.latency = Histogram(buckets)
+
+
+class Metrics(object):
+    """
+     Request counts, error counts, byte sizes and latency histograms per
+    endpoint and HTTP method. Recording takes a lock and a few additions,
+    cheap enough to leave on.
+    """
+
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+               10.0)
+
+    def __init__(self, buckets=BUCKETS):
+        """
+        :param buckets: Upper bounds, in seconds, of the latency buckets.
+        :type buckets: tuple
+        """
+        self.buckets = buckets
+
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, method, seconds, request_bytes,
+               response_bytes, error):
+        """
+        :param endpoint: API endpoint, or 'predictions' for predictions.
+         ex; users/
+        :type endpoint: str
+
+        :param method: HTTP method.
+        :type method: str
+
+        :param seconds: How long the request took.
+        :type seconds: float
+
+        :param request_bytes: Size of the request body.
+        :type request_bytes: int
+
+        :param response_bytes: Size of the response body.
+        :type response_bytes: int
+
+        :param error: Whether the request failed.
+        :type error: bool
+        """
+        key = (endpoint, method)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _Series(self.buckets)
+
+            series.requests += 1
+            series.errors += error
+            series.request_bytes += request_bytes
+            series.response_bytes += response_bytes
+            series.latency.observe(seconds)
+
+    def quantile(self, endpoint, method, q):
+        """
+        Estimated latency quantile of an endpoint, None before any request.
+
+        :rtype: float
+        """
+        with self._lock:
+            series = self._series.get((endpoint, method))
+            if series is None:
+                return None
+            return series.latency.quantile(q)
+
+    def stats(self):
+        """
+        Snapshot of everything recorded so far, keyed by endpoint then
+        method.
+
+        :rtype: dict
+        """
+        stats = {}
+        with self._lock:
+            for (endpoint, method), series in self._series.items():
+                latency = series.latency
+                stats.setdefault(endpoint, {})[method] = {
+                    'requests': series.requests,
+                    'errors': series.errors,
+                    'request_bytes': series.request_bytes,
+                    'response_bytes': series.response_bytes,
+                    'latency_sum': latency.sum,
+                    'latency_p50': latency.quantile(0.5),
+                    'latency_p99': latency.quantile(0.99),
+                    'latency_buckets': dict(
+                        zip(self.buckets + (float('inf'),), latency.counts)
+                    ),
+                }
+
+        return stats
+
+    def prometheus(self, prefix='simplerelevance'):
+        """
+        Everything recorded so far in the Prometheus text exposition
+        format.
+
+        :param prefix: Prefix of the metric names.
+        :type prefix: str
+
+        :rtype: str
+        """
+        counters = (
+            ('requests_total', 'requests'),
+            ('errors_total', 'errors'),
+            ('request_bytes_total', 'request_bytes'),
+            ('response_bytes_total', 'response_bytes'),
+        )
+        histogram = '%s_request_duration_seconds' % prefix
+        lines = []
+
+        with self._lock:
+            series = sorted(
+                ('endpoint="%s",method="%s"' % key, value)
+                for key, value in self._series.items()
+            )
+
+            for name, attribute in counters:
+                name = '%s_%s' % (prefix, name)
+                lines.append('# TYPE %s counter' % name)
+                for labels, value in series:
+                    lines.append('%s{%s} %d'
+                                 % (name, labels, getattr(value, attribute)))
+
+            lines.append('# TYPE %s histogram' % histogram)
+            for labels, value in series:
+                latency = value.latency
+                cumulative = 0
+                for bound, count in zip(self.buckets + ('+Inf',),
+                                        latency.counts):
+                    cumulative += count
+                    lines.append('%s_bucket{%s,le="%s"} %d'
+                                 % (histogram, labels, bound, cumulative))
+                lines.append('%s_sum{%s} %r'
+                             % (histogram, labels, latency.sum))
+                lines.append('%s_count{%s} %d'
+                             % (histogram, labels, latency.count))
+
+        return '\n'.join(lines) + '\n'
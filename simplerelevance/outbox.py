@@ -0,0 +1,368 @@
+import json
+import logging
+import os
+import threading
+import time
+
+from simplerelevance.exceptions import APIError, UnresolvedError
+
+logger = logging.getLogger(__name__)
+
+
+def _refused(error):
+    # Sending the request again will not change the answer.
+    if isinstance(error, UnresolvedError):
+        return True
+    return (isinstance(error, APIError) and 400 <= error.code < 500 and
+            error.code not in (408, 429))
+
+
+class Outbox(object):
+    """
+     Durable queue for write requests. ``append`` writes the request to an
+    append-only segment log on disk and returns at once; a background
+    flusher sends the logged requests in order and records how far it got
+    in a checkpoint file, so after a restart it carries on from there
+    without sending delivered requests again.
+
+     A request that keeps failing is retried with exponential backoff up to
+    ``max_attempts`` times, then moved to ``dead.log`` in the same
+    directory. One the API refuses with a 4xx status other than 408 or 429,
+    or one raising ``UnresolvedError``, would fail the same way again, and
+    is moved there at once.
+    """
+
+    def __init__(self, directory, segment_size=16 * 1024 * 1024,
+                 batch_size=100, flush_interval=1.0, retry_delay=1.0,
+                 max_retry_delay=60.0, max_attempts=10, fsync=False):
+        """
+        :param directory: Where segments and the checkpoint are kept, it is
+         created when missing.
+        :type directory: str
+
+        :param segment_size: Bytes after which a new segment is started.
+         Segments are deleted once fully delivered.
+        :type segment_size: int
+
+        :param batch_size: Requests read from the log at a time.
+        :type batch_size: int
+
+        :param flush_interval: Seconds the flusher sleeps when the log is
+         drained.
+        :type flush_interval: float
+
+        :param retry_delay: Seconds before the first retry of a failed
+         request, doubled after each failure.
+        :type retry_delay: float
+
+        :param max_retry_delay: Longest wait between two retries.
+        :type max_retry_delay: float
+
+        :param max_attempts: Attempts before a request is given up on.
+        :type max_attempts: int
+
+        :param fsync: Sync the log and checkpoint to disk on every write,
+         surviving power loss rather than only process crashes.
+        :type fsync: bool
+        """
+        self.directory = directory
+        self.segment_size = segment_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.max_attempts = max_attempts
+        self.fsync = fsync
+
+        self.delivered = 0
+        self.dead = 0
+
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        self._lock = threading.Condition()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._closed = False
+        self._thread = None
+
+        segments = self._segments()
+        self._segment = segments[-1] if segments else 1
+        self._writer = open(self._segment_path(self._segment), 'ab')
+        self._repair(self._writer)
+        self._written = (self._segment, self._writer.tell())
+        self._position = self._read_checkpoint(segments)
+
+    def _segments(self):
+        return sorted(
+            int(name[:-len('.log')]) for name in os.listdir(self.directory)
+            if name.endswith('.log') and name[:-len('.log')].isdigit()
+        )
+
+    def _segment_path(self, segment):
+        return os.path.join(self.directory, '%020d.log' % segment)
+
+    def _checkpoint_path(self):
+        return os.path.join(self.directory, 'checkpoint')
+
+    def _repair(self, writer):
+        """
+        Cut off a record left half written by a crash.
+        """
+        path = writer.name
+        size = os.path.getsize(path)
+        if not size:
+            return
+
+        with open(path, 'rb') as reader:
+            reader.seek(max(0, size - 1))
+            if reader.read(1) == '\n':
+                return
+            reader.seek(0)
+            end = reader.read().rfind('\n') + 1
+
+        writer.truncate(end)
+        writer.seek(end)
+
+    def _read_checkpoint(self, segments):
+        try:
+            with open(self._checkpoint_path(), 'rb') as checkpoint:
+                position = json.load(checkpoint)
+            return position['segment'], position['offset']
+        except (IOError, ValueError, KeyError):
+            return (segments[0] if segments else self._segment), 0
+
+    def _write_checkpoint(self, segment, offset):
+        path = self._checkpoint_path()
+        with open(path + '.tmp', 'wb') as checkpoint:
+            json.dump({'segment': segment, 'offset': offset}, checkpoint)
+            if self.fsync:
+                checkpoint.flush()
+                os.fsync(checkpoint.fileno())
+        os.rename(path + '.tmp', path)
+
+    def append(self, method, endpoint, data):
+        """
+        Log a request for delivery.
+
+        :param method: HTTP method.
+        :type method: str
+
+        :param endpoint: API endpoint. ex; users/
+        :type endpoint: str
+
+        :param data: Request data.
+        :type data: dict
+
+        :rtype: dict
+        """
+        line = json.dumps(
+            {'method': method, 'endpoint': endpoint, 'data': data}
+        ) + '\n'
+
+        with self._lock:
+            if self._closed:
+                raise RuntimeError('Outbox is closed.')
+
+            if self._writer.tell() >= self.segment_size:
+                self._writer.close()
+                self._segment += 1
+                self._writer = open(self._segment_path(self._segment), 'ab')
+
+            self._writer.write(line)
+            self._writer.flush()
+            if self.fsync:
+                os.fsync(self._writer.fileno())
+
+            self._written = (self._segment, self._writer.tell())
+
+        self._wakeup.set()
+
+        return {'queued': True}
+
+    def start(self, deliver):
+        """
+        Start the background flusher.
+
+        :param deliver: Called as ``deliver(method, endpoint, data)`` for
+         every logged request, in order; raising means it was not
+         delivered.
+        :type deliver: callable
+        """
+        if self._thread is not None:
+            return
+
+        self._thread = threading.Thread(target=self._run, args=(deliver,))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _read_batch(self):
+        segment, offset = self._position
+        records = []
+
+        with open(self._segment_path(segment), 'rb') as reader:
+            reader.seek(offset)
+            for _ in xrange(self.batch_size):
+                line = reader.readline()
+                if not line.endswith('\n'):
+                    break
+                offset += len(line)
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Buried as is, it would never read any better.
+                    record = {'unreadable': line}
+                records.append((record, offset))
+
+        return records
+
+    def _advance_segment(self):
+        segment = self._position[0]
+        with self._lock:
+            if segment >= self._written[0] or self._closed:
+                return False
+
+        self._position = (segment + 1, 0)
+        self._write_checkpoint(*self._position)
+        os.remove(self._segment_path(segment))
+
+        return True
+
+    def _deliver(self, deliver, record):
+        delay = self.retry_delay
+        for attempt in xrange(1, self.max_attempts + 1):
+            try:
+                deliver(record['method'], record['endpoint'], record['data'])
+                return True
+            except Exception as e:
+                if (attempt == self.max_attempts or self._closed or
+                        _refused(e)):
+                    break
+                # Cut short by close.
+                if self._stop.wait(delay):
+                    break
+                delay = min(delay * 2, self.max_retry_delay)
+
+        return False
+
+    def _bury(self, record):
+        with open(os.path.join(self.directory, 'dead.log'), 'ab') as dead:
+            dead.write(json.dumps(record) + '\n')
+        self.dead += 1
+
+    def _flush_batch(self, deliver):
+        """
+        Deliver the next batch of records.
+
+        :return: Whether there was anything to do.
+        :rtype: bool
+        """
+        records = self._read_batch()
+
+        for record, offset in records:
+            delivered = ('unreadable' not in record and
+                         self._deliver(deliver, record))
+            if self._closed:
+                # Whatever happens next belongs to the next start, which
+                # may already own the checkpoint.
+                return True
+
+            if delivered:
+                self.delivered += 1
+            else:
+                self._bury(record)
+
+            self._position = (self._position[0], offset)
+            self._write_checkpoint(*self._position)
+
+        return bool(records) or self._advance_segment()
+
+    def _run(self, deliver):
+        delay = self.retry_delay
+        while not self._closed:
+            try:
+                busy = self._flush_batch(deliver)
+            except Exception:
+                # A full disk or a segment gone missing; nothing is
+                # delivered meanwhile, but appends keep being logged.
+                if self._closed:
+                    return
+                logger.exception('Outbox flusher failed, retrying in %.1fs',
+                                 delay)
+                self._stop.wait(delay)
+                delay = min(delay * 2, self.max_retry_delay)
+                continue
+
+            delay = self.retry_delay
+            if busy:
+                continue
+
+            with self._lock:
+                drained = self._position == self._written
+                if drained:
+                    self._lock.notify_all()
+
+            if drained:
+                self._wakeup.wait(self.flush_interval)
+                self._wakeup.clear()
+
+    def flush(self, timeout=None):
+        """
+        Wait until everything appended so far has been delivered.
+
+        :param timeout: Seconds to wait at most.
+        :type timeout: float
+
+        :return: Whether the log was drained in time.
+        :rtype: bool
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        self._wakeup.set()
+
+        with self._lock:
+            while self._position != self._written:
+                remaining = None
+                if deadline is not None:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        return False
+                self._lock.wait(remaining)
+
+        return True
+
+    def close(self, timeout=5.0):
+        """
+        Stop the flusher, after draining the log for up to ``timeout``
+        seconds. Anything left is delivered after the next start. A
+        delivery still hanging by then is not waited for.
+
+        :param timeout: Seconds to keep delivering, None waits until the log
+         is drained.
+        :type timeout: float
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        if self._thread is not None:
+            self.flush(timeout)
+
+        with self._lock:
+            self._closed = True
+            self._writer.close()
+
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            if deadline is None:
+                self._thread.join()
+            else:
+                self._thread.join(max(0, deadline - time.time()))
+
+    def stats(self):
+        """
+        :rtype: dict
+        """
+        return {
+            'delivered': self.delivered,
+            'dead': self.dead,
+            'position': self._position,
+            'written': self._written,
+        }
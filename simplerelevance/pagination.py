@@ -0,0 +1,58 @@
+from simplerelevance.executor import BoundedExecutor
+
+
+def iter_pages(fetch, page_size, prefetch=True):
+    """
+     Yield the records of every page, one at a time. At most the current
+    page, the one before it and, with ``prefetch``, the one being fetched
+    in the background are held in memory.
+
+    :param fetch: Called with a 1-based page number, returns the response
+     for that page.
+    :type fetch: callable
+
+    :param page_size: Records asked for per page, a shorter or longer page
+     is the last one, as is a page repeating the one before it.
+    :type page_size: int
+
+    :param prefetch: Fetch the next page while the current one is consumed.
+    :type prefetch: bool
+
+    :rtype: generator
+    """
+    executor = BoundedExecutor(1) if prefetch else None
+
+    try:
+        page = 1
+        previous = None
+        if executor is not None:
+            pending = executor.submit(fetch, page)
+
+        while True:
+            if executor is not None:
+                results = _results(pending.result())
+            else:
+                results = _results(fetch(page))
+
+            if results == previous:
+                return
+            previous = results
+
+            more = len(results) == page_size
+            page += 1
+            if more and executor is not None:
+                pending = executor.submit(fetch, page)
+
+            for record in results:
+                yield record
+
+            if not more:
+                return
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+
+def _results(response):
+    return response.get('results') or []
+
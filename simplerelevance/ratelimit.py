@@ -0,0 +1,190 @@
+import os
+import struct
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+class TokenBucket(object):
+    """
+     Allows ``rate`` requests per second on average and bursts of up to
+    ``burst`` requests. Safe to share between threads of one process.
+    """
+
+    def __init__(self, rate, burst=None):
+        """
+        :param rate: Tokens added per second.
+        :type rate: float
+
+        :param burst: Most tokens the bucket holds, defaults to ``rate``
+         and to at least one, so a rate below one per second still lets
+         requests through.
+        :type burst: float
+        """
+        self.rate = float(rate)
+        self.burst = float(burst or max(1.0, self.rate))
+
+        self._lock = threading.Lock()
+        self._tokens = self.burst
+        self._updated = time.time()
+
+    def _take(self, tokens, tokens_left, updated):
+        """
+        Refill, then take ``tokens`` if there are enough.
+
+        :return: The new state and how long to wait before trying again,
+         0 when the tokens were taken.
+        :rtype: tuple
+        """
+        now = time.time()
+        tokens_left = min(
+            self.burst, tokens_left + (now - updated) * self.rate
+        )
+        if tokens_left >= tokens:
+            return tokens_left - tokens, now, 0
+
+        return tokens_left, now, (tokens - tokens_left) / self.rate
+
+    def _try_acquire(self, tokens):
+        with self._lock:
+            self._tokens, self._updated, wait = self._take(
+                tokens, self._tokens, self._updated
+            )
+
+        return wait
+
+    def acquire(self, tokens=1, timeout=None):
+        """
+        Wait until ``tokens`` are available and take them.
+
+        :param tokens: Tokens needed.
+        :type tokens: float
+
+        :param timeout: Seconds to wait at most, None waits as long as
+         needed.
+        :type timeout: float
+
+        :return: Whether the tokens were taken.
+        :rtype: bool
+        """
+        if tokens > self.burst:
+            raise ValueError('%s tokens can never fit in a bucket of %s.'
+                             % (tokens, self.burst))
+
+        deadline = None if timeout is None else time.time() + timeout
+
+        while True:
+            wait = self._try_acquire(tokens)
+            if not wait:
+                return True
+
+            if deadline is not None:
+                remaining = deadline - time.time()
+                if remaining < wait:
+                    return False
+
+            time.sleep(wait)
+
+
+class FileTokenBucket(TokenBucket):
+    """
+     A ``TokenBucket`` whose state lives in a small file locked with
+    ``flock``, so every process on the host using the same ``path``, like
+    the workers of a gunicorn server, draws from one shared budget.
+
+     Needs a POSIX system.
+    """
+
+    _state = struct.Struct('dd')
+
+    def __init__(self, path, rate, burst=None):
+        """
+        :param path: File holding the shared state, created when missing.
+        :type path: str
+
+        :param rate: Tokens added per second, for all processes together.
+        :type rate: float
+
+        :param burst: Most tokens the bucket holds, defaults to ``rate``
+         and to at least one.
+        :type burst: float
+        """
+        if fcntl is None:
+            raise RuntimeError('FileTokenBucket needs fcntl.')
+
+        super(FileTokenBucket, self).__init__(rate, burst)
+        self.path = path
+
+        self._fd = None
+        self._pid = None
+
+    def _file(self):
+        # A descriptor inherited through fork shares its lock with the
+        # parent, so every process opens its own.
+        if self._pid != os.getpid():
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            self._pid = os.getpid()
+
+        return self._fd
+
+    def _try_acquire(self, tokens):
+        with self._lock:
+            fd = self._file()
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                os.lseek(fd, 0, os.SEEK_SET)
+                state = os.read(fd, self._state.size)
+                if len(state) == self._state.size:
+                    tokens_left, updated = self._state.unpack(state)
+                else:
+                    tokens_left, updated = self.burst, time.time()
+
+                tokens_left, updated, wait = self._take(
+                    tokens, tokens_left, updated
+                )
+
+                os.lseek(fd, 0, os.SEEK_SET)
+                os.write(fd, self._state.pack(tokens_left, updated))
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+
+        return wait
+
+
+class RateLimiter(object):
+    """
+    Separate budgets for reads (GET) and writes (POST, PUT and DELETE).
+    """
+
+    def __init__(self, reads=None, writes=None):
+        """
+        :param reads: Bucket for GET requests, None leaves them unlimited.
+        :type reads: TokenBucket
+
+        :param writes: Bucket for write requests, None leaves them
+         unlimited.
+        :type writes: TokenBucket
+        """
+        self.reads = reads
+        self.writes = writes
+
+    def acquire(self, method, timeout=None):
+        """
+        :param method: HTTP method of the request about to be sent.
+        :type method: str
+
+        :param timeout: Seconds to wait at most.
+        :type timeout: float
+
+        :return: Whether the request may be sent.
+        :rtype: bool
+        """
+        bucket = self.reads if method == 'GET' else self.writes
+        if bucket is None:
+            return True
+
+        return bucket.acquire(timeout=timeout)
@@ -0,0 +1,208 @@
+import heapq
+import threading
+from collections import deque
+from operator import itemgetter
+
+from simplerelevance.cache import LRUCache
+from simplerelevance.constants.actiontype import ActionType
+
+
+class CooccurrenceEngine(object):
+    """
+     Item-to-item recommendations computed in process, from the items
+    users acted on together. Every action links its item to the user's
+    recent items, weighted by how strong both actions are (a purchase
+    counts more than a click). A user's predictions are the items most
+    linked to their own, which they have not acted on yet.
+
+     Actions can be added at any time. Predictions are cached per user
+    until that user acts again or ``ttl`` runs out, so repeated lookups
+    are a dict access. A user known by several identifiers, such as an
+    email and an external id, is tied together with ``alias``. Only the
+    ``max_users`` most recently active users and aliases are remembered.
+    """
+
+    WEIGHTS = {
+        ActionType.PURCHASES: 5.0,
+        ActionType.CLICKS: 1.0,
+        ActionType.EMAIL_OPENS: 0.5,
+    }
+
+    def __init__(self, weights=None, max_history=20, max_neighbors=100,
+                 cache_size=100000, ttl=300, max_users=1000000):
+        """
+        :param weights: Weight of each action type, defaults to
+         ``WEIGHTS``. Other action types are ignored.
+        :type weights: dict
+
+        :param max_history: Most recent items remembered per user.
+        :type max_history: int
+
+        :param max_neighbors: Most linked items kept per item, the
+         strongest ones.
+        :type max_neighbors: int
+
+        :param cache_size: Users whose predictions are cached.
+        :type cache_size: int
+
+        :param ttl: Seconds cached predictions are served, as actions of
+         other users change them too.
+        :type ttl: int
+
+        :param max_users: Most users whose history is kept, and separately
+         most aliases, the least recently used are forgotten first.
+        :type max_users: int
+        """
+        self.weights = weights or self.WEIGHTS
+        self.max_history = max_history
+        self.max_neighbors = max_neighbors
+        self.actions = 0
+
+        self._history = LRUCache(max_users, None)
+        self._aliases = LRUCache(max_users, None)
+        self._neighbors = {}
+        self._cache = LRUCache(cache_size, ttl)
+        self._lock = threading.Lock()
+
+    def _prune(self, item):
+        self._neighbors[item] = dict(heapq.nlargest(
+            self.max_neighbors, self._neighbors[item].iteritems(),
+            key=itemgetter(1)
+        ))
+
+    def add(self, user, item, action_type=ActionType.CLICKS):
+        """
+        :param user: Identifies the user, such as their guid.
+        :type user: str
+
+        :param item: Identifies the item, such as its guid.
+        :type item: str
+
+        :param action_type: See ``ActionType``.
+        :type action_type: int
+        """
+        weight = self.weights.get(int(action_type))
+        if not weight or user is None or item is None:
+            return
+
+        with self._lock:
+            user = self._aliases.get(user, user)
+            history = self._history.get(user)
+            if history is None:
+                history = deque(maxlen=self.max_history)
+                self._history.set(user, history)
+
+            # Pruning happens once a list is well past max_neighbors, so
+            # its cost is spread over many additions.
+            prune_at = 4 * self.max_neighbors
+            neighbors = self._neighbors.setdefault(item, {})
+            for other, other_weight in history:
+                if other == item:
+                    continue
+
+                link = weight if weight < other_weight else other_weight
+                neighbors[other] = neighbors.get(other, 0.0) + link
+                back = self._neighbors[other]
+                back[item] = back.get(item, 0.0) + link
+                if len(back) > prune_at:
+                    self._prune(other)
+
+            if len(neighbors) > prune_at:
+                self._prune(item)
+            history.append((item, weight))
+            self.actions += 1
+
+        self._cache.invalidate(user)
+
+    def alias(self, name, user):
+        """
+        Make ``name`` stand for ``user``, in predictions and in actions.
+
+        :param name: Another identifier of the user, such as their email.
+        :type name: str
+
+        :param user: Identifies the user in the actions added.
+        :type user: str
+        """
+        if name == user:
+            return
+
+        with self._lock:
+            self._aliases.set(name, user)
+            # Actions added under ``name`` before now become ``user``'s.
+            history = self._history.get(name)
+            if history:
+                self._history.invalidate(name)
+                merged = self._history.get(user)
+                if merged is None:
+                    merged = deque(maxlen=self.max_history)
+                    self._history.set(user, merged)
+                merged.extend(history)
+
+        self._cache.invalidate(user)
+
+    def knows(self, user):
+        """
+        :return: Whether any action of the user has been added.
+        :rtype: bool
+        """
+        with self._lock:
+            return self._history.get(self._aliases.get(user, user)) is not None
+
+    def add_actions(self, actions):
+        """
+        :param actions: Action records with ``user_guid``, ``item_guid``
+         and ``action_type``, as ``actions()`` or an export returns them.
+         Users are known by their guid, which the client ties to their
+         email.
+        :type actions: iterable
+        """
+        for action in actions:
+            self.add(action.get('user_guid'), action.get('item_guid'),
+                     action.get('action_type') or ActionType.CLICKS)
+
+    def predict(self, user, count=10):
+        """
+        :param user: Identifies the user.
+        :type user: str
+
+        :param count: Most items returned.
+        :type count: int
+
+        :return: ``(item, score)`` pairs, best first.
+        :rtype: list
+        """
+        user = self._aliases.get(user, user)
+        predictions = self._cache.get(user)
+        if predictions is None:
+            predictions = self._predict(user)
+            self._cache.set(user, predictions)
+
+        return predictions[:count]
+
+    def _predict(self, user):
+        scores = {}
+        with self._lock:
+            history = list(self._history.get(user, ()))
+            seen = set(item for item, _ in history)
+            for item, weight in history:
+                for other, link in self._neighbors.get(item, {}).iteritems():
+                    if other not in seen:
+                        scores[other] = scores.get(other, 0.0) + weight * link
+
+        return heapq.nlargest(self.max_neighbors, scores.iteritems(),
+                              key=itemgetter(1))
+
+    def stats(self):
+        """
+        :rtype: dict
+        """
+        with self._lock:
+            return {
+                'actions': self.actions,
+                'users': len(self._history),
+                'aliases': len(self._aliases),
+                'items': len(self._neighbors),
+                'cache': {'hits': self._cache.hits,
+                          'misses': self._cache.misses},
+            }
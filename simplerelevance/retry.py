@@ -0,0 +1,227 @@
+import random
+import threading
+import time
+import urllib2
+
+from simplerelevance.exceptions import APIError, CircuitOpenError
+
+
+def transient(error):
+    """
+    Whether ``error`` may go away if the request is sent again later: a
+    connection error, an open circuit, or a 5xx, 408 or 429 answer.
+
+    :rtype: bool
+    """
+    if isinstance(error, APIError):
+        return error.code >= 500 or error.code in (408, 429)
+
+    return isinstance(error, urllib2.URLError)
+
+
+class RetryPolicy(object):
+    """
+    How often and how patiently idempotent requests are retried.
+    """
+
+    def __init__(self, max_attempts=3, backoff=0.1, max_backoff=2.0,
+                 retry_statuses=(429, 500, 502, 503, 504)):
+        """
+        :param max_attempts: Attempts per call, including the first one.
+        :type max_attempts: int
+
+        :param backoff: Base delay, in seconds, doubled after each attempt.
+        :type backoff: float
+
+        :param max_backoff: Longest delay between two attempts.
+        :type max_backoff: float
+
+        :param retry_statuses: Status codes worth another attempt;
+         connection errors always are.
+        :type retry_statuses: tuple
+        """
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.retry_statuses = retry_statuses
+
+    def delay(self, attempt):
+        """
+        Seconds to wait after ``attempt`` failed, with full jitter so that
+        clients failing together don't retry together.
+
+        :param attempt: Number of the attempt that failed, starting at 1.
+        :type attempt: int
+
+        :rtype: float
+        """
+        return random.uniform(
+            0, min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+        )
+
+
+class CircuitBreaker(object):
+    """
+     Stops sending requests for ``reset_timeout`` seconds once
+    ``failure_threshold`` requests in a row have failed, so callers fail
+    fast instead of piling up on an unhealthy API. After that one trial
+    request is let through; its outcome closes or reopens the circuit.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        """
+        :param failure_threshold: Consecutive failures opening the circuit.
+        :type failure_threshold: int
+
+        :param reset_timeout: Seconds the circuit stays open.
+        :type reset_timeout: float
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened = None
+
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """
+        :raise CircuitOpenError: When the request must not be sent.
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            if (self.state == self.OPEN and
+                    time.time() - self.opened >= self.reset_timeout):
+                self.state = self.HALF_OPEN
+                return
+
+        raise CircuitOpenError('circuit breaker is %s' % self.state)
+
+    def success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            if (self.state == self.HALF_OPEN or
+                    self.failures >= self.failure_threshold):
+                self.state = self.OPEN
+                self.opened = time.time()
+
+    def release(self):
+        """
+        Give back a trial request that ended without telling whether the
+        API is healthy, so the next call can be the trial.
+        """
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self.state = self.OPEN
+                self.opened = time.time() - self.reset_timeout
+
+
+class HedgePolicy(object):
+    """
+     When a GET has not answered once it has taken longer than most
+    requests to the same endpoint do, sends a second copy and keeps
+    whichever answers first. Hedges are capped at a share of requests, so
+    a slow API does not get twice the load.
+    """
+
+    def __init__(self, quantile=0.95, budget=0.05, min_delay=0.005,
+                 max_delay=1.0, endpoints=None, max_workers=32):
+        """
+        :param quantile: Latency quantile of the endpoint after which the
+         second request is sent.
+        :type quantile: float
+
+        :param budget: Largest share of requests that may be hedged.
+        :type budget: float
+
+        :param min_delay: Shortest wait, in seconds, before hedging.
+        :type min_delay: float
+
+        :param max_delay: Longest wait, in seconds, before hedging.
+        :type max_delay: float
+
+        :param endpoints: Endpoints whose GETs are hedged, None hedges
+         them all. ex; ('items/', 'predictions')
+        :type endpoints: tuple
+
+        :param max_workers: Threads sending hedged requests. Requests made
+         while they are all busy are sent without a hedge.
+        :type max_workers: int
+        """
+        self.quantile = quantile
+        self.budget = budget
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.endpoints = endpoints
+        self.max_workers = max_workers
+
+        self.requests = 0
+        self.hedged = 0
+        self.won = 0
+
+        self._lock = threading.Lock()
+
+    def applies(self, endpoint):
+        return self.endpoints is None or endpoint in self.endpoints
+
+    def delay(self, metrics, endpoint):
+        """
+        :param metrics: Latencies observed so far.
+        :type metrics: simplerelevance.metrics.Metrics
+
+        :return: Seconds to wait before hedging, None when the endpoint
+         has no latency recorded yet.
+        :rtype: float
+        """
+        with self._lock:
+            self.requests += 1
+            # Halve both counts now and then, so the budget follows recent
+            # traffic rather than the whole lifetime of the client.
+            if self.requests >= 10000:
+                self.requests //= 2
+                self.hedged //= 2
+
+        latency = metrics.quantile(endpoint, 'GET', self.quantile)
+        if latency is None:
+            return None
+
+        return min(self.max_delay, max(self.min_delay, latency))
+
+    def allow(self):
+        """
+        :return: Whether the budget leaves room for one more hedge.
+        :rtype: bool
+        """
+        with self._lock:
+            if self.hedged + 1 > self.budget * self.requests:
+                return False
+            self.hedged += 1
+            return True
+
+    def win(self):
+        """
+        Count a hedge that answered before the original request.
+        """
+        with self._lock:
+            self.won += 1
+
+    def stats(self):
+        """
+        :rtype: dict
+        """
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'hedged': self.hedged,
+                'won': self.won,
+            }
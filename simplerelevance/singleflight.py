@@ -0,0 +1,116 @@
+import sys
+import threading
+import time
+
+from simplerelevance.exceptions import DeadlineExceeded
+
+
+class _Flight(object):
+    __slots__ = ('done', 'result', 'exc_info', 'expired')
+
+    def __init__(self):
+        # Only made once a second caller arrives, most calls have none.
+        self.done = None
+        self.result = None
+        self.exc_info = None
+        # The leader failed because its own time ran out.
+        self.expired = False
+
+
+class SingleFlight(object):
+    """
+     Lets concurrent calls for the same key share one execution: the first
+    caller runs it, the others wait and get its result, or its exception.
+    A caller left with time once the first one failed for lack of its own
+    runs the call again. Nothing is kept once the call returns, so this is
+    not a cache.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.coalesced = 0
+
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, timeout=None):
+        """
+        Run ``fn()``, unless a call for ``key`` is already running, in which
+        case wait for that one instead.
+
+        :param key: Identifies calls that give the same result.
+        :type key: hashable
+
+        :param fn: Makes the call.
+        :type fn: callable
+
+        :param timeout: Seconds the caller has, None is unbounded. It waits
+         at most this long for a call that is already running, and a
+         failure of its own call past it is not shared with callers that
+         still have time.
+        :type timeout: float
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        first = True
+
+        while True:
+            with self._lock:
+                if first:
+                    self.calls += 1
+                flight = self._flights.get(key)
+                leader = flight is None
+                if leader:
+                    flight = self._flights[key] = _Flight()
+                else:
+                    if first:
+                        self.coalesced += 1
+                    if flight.done is None:
+                        flight.done = threading.Event()
+            first = False
+
+            if leader:
+                break
+
+            if deadline is not None:
+                timeout = max(0, deadline - time.time())
+            if not flight.done.wait(timeout):
+                raise DeadlineExceeded('deadline exceeded waiting for %s'
+                                       % (key,))
+            if flight.exc_info is not None:
+                if flight.expired and (deadline is None or
+                                       time.time() < deadline):
+                    continue
+                e_type, e, tb = flight.exc_info
+                raise e_type, e, tb
+            return flight.result
+
+        try:
+            flight.result = fn()
+        except BaseException:
+            flight.exc_info = sys.exc_info()
+            flight.expired = (
+                isinstance(flight.exc_info[1], DeadlineExceeded) or
+                (deadline is not None and time.time() >= deadline)
+            )
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+                done = flight.done
+            if done is not None:
+                done.set()
+
+        return flight.result
+
+    def stats(self):
+        """
+        :return: Calls made, how many of them shared another call's
+         result, and how many calls are running.
+        :rtype: dict
+        """
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'coalesced': self.coalesced,
+                'in_flight': len(self._flights),
+            }
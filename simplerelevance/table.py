@@ -0,0 +1,263 @@
+import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class _ObjectColumn(object):
+    """
+    Plain list, for values of mixed or nested types.
+    """
+
+    def __init__(self, values=()):
+        self.values = list(values)
+
+    def append(self, value):
+        self.values.append(value)
+        return True
+
+    def __getitem__(self, index):
+        return self.values[index]
+
+    def __len__(self):
+        return len(self.values)
+
+    def to_numpy(self):
+        return numpy.array(self.values, dtype=object)
+
+
+class _NumberColumn(object):
+    """
+    Machine numbers in an ``array.array``.
+    """
+
+    TYPES = {int: 'l', long: 'l', float: 'd', bool: 'b'}
+
+    def __init__(self, typecode):
+        self.values = array.array(typecode)
+
+    def append(self, value):
+        if self.TYPES.get(type(value)) != self.values.typecode:
+            return False
+        try:
+            self.values.append(value)
+        except OverflowError:
+            return False
+        return True
+
+    def __getitem__(self, index):
+        value = self.values[index]
+        if self.values.typecode == 'b':
+            return bool(value)
+        return value
+
+    def __len__(self):
+        return len(self.values)
+
+    def to_numpy(self):
+        dtype = {'l': numpy.int64, 'd': numpy.float64, 'b': numpy.bool_}
+        return numpy.frombuffer(self.values, dtype[self.values.typecode])
+
+
+class _StringColumn(object):
+    """
+     Strings as 4-byte codes into a table holding each distinct string
+    once, which suits guids, emails and action types that repeat a lot.
+    None is code -1.
+    """
+
+    def __init__(self):
+        self.codes = array.array('i')
+        self.strings = []
+        self._index = {}
+
+    def append(self, value):
+        if value is None:
+            self.codes.append(-1)
+            return True
+        if not isinstance(value, basestring):
+            return False
+
+        code = self._index.get(value)
+        if code is None:
+            code = self._index[value] = len(self.strings)
+            self.strings.append(value)
+        self.codes.append(code)
+        return True
+
+    def __getitem__(self, index):
+        code = self.codes[index]
+        if code < 0:
+            return None
+        return self.strings[code]
+
+    def __len__(self):
+        return len(self.codes)
+
+    def to_numpy(self):
+        return numpy.frombuffer(self.codes, numpy.int32)
+
+
+def _column_for(value):
+    if isinstance(value, basestring):
+        return _StringColumn()
+
+    typecode = _NumberColumn.TYPES.get(type(value))
+    if typecode is not None:
+        return _NumberColumn(typecode)
+
+    return _ObjectColumn()
+
+
+class ColumnTable(object):
+    """
+     Records stored column by column: numbers in typed arrays, strings as
+    codes into a per-column table of distinct strings, anything else in a
+    list. A million actions take tens of megabytes instead of the
+    gigabyte their dicts would.
+
+     A column's type is set by its first value. A value that does not fit
+    turns the column into a plain list, as do missing values in a number
+    column.
+
+        table = ColumnTable.from_records(client.iter_actions())
+        table.column('item_guid')
+    """
+
+    def __init__(self, fields=None):
+        """
+        :param fields: Fields to keep, None keeps every field seen.
+        :type fields: tuple
+        """
+        self.fields = fields
+        self.frozen = False
+
+        self._columns = {}
+        self._size = 0
+
+    @classmethod
+    def from_records(cls, records, fields=None):
+        """
+        :param records: Dicts, read one at a time.
+        :type records: iterable
+
+        :param fields: Fields to keep, None keeps every field seen.
+        :type fields: tuple
+
+        :rtype: ColumnTable
+        """
+        table = cls(fields)
+        table.extend(records)
+        return table
+
+    def _append(self, name, value):
+        column = self._columns.get(name)
+        if column is None:
+            # A field first seen now is missing from the records before.
+            column = self._columns[name] = _column_for(value)
+            for _ in xrange(self._size):
+                self._append(name, None)
+            column = self._columns[name]
+
+        if not column.append(value):
+            column = self._columns[name] = _ObjectColumn(
+                column[i] for i in xrange(len(column))
+            )
+            column.append(value)
+
+    def append(self, record):
+        """
+        :param record: One record, fields it lacks are stored as None.
+        :type record: dict
+        """
+        if self.frozen:
+            raise RuntimeError('Cannot append once shared with NumPy.')
+
+        names = self.fields if self.fields is not None else record.keys()
+        for name in names:
+            self._append(name, record.get(name))
+
+        self._size += 1
+        for name, column in self._columns.items():
+            if len(column) < self._size:
+                self._append(name, None)
+
+    def extend(self, records):
+        for record in records:
+            self.append(record)
+
+    @property
+    def columns(self):
+        return sorted(self._columns)
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, index):
+        """
+        :return: The record at ``index``, rebuilt as a dict.
+        :rtype: dict
+        """
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError('ColumnTable index out of range')
+
+        return dict((name, column[index])
+                    for name, column in self._columns.items())
+
+    def __iter__(self):
+        for index in xrange(self._size):
+            yield self[index]
+
+    def column(self, name):
+        """
+        :return: Every value of a field, in record order.
+        :rtype: list
+        """
+        column = self._columns[name]
+        return [column[i] for i in xrange(self._size)]
+
+    def strings(self, name):
+        """
+        :return: The distinct strings of a string column, indexed by the
+         codes ``to_numpy`` returns for it.
+        :rtype: list
+        """
+        return list(self._columns[name].strings)
+
+    def to_numpy(self, name):
+        """
+         A NumPy array of a column. Number columns and the codes of string
+        columns (see ``strings``) share memory with the table rather than
+        being copied, so the table takes no more records afterwards.
+
+        :rtype: numpy.ndarray
+        """
+        if numpy is None:
+            raise RuntimeError('to_numpy needs NumPy.')
+
+        column = self._columns[name]
+        if not isinstance(column, _ObjectColumn):
+            # A growing array.array moves its buffer under NumPy's feet.
+            self.frozen = True
+
+        return column.to_numpy()
+
+    def memory(self):
+        """
+        :return: Approximate bytes held by the arrays and string tables.
+        :rtype: int
+        """
+        total = 0
+        for column in self._columns.values():
+            if isinstance(column, _NumberColumn):
+                total += len(column.values) * column.values.itemsize
+            elif isinstance(column, _StringColumn):
+                total += len(column.codes) * column.codes.itemsize
+                total += sum(len(s) + 40 for s in column.strings)
+            else:
+                total += len(column.values) * 8
+        return total
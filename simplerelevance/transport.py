@@ -0,0 +1,308 @@
+import httplib
+import select
+import socket
+import threading
+import time
+import urllib2
+import urlparse
+import zlib
+
+# wbits selecting the gzip container rather than raw zlib.
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+
+def gzip_compress(data, level=6):
+    """
+    :param data: Bytes to compress.
+    :type data: str
+
+    :param level: zlib compression level, 1 (fastest) to 9 (smallest).
+    :type level: int
+
+    :rtype: str
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, GZIP_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
+class Response(object):
+    def __init__(self, status, reason, headers, body):
+        """
+        :param status: HTTP status code returned by the server.
+        :type status: int
+
+        :param reason: HTTP reason phrase returned by the server.
+        :type reason: str
+
+        :param headers: Response headers, lower-cased names.
+        :type headers: dict
+
+        :param body: Raw response body.
+        :type body: str
+        """
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self.body = body
+
+
+class Transport(object):
+    """
+    Base class for anything able to send a request to the API and hand back
+    a ``Response``. Subclass it and pass an instance as ``transport`` to
+    ``SimpleRelevance`` to change how requests go over the wire.
+    """
+
+    def request(self, method, url, body=None, headers=None, timeout=None):
+        """
+        :param method: HTTP method, upper case.
+        :type method: str
+
+        :param url: Absolute URL to send the request to.
+        :type url: str
+
+        :param body: Encoded request body.
+        :type body: str
+
+        :param headers: Request headers.
+        :type headers: dict
+
+        :param timeout: Seconds the request may take, overriding the
+         transport's own timeout.
+        :type timeout: float
+
+        :rtype: Response
+        """
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+def _dropped(connection):
+    # An idle connection has nothing to read, unless the server closed it
+    # or sent something it should not have.
+    if connection.sock is None:
+        return False
+    try:
+        readable, _, _ = select.select([connection.sock], [], [], 0)
+    except (select.error, socket.error, ValueError):
+        return True
+    return bool(readable)
+
+
+class PooledTransport(Transport):
+    """
+    Keeps persistent (keep-alive) HTTP/HTTPS connections around and reuses
+    them across requests, so only the first request to a host pays for the
+    TCP connect and TLS handshake.
+
+    Safe to share between threads.
+    """
+
+    CHUNK_SIZE = 64 * 1024
+    IDEMPOTENT = ('GET', 'HEAD', 'OPTIONS')
+
+    def __init__(self, pool_size=10, per_host=None, idle_timeout=4,
+                 timeout=None, compress=True):
+        """
+        :param pool_size: Maximum number of idle connections kept around,
+         across all hosts.
+        :type pool_size: int
+
+        :param per_host: Maximum number of connections open to a single
+         host at the same time, None for no limit. Past it, callers wait
+         for a free connection for up to their timeout, or as long as it
+         takes without one.
+        :type per_host: int
+
+        :param idle_timeout: Seconds an idle connection is kept before it is
+         evicted. Keep it below the server's keep-alive timeout, commonly 5
+         seconds, so connections are rarely found closed by the server.
+        :type idle_timeout: int
+
+        :param timeout: Socket timeout, in seconds, for new connections.
+        :type timeout: float
+
+        :param compress: Ask for gzip compressed responses, they are
+         decompressed as they are read.
+        :type compress: bool
+        """
+        self.pool_size = pool_size
+        self.per_host = per_host
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self.compress = compress
+
+        self._lock = threading.Condition(threading.Lock())
+        self._idle = {}
+        self._in_use = {}
+        self._idle_count = 0
+        self._closed = False
+
+    def _new_connection(self, scheme, netloc):
+        if scheme == 'https':
+            return httplib.HTTPSConnection(netloc, timeout=self.timeout)
+        return httplib.HTTPConnection(netloc, timeout=self.timeout)
+
+    def _evict_idle(self, now):
+        for key, connections in self._idle.items():
+            while connections and now - connections[0][1] > self.idle_timeout:
+                connections.pop(0)[0].close()
+                self._idle_count -= 1
+            if not connections:
+                del self._idle[key]
+
+    def _acquire(self, key, timeout=None):
+        """
+        :return: Connection and whether it has been used before.
+        :rtype: tuple
+        """
+        deadline = None if timeout is None else time.time() + timeout
+
+        with self._lock:
+            while True:
+                if self._closed:
+                    raise urllib2.URLError('transport is closed')
+
+                self._evict_idle(time.time())
+
+                connections = self._idle.get(key)
+                if connections:
+                    connection = connections.pop()[0]
+                    self._idle_count -= 1
+                    if _dropped(connection):
+                        connection.close()
+                        continue
+                    self._in_use[key] = self._in_use.get(key, 0) + 1
+                    return connection, True
+
+                if (self.per_host is None or
+                        self._in_use.get(key, 0) < self.per_host):
+                    self._in_use[key] = self._in_use.get(key, 0) + 1
+                    return self._new_connection(*key), False
+
+                if deadline is None:
+                    self._lock.wait()
+                    continue
+
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise urllib2.URLError(
+                        'timed out waiting for a connection to %s' % key[1]
+                    )
+                self._lock.wait(remaining)
+
+    def _release(self, key, connection, reusable):
+        with self._lock:
+            self._in_use[key] -= 1
+
+            if reusable and self.pool_size > 0 and not self._closed:
+                if self._idle_count >= self.pool_size:
+                    self._drop_oldest_idle()
+                self._idle.setdefault(key, []).append(
+                    (connection, time.time())
+                )
+                self._idle_count += 1
+            else:
+                connection.close()
+
+            self._lock.notify_all()
+
+    def _drop_oldest_idle(self):
+        oldest = None
+        for key, connections in self._idle.items():
+            if oldest is None or connections[0][1] < self._idle[oldest][0][1]:
+                oldest = key
+        if oldest is None:
+            return
+
+        self._idle[oldest].pop(0)[0].close()
+        self._idle_count -= 1
+        if not self._idle[oldest]:
+            del self._idle[oldest]
+
+    def _read(self, response, headers):
+        if headers.get('content-encoding') != 'gzip':
+            return response.read()
+
+        # Decompress chunk by chunk as the body arrives, rather than
+        # holding the whole compressed body first.
+        decompressor = zlib.decompressobj(GZIP_WBITS)
+        chunks = []
+        while True:
+            chunk = response.read(self.CHUNK_SIZE)
+            if not chunk:
+                break
+            chunks.append(decompressor.decompress(chunk))
+        chunks.append(decompressor.flush())
+
+        del headers['content-encoding']
+        return ''.join(chunks)
+
+    def request(self, method, url, body=None, headers=None, timeout=None):
+        if timeout is None:
+            timeout = self.timeout
+
+        headers = headers or {}
+        if self.compress and 'Accept-Encoding' not in headers:
+            headers = dict(headers, **{'Accept-Encoding': 'gzip'})
+
+        parts = urlparse.urlsplit(url)
+        key = (parts.scheme, parts.netloc)
+        path = parts.path or '/'
+        if parts.query:
+            path = '%s?%s' % (path, parts.query)
+
+        while True:
+            connection, reused = self._acquire(key, timeout)
+
+            sent = False
+            try:
+                connection.timeout = timeout
+                if connection.sock is not None:
+                    connection.sock.settimeout(timeout)
+                connection.request(method, path, body, headers)
+                sent = True
+                response = connection.getresponse()
+                response_headers = dict(response.getheaders())
+                data = self._read(response, response_headers)
+            except (socket.error, httplib.HTTPException, zlib.error) as e:
+                self._release(key, connection, False)
+                # The server may have closed a kept-alive connection while it
+                # was sitting in the pool; that is worth a fresh attempt,
+                # unless a write may have been acted on already.
+                if (reused and
+                        not isinstance(e, (socket.timeout, zlib.error)) and
+                        (not sent or method in self.IDEMPOTENT)):
+                    continue
+                raise urllib2.URLError(e)
+            except BaseException:
+                # Anything else, a body that cannot be encoded say, must
+                # still give the slot back.
+                self._release(key, connection, False)
+                raise
+
+            self._release(key, connection, not response.will_close)
+
+            return Response(
+                response.status,
+                response.reason,
+                response_headers,
+                data
+            )
+
+    def close(self):
+        """
+        Close every idle connection. Connections in use are closed when
+        they are handed back, and no request is sent afterwards.
+        """
+        with self._lock:
+            self._closed = True
+            for connections in self._idle.values():
+                for connection, _ in connections:
+                    connection.close()
+            self._idle = {}
+            self._idle_count = 0
+            # Callers waiting for a connection give up.
+            self._lock.notify_all()
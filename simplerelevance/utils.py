@@ -1,4 +1,5 @@
 import inspect
+from itertools import izip
 
 
 def arg_name(arg):
@@ -17,3 +18,18 @@ def expected_be(p_object, class_or_type_or_tuple):
     if not isinstance(p_object, class_or_type_or_tuple):
         raise TypeError("'%s' expected to be '%s'."
                         % (arg_name(p_object), type(class_or_type_or_tuple)))
+
+
+def compact(names, values):
+    """
+    Pair ``names`` with ``values``, leaving out empty values.
+
+    :param names: Parameter names, see ``Params``.
+    :type names: tuple
+
+    :param values: Values in the same order as ``names``.
+    :type values: tuple
+
+    :rtype: dict
+    """
+    return dict((k, v) for k, v in izip(names, values) if v)
@@ -0,0 +1,32 @@
+import threading
+import time
+
+from simplerelevance.transport import Response, Transport
+
+
+class FakeTransport(Transport):
+    """
+     Answers every request with ``answer(method, url, body, timeout)``,
+    an empty JSON object by default, and records the requests it got and
+    their headers.
+    """
+
+    def __init__(self, answer=None, latency=0.0):
+        self.answer = answer
+        self.latency = latency
+        self.requests = []
+        self.headers = []
+
+        self._lock = threading.Lock()
+
+    def request(self, method, url, body=None, headers=None, timeout=None):
+        with self._lock:
+            self.requests.append((method, url, body))
+            self.headers.append(headers or {})
+
+        if self.latency:
+            time.sleep(self.latency)
+        if self.answer is not None:
+            return self.answer(method, url, body, timeout)
+
+        return Response(200, 'OK', {}, '{}')
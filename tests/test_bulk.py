@@ -0,0 +1,118 @@
+import json
+import threading
+import time
+import unittest
+import urlparse
+
+from simplerelevance import bulk
+from simplerelevance.api import SimpleRelevance
+from simplerelevance.transport import Response
+from tests.fakes import FakeTransport
+
+
+def answer(method, url, body, timeout):
+    if method == 'GET' and 'items/' in url:
+        query = urlparse.parse_qs(urlparse.urlparse(url).query)
+        guid = 'item-%s' % query['item_external_id'][0]
+        results = [{'purchases': {'1': {'item_guid': guid}}}]
+    elif method == 'GET':
+        results = [{'guid': 'user-guid', 'external_id': 'user-id'}]
+    else:
+        results = []
+    return Response(200, 'OK', {}, json.dumps({'results': results}))
+
+
+class BulkRunnerTest(unittest.TestCase):
+    def test_in_flight_records_are_bounded(self):
+        runner = bulk.BulkRunner(max_workers=2, max_in_flight=3)
+        lock = threading.Lock()
+        running = [0]
+        peak = [0]
+
+        def work():
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.01)
+            with lock:
+                running[0] -= 1
+
+        for index in range(20):
+            runner.submit(index, None, work)
+        result = runner.finish()
+
+        self.assertEqual(result.succeeded, 20)
+        self.assertTrue(peak[0] <= 2)
+
+    def test_failures_are_listed(self):
+        runner = bulk.BulkRunner(max_workers=2)
+        for index in range(4):
+            runner.fail(index, {'n': index}, ValueError('bad'))
+        result = runner.finish()
+
+        self.assertEqual(result.failures, 4)
+        self.assertEqual(sorted(index for index, _, _ in result.failed),
+                         range(4))
+        self.assertEqual(result.total, 4)
+
+    def test_failures_are_sampled(self):
+        count = bulk.FAILED_SAMPLE + 50
+
+        # The callback sees every failure, with or without one only the
+        # first are kept on the result.
+        seen = []
+        for on_result in (None, lambda index, *_: seen.append(index)):
+            runner = bulk.BulkRunner(max_workers=2, on_result=on_result)
+            for index in range(count):
+                runner.fail(index, None, ValueError('bad'))
+            result = runner.finish()
+
+            self.assertEqual(result.failures, count)
+            self.assertEqual([index for index, _, _ in result.failed],
+                             range(bulk.FAILED_SAMPLE))
+
+        self.assertEqual(seen, range(count))
+
+
+class BulkClientTest(unittest.TestCase):
+    def setUp(self):
+        self.transport = FakeTransport(answer)
+        self.client = SimpleRelevance('key', 'business',
+                                      transport=self.transport)
+        self.addCleanup(self.client.close)
+
+    def requests(self, method, endpoint):
+        return [
+            body for m, url, body in self.transport.requests
+            if m == method and ('/' + endpoint) in url
+        ]
+
+    def test_user_add_many(self):
+        users = ({'email': '%d@x' % n} for n in range(10))
+        result = self.client.user_add_many(users, max_workers=3)
+
+        self.assertEqual(result.succeeded, 10)
+        self.assertEqual(len(self.requests('POST', 'users/')), 10)
+
+    def test_actions_look_up_each_item_once(self):
+        actions = [{'item_id': n % 3 + 1, 'user_email': 'a@x'}
+                   for n in range(9)]
+        result = bulk.add_actions(self.client, actions, chunk_size=4)
+
+        self.assertEqual(result.succeeded, 9)
+        self.assertEqual(len(self.requests('GET', 'items/')), 3)
+        self.assertEqual(len(self.requests('GET', 'users/')), 1)
+        posted = [urlparse.parse_qs(body) for body in
+                  self.requests('POST', 'actions/')]
+        self.assertEqual(sorted(data['item_guid'][0] for data in posted),
+                         sorted('item-%d' % (n % 3 + 1) for n in range(9)))
+
+    def test_action_without_item_fails_without_a_request(self):
+        result = bulk.add_actions(self.client, [{'user_email': 'a@x'}])
+
+        self.assertEqual(result.failures, 1)
+        self.assertEqual(self.requests('POST', 'actions/'), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
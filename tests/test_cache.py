@@ -0,0 +1,145 @@
+import json
+import threading
+import time
+import unittest
+import urlparse
+
+from simplerelevance.api import SimpleRelevance
+from simplerelevance.cache import GuidCache, PredictionCache
+from simplerelevance.transport import Response
+from tests.fakes import FakeTransport
+
+
+class GuidCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.transport = FakeTransport(self.answer)
+        self.client = SimpleRelevance('key', 'business',
+                                      transport=self.transport,
+                                      guid_cache=GuidCache(ttl=60))
+        self.addCleanup(self.client.close)
+
+    def answer(self, method, url, body, timeout):
+        if method == 'GET' and 'items/' in url:
+            results = [{'purchases': {'1': {'item_guid': 'i7'}}}]
+        elif method == 'GET':
+            results = [{'guid': 'u9', 'external_id': 'e9'}]
+        else:
+            results = []
+        return Response(200, 'OK', {}, json.dumps({'results': results}))
+
+    def lookups(self, endpoint):
+        return len([url for method, url, _ in self.transport.requests
+                    if method == 'GET' and endpoint in url])
+
+    def test_repeated_lookups_hit_the_cache(self):
+        self.assertEqual(self.client.item_guid(7), 'i7')
+        self.assertEqual(self.client.item_guid(7), 'i7')
+        self.assertEqual(self.client.user_guid('a@x'), 'u9')
+        self.assertEqual(self.client.user_guid('a@x'), 'u9')
+
+        self.assertEqual(self.lookups('items/'), 1)
+        self.assertEqual(self.lookups('users/'), 1)
+        self.assertEqual(self.client.guid_cache.stats()['items']['hits'], 1)
+
+    def test_actions_reuse_resolved_guids(self):
+        for _ in range(3):
+            self.client.action_add(7, user_email='a@x')
+
+        self.assertEqual(self.lookups('items/'), 1)
+        self.assertEqual(self.lookups('users/'), 1)
+        body = dict(urlparse.parse_qsl(self.transport.requests[-1][2]))
+        self.assertEqual((body['item_guid'], body['user_guid']),
+                         ('i7', 'u9'))
+
+    def test_delete_invalidates_the_item(self):
+        self.client.item_guid(7)
+        self.client.item_delete('i7')
+        self.client.item_guid(7)
+
+        self.assertEqual(self.lookups('items/'), 2)
+
+    def test_delete_invalidates_the_user(self):
+        self.client.user_guid('a@x')
+        self.client.user_delete('u9')
+        self.client.user_guid('a@x')
+
+        self.assertEqual(self.lookups('users/'), 2)
+
+    def test_other_entries_survive_a_delete(self):
+        self.client.item_guid(7)
+        self.client.user_guid('a@x')
+        self.client.item_delete('other')
+        self.client.item_guid(7)
+
+        self.assertEqual(self.lookups('items/'), 1)
+
+
+class PredictionCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.cache = PredictionCache(ttl=0.05, stale_ttl=0.1)
+        self.fetched = []
+        self.release = threading.Event()
+        self.release.set()
+        self.addCleanup(self.release.set)
+
+    def fetch(self):
+        self.fetched.append(1)
+        self.release.wait()
+        return len(self.fetched)
+
+    def test_fresh_entry_is_served_from_memory(self):
+        self.assertEqual(self.cache.get('a@x', self.fetch), 1)
+        self.assertEqual(self.cache.get('a@x', self.fetch), 1)
+
+        stats = self.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+        self.assertEqual(stats['hit_rate'], 0.5)
+        self.assertEqual(len(self.fetched), 1)
+
+    def test_stale_entry_is_served_while_one_refresh_runs(self):
+        self.cache.get('a@x', self.fetch)
+        time.sleep(0.06)
+        self.release.clear()
+
+        for _ in range(3):
+            self.assertEqual(self.cache.get('a@x', self.fetch), 1)
+        self.assertEqual(self.cache.stats()['stale_hits'], 3)
+
+        self.release.set()
+        deadline = time.time() + 1
+        while self.cache.stats()['refreshes'] < 2 and time.time() < deadline:
+            time.sleep(0.005)
+        self.assertEqual(len(self.fetched), 2)
+        self.assertEqual(self.cache.get('a@x', self.fetch), 2)
+
+    def test_failed_refresh_keeps_the_stale_entry(self):
+        self.cache.get('a@x', self.fetch)
+        time.sleep(0.06)
+
+        def failing():
+            raise ValueError('down')
+
+        self.assertEqual(self.cache.get('a@x', failing), 1)
+        deadline = time.time() + 1
+        while (not self.cache.stats()['refresh_errors'] and
+               time.time() < deadline):
+            time.sleep(0.005)
+        self.assertEqual(self.cache.stats()['refresh_errors'], 1)
+        self.assertEqual(self.cache.get('a@x', self.fetch), 1)
+
+    def test_expired_entry_is_fetched_again(self):
+        self.cache.get('a@x', self.fetch)
+        time.sleep(0.2)
+
+        self.assertEqual(self.cache.get('a@x', self.fetch), 2)
+        self.assertEqual(self.cache.stats()['misses'], 2)
+
+    def test_client_predictions_go_through_the_cache(self):
+        transport = FakeTransport()
+        client = SimpleRelevance('key', 'business', transport=transport,
+                                 prediction_cache=self.cache)
+        self.addCleanup(client.close)
+
+        client.predictions('a@x')
+        client.predictions('a@x')
+        self.assertEqual(len(transport.requests), 1)
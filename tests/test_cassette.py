@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import urllib2
+
+from simplerelevance.api import SimpleRelevance
+from simplerelevance.cassette import RecordingTransport, ReplayTransport
+from simplerelevance.transport import Response
+from tests.fakes import FakeTransport
+
+
+class CassetteTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'cassette')
+        self.answers = 0
+
+    def answer(self, method, url, body, timeout):
+        self.answers += 1
+        return Response(200, 'OK', {}, json.dumps({'n': self.answers}))
+
+    def client(self, transport):
+        return SimpleRelevance('key', 'business', transport=transport,
+                               compress_threshold=1)
+
+    def record(self):
+        client = self.client(RecordingTransport(
+            self.path, FakeTransport(self.answer)
+        ))
+        answers = [
+            client.users(user_email='j\xc3\xa9r\xc3\xb4me@x'),
+            client.item_add('caf\xc3\xa9', data_dict={'size': 2}),
+            client.users(user_email='j\xc3\xa9r\xc3\xb4me@x'),
+        ]
+        client.close()
+        return answers
+
+    def replay(self):
+        client = self.client(ReplayTransport(self.path))
+        self.addCleanup(client.close)
+        return client, [
+            client.users(user_email='j\xc3\xa9r\xc3\xb4me@x'),
+            client.item_add('caf\xc3\xa9', data_dict={'size': 2}),
+            client.users(user_email='j\xc3\xa9r\xc3\xb4me@x'),
+        ]
+
+    def test_replays_what_was_recorded(self):
+        recorded = self.record()
+        client, replayed = self.replay()
+
+        self.assertEqual(replayed, recorded)
+        self.assertEqual(self.answers, 3)
+
+    def test_replays_without_the_index(self):
+        recorded = self.record()
+        os.remove(self.path + '.idx')
+
+        self.assertEqual(self.replay()[1], recorded)
+
+    def test_last_response_repeats(self):
+        self.record()
+        client, _ = self.replay()
+
+        self.assertEqual(client.users(user_email='j\xc3\xa9r\xc3\xb4me@x'),
+                         {'n': 3})
+
+    def test_unrecorded_request_fails(self):
+        self.record()
+        client, _ = self.replay()
+
+        self.assertRaises(urllib2.URLError, client.users,
+                          user_email='someone@x')
@@ -0,0 +1,110 @@
+import threading
+import time
+import unittest
+
+from simplerelevance.catalog import AttributeCatalog
+
+
+def attribute(guid, name, value):
+    return {'guid': guid, 'attribute_name': name, 'attribute_value': value}
+
+
+class FakeAttributes(object):
+    """
+    Serves attributes by class, holding loads back while ``gate`` is
+    cleared.
+    """
+
+    def __init__(self, attributes):
+        self.attributes = attributes
+        self.loading = threading.Event()
+        self.gate = threading.Event()
+        self.gate.set()
+        self.calls = []
+
+    def __call__(self, class_id, attribute_name=None):
+        self.calls.append((class_id, attribute_name))
+        attributes = self.attributes.get(class_id, [])
+        if attribute_name is not None:
+            return [a for a in attributes
+                    if a['attribute_name'] == attribute_name]
+
+        self.loading.set()
+        self.gate.wait()
+        return list(attributes)
+
+
+class AttributeCatalogTest(unittest.TestCase):
+    def setUp(self):
+        self.fetch = FakeAttributes({
+            0: [attribute(1, 'plan', 'gold'), attribute(2, 'plan', 'free')],
+            1: [attribute(3, 'color', 'red')],
+        })
+        self.catalog = AttributeCatalog(refresh_interval=None)
+
+    def load(self):
+        self.catalog.start(self.fetch)
+        self.catalog.stop()
+
+    def test_resolves_loaded_attributes_locally(self):
+        self.load()
+        calls = len(self.fetch.calls)
+
+        self.assertEqual(self.catalog.guid(0, 'plan', 'free'), 2)
+        self.assertEqual(self.catalog.guid(1, 'color'), 3)
+        self.assertEqual(len(self.fetch.calls), calls)
+        self.assertEqual(self.catalog.stats()['hits'], 2)
+
+    def test_unknown_name_is_fetched_on_its_own(self):
+        self.load()
+        self.fetch.attributes[0].append(attribute(4, 'age', '30'))
+
+        self.assertEqual(self.catalog.guid(0, 'age'), 4)
+        self.assertEqual(self.fetch.calls[-1], (0, 'age'))
+        self.assertEqual(self.catalog.guid(0, 'age'), 4)
+        self.assertEqual(self.catalog.stats()['misses'], 1)
+
+    def test_local_writes(self):
+        self.load()
+        self.catalog.add(0, attribute(5, 'plan', 'team'))
+        self.catalog.remove(1)
+
+        self.assertEqual(self.catalog.guids(0, 'plan'),
+                         {'free': 2, 'team': 5})
+        self.assertIsNone(self.catalog.get(1))
+
+        self.catalog.remove_name('plan')
+        self.assertIsNone(self.catalog.get(2))
+        self.assertIsNone(self.catalog.get(5))
+
+    def test_writes_during_a_refresh_are_kept(self):
+        self.load()
+        self.fetch.gate.clear()
+        self.fetch.loading.clear()
+        refresh = threading.Thread(target=self.catalog.refresh)
+        refresh.start()
+        self.fetch.loading.wait(1)
+
+        # Made after the API answered the reload, before the swap.
+        self.catalog.add(0, attribute(5, 'plan', 'team'))
+        self.catalog.remove(2)
+        self.catalog.remove_name('color')
+        self.fetch.gate.set()
+        refresh.join()
+
+        self.assertEqual(self.catalog.stats()['refreshes'], 2)
+        self.assertEqual(self.catalog.get(5), attribute(5, 'plan', 'team'))
+        self.assertIsNone(self.catalog.get(2))
+        self.assertIsNone(self.catalog.get(3))
+        self.assertEqual(self.catalog.get(1), attribute(1, 'plan', 'gold'))
+
+    def test_stop_does_not_wait_on_a_hung_refresh(self):
+        self.fetch.gate.clear()
+        self.addCleanup(self.fetch.gate.set)
+        self.catalog.start(self.fetch)
+        self.fetch.loading.wait(1)
+
+        started = time.time()
+        self.catalog.stop(timeout=0.1)
+
+        self.assertLess(time.time() - started, 1)
@@ -0,0 +1,84 @@
+import json
+import sys
+import types
+import unittest
+
+from simplerelevance import decoder
+from simplerelevance.api import SimpleRelevance
+from simplerelevance.transport import Response
+from tests.fakes import FakeTransport
+
+
+class DecoderTest(unittest.TestCase):
+    def reload_with(self, **modules):
+        """
+        Reload the decoder as if only ``modules`` were installed among the
+        optional backends, a None value meaning not installed.
+        """
+        saved = dict((name, sys.modules.get(name)) for name in modules)
+
+        def restore():
+            for name, module in saved.items():
+                if module is None:
+                    sys.modules.pop(name, None)
+                else:
+                    sys.modules[name] = module
+            reload(decoder)
+
+        self.addCleanup(restore)
+        sys.modules.update(modules)
+        reload(decoder)
+
+    def test_falls_back_on_the_standard_library(self):
+        self.reload_with(ujson=None, simplejson=None)
+
+        self.assertIs(decoder.backend, json)
+        self.assertEqual(decoder.loads('{"results": [1]}'), {'results': [1]})
+
+    def test_prefers_ujson_then_simplejson(self):
+        ujson = types.ModuleType('ujson')
+        simplejson = types.ModuleType('simplejson')
+
+        self.reload_with(ujson=ujson, simplejson=simplejson)
+        self.assertIs(decoder.backend, ujson)
+
+        self.reload_with(ujson=None, simplejson=simplejson)
+        self.assertIs(decoder.backend, simplejson)
+
+    def test_empty_body_is_an_empty_dict(self):
+        self.reload_with(ujson=None, simplejson=None)
+
+        self.assertEqual(decoder.loads(''), {})
+        self.assertEqual(decoder.loads(None), {})
+
+
+class DecodeWritesTest(unittest.TestCase):
+    def client(self, **kwargs):
+        transport = FakeTransport(
+            lambda *args: Response(200, 'OK', {}, '{"results": []}')
+        )
+        client = SimpleRelevance('key', 'business', transport=transport,
+                                 **kwargs)
+        self.addCleanup(client.close)
+        return client
+
+    def test_async_writes_are_decoded_by_default(self):
+        client = self.client(async=1)
+
+        self.assertEqual(client.item_add('x'), {'results': []})
+
+    def test_async_writes_can_be_left_encoded(self):
+        client = self.client(async=1, decode_async_writes=False)
+
+        self.assertEqual(client.item_add('x'), '{"results": []}')
+        self.assertEqual(client.items(), {'results': []})
+
+    def test_sync_writes_are_always_decoded(self):
+        client = self.client(decode_async_writes=False)
+
+        self.assertEqual(client.item_add('x'), {'results': []})
+
+    def test_custom_loads(self):
+        client = self.client(loads=lambda body: ('decoded', body))
+
+        self.assertEqual(client.items(), ('decoded', '{"results": []}'))
@@ -0,0 +1,102 @@
+import threading
+import time
+import unittest
+
+from simplerelevance.api import SimpleRelevance
+from simplerelevance.dedup import WriteDeduplicator
+from tests.fakes import FakeTransport
+
+
+class WriteDeduplicatorTest(unittest.TestCase):
+    def setUp(self):
+        self.sent = []
+
+    def send(self, response=None, error=None, latency=0.0):
+        def send():
+            self.sent.append(1)
+            time.sleep(latency)
+            if error is not None:
+                raise error
+            return response
+        return send
+
+    def test_repeat_within_the_window_is_absorbed(self):
+        dedup = WriteDeduplicator(window=60)
+
+        self.assertEqual(dedup.do('write', self.send({'n': 1})), {'n': 1})
+        self.assertEqual(dedup.do('write', self.send({'n': 2})), {'n': 1})
+        self.assertEqual(len(self.sent), 1)
+        self.assertEqual(dedup.stats(), {'sent': 1, 'absorbed': 1})
+
+    def test_repeat_after_the_window_is_sent(self):
+        dedup = WriteDeduplicator(window=0.01)
+        dedup.do('write', self.send({'n': 1}))
+        time.sleep(0.02)
+
+        self.assertEqual(dedup.do('write', self.send({'n': 2})), {'n': 2})
+        self.assertEqual(len(self.sent), 2)
+
+    def test_in_flight_duplicates_are_absorbed(self):
+        dedup = WriteDeduplicator()
+        results = []
+
+        def write():
+            send = self.send({'n': 1}, latency=0.05)
+            results.append(dedup.do('write', send))
+
+        threads = [threading.Thread(target=write) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, [{'n': 1}] * 5)
+        self.assertEqual(len(self.sent), 1)
+        self.assertEqual(dedup.stats(), {'sent': 1, 'absorbed': 4})
+
+    def test_failures_are_not_remembered(self):
+        dedup = WriteDeduplicator(window=60)
+
+        self.assertRaises(ValueError, dedup.do, 'write',
+                          self.send(error=ValueError('down')))
+        self.assertEqual(dedup.do('write', self.send({'n': 2})), {'n': 2})
+        self.assertEqual(len(self.sent), 2)
+
+    def test_idempotency_key_absorbs_other_content(self):
+        dedup = WriteDeduplicator(window=0)
+        dedup.do('first', self.send({'n': 1}), 'key', 'users/')
+
+        self.assertEqual(dedup.do('second', self.send({'n': 2}), 'key',
+                                  'users/'), {'n': 1})
+        self.assertEqual(len(self.sent), 1)
+
+    def test_idempotency_key_is_scoped_to_its_endpoint(self):
+        dedup = WriteDeduplicator()
+        dedup.do('write', self.send({'n': 1}), 'key', 'users/')
+
+        self.assertEqual(dedup.do('write', self.send({'n': 2}), 'key',
+                                  'items/'), {'n': 2})
+        self.assertEqual(len(self.sent), 2)
+
+
+class ClientWriteDedupTest(unittest.TestCase):
+    def setUp(self):
+        self.transport = FakeTransport()
+        self.client = SimpleRelevance('key', 'business',
+                                      transport=self.transport,
+                                      write_dedup=WriteDeduplicator())
+        self.addCleanup(self.client.close)
+
+    def test_repeated_user_add_is_sent_once(self):
+        self.client.user_add('a@x')
+        self.client.user_add('a@x')
+
+        self.assertEqual(len(self.transport.requests), 1)
+
+    def test_same_key_on_users_and_items_is_sent_twice(self):
+        self.client.user_add('a@x', idempotency_key='k1')
+        self.client.item_add('x', idempotency_key='k1')
+
+        self.assertEqual([url.rsplit('/', 2)[-2]
+                          for _, url, _ in self.transport.requests],
+                         ['users', 'items'])
@@ -0,0 +1,110 @@
+import threading
+import time
+import unittest
+
+from simplerelevance.api import SimpleRelevance
+from simplerelevance.exceptions import DeadlineExceeded, RejectedError
+from simplerelevance.executor import BoundedExecutor
+from tests.fakes import FakeTransport
+
+
+class BoundedExecutorTest(unittest.TestCase):
+    def busy(self, reject='block'):
+        """
+        An executor whose only worker is held until the test ends, with a
+        call already waiting in its queue of one.
+        """
+        executor = BoundedExecutor(1, max_queue=1, reject=reject)
+        release = threading.Event()
+        running = threading.Event()
+        self.addCleanup(executor.shutdown, False, True)
+        self.addCleanup(release.set)
+
+        def hold():
+            running.set()
+            release.wait()
+
+        executor.submit(hold)
+        running.wait(1)
+        queued = executor.submit(threading.current_thread)
+
+        return executor, release, queued
+
+    def test_abort_rejects_when_the_queue_is_full(self):
+        executor, _, _ = self.busy('abort')
+
+        self.assertRaises(RejectedError, executor.submit, time.time)
+        self.assertEqual(executor.rejected, 1)
+        self.assertEqual(executor.pending(), 1)
+
+    def test_caller_runs_when_the_queue_is_full(self):
+        executor, _, _ = self.busy('caller_runs')
+
+        future = executor.submit(threading.current_thread)
+        self.assertTrue(future.done())
+        self.assertIs(future.result(), threading.current_thread())
+        self.assertEqual(executor.rejected, 1)
+
+    def test_queued_call_runs_on_a_worker(self):
+        executor, release, queued = self.busy()
+        release.set()
+
+        self.assertIsNot(queued.result(1), threading.current_thread())
+
+    def test_shutdown_cancels_queued_calls(self):
+        executor, release, queued = self.busy()
+        executor.shutdown(wait=False, cancel=True)
+        release.set()
+
+        self.assertTrue(queued.cancelled())
+        self.assertRaises(RuntimeError, executor.submit, time.time)
+
+    def test_shutdown_runs_queued_calls(self):
+        executor, release, queued = self.busy()
+        release.set()
+        executor.shutdown(wait=True)
+
+        self.assertTrue(queued.done())
+        self.assertFalse(queued.cancelled())
+
+    def test_submit_racing_shutdown_does_not_hang(self):
+        executor = BoundedExecutor(1)
+        executor.submit(time.time).result(1)
+        put = executor._queue.put
+
+        def put_after_shutdown(item, block=True):
+            # Shutdown gets in between the check and the put.
+            executor._queue.put = put
+            executor.shutdown(wait=True)
+            put(item, block)
+
+        executor._queue.put = put_after_shutdown
+        future = executor.submit(time.time)
+
+        self.assertTrue(future.cancelled())
+
+
+class SubmitTest(unittest.TestCase):
+    def setUp(self):
+        self.client = SimpleRelevance(
+            'key', 'business', transport=FakeTransport(),
+            executor=BoundedExecutor(1)
+        )
+        self.addCleanup(self.client.close)
+
+    def test_submit_returns_the_result(self):
+        self.assertEqual(self.client.submit('users').result(1), {})
+
+    def test_time_queued_counts_against_the_deadline(self):
+        self.client.submit(time.sleep, 0.1)
+        with self.client.deadline(0.05):
+            future = self.client.submit('users')
+
+        self.assertRaises(DeadlineExceeded, future.result, 1)
+
+    def test_deadline_does_not_stick_to_the_worker(self):
+        with self.client.deadline(0.05):
+            self.client.submit('users').result(1)
+        time.sleep(0.1)
+
+        self.assertEqual(self.client.submit('users').result(1), {})
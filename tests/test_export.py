@@ -0,0 +1,100 @@
+import datetime
+import os
+import shutil
+import tempfile
+import unittest
+
+from benchmarks.fake_server import FakeServer
+from simplerelevance.api import SimpleRelevance
+from simplerelevance.export import ActionExport, read_jsonl, shards
+
+
+def at(hour, minute=0, second=0):
+    return datetime.datetime(2026, 1, 1, hour, minute, second)
+
+
+class ShardsTest(unittest.TestCase):
+    def test_windows_do_not_overlap(self):
+        self.assertEqual(shards(at(0), at(2), datetime.timedelta(hours=1)), [
+            (at(0), at(0, 59, 59)),
+            (at(1), at(1, 59, 59)),
+        ])
+
+    def test_last_window_is_shorter(self):
+        self.assertEqual(
+            shards(at(0), at(1, 30), datetime.timedelta(hours=1))[-1],
+            (at(1), at(1, 29, 59))
+        )
+
+
+class ActionExportTest(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeServer().start()
+        self.addCleanup(self.server.stop)
+        self.server.api.actions = [
+            {'n': n, 'datetime': stamp} for n, stamp in enumerate([
+                '2026-01-01 00:30:00',
+                '2026-01-01 01:00:00',
+                '2026-01-01 01:59:59',
+                '2026-01-01 02:00:00',
+            ])
+        ]
+
+        self.client = SimpleRelevance('key', 'business')
+        self.client.api_url = self.server.url
+        self.addCleanup(self.client.close)
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'actions.jsonl')
+
+    def export(self):
+        return ActionExport(self.client, self.path, at(0), at(2),
+                            datetime.timedelta(hours=1))
+
+    def test_boundary_actions_are_exported_once(self):
+        result = self.export().run()
+
+        self.assertEqual(result.failures, 0)
+        self.assertEqual(sorted(r['n'] for r in read_jsonl(self.path)),
+                         [0, 1, 2])
+
+    def test_shard_that_cannot_be_appended_fails(self):
+        export = self.export()
+        fetch = export._fetch
+
+        def lose_spool(start, end):
+            spool, count = fetch(start, end)
+            if start == at(1):
+                os.remove(spool)
+            return spool, count
+
+        export._fetch = lose_spool
+        result = export.run()
+
+        self.assertEqual(result.failures, 1)
+        self.assertEqual(export.completed().keys(),
+                         [('2026-01-01 00:00:00', '2026-01-01 00:59:59')])
+
+        # Fetched again on the next run.
+        result = self.export().run()
+        self.assertEqual(result.succeeded, 1)
+        self.assertEqual(sorted(r['n'] for r in read_jsonl(self.path)),
+                         [0, 1, 2])
+
+    def test_failed_fetch_leaves_no_spool(self):
+        export = self.export()
+        iter_actions = self.client.iter_actions
+
+        def fail_midway(*args, **kwargs):
+            for record in iter_actions(*args, **kwargs):
+                yield record
+            raise IOError('connection reset')
+
+        self.client.iter_actions = fail_midway
+        result = export.run()
+
+        self.assertEqual(result.failures, 2)
+        directory = os.path.dirname(self.path)
+        self.assertEqual([name for name in os.listdir(directory)
+                          if name.endswith('.part')], [])
@@ -0,0 +1,123 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from simplerelevance.exceptions import CircuitOpenError
+from simplerelevance.importer import Importer
+from simplerelevance.retry import RetryPolicy
+
+
+class Crash(BaseException):
+    """
+    Stands for the process dying mid-import.
+    """
+
+
+class FakeClient(object):
+    def __init__(self, crash_on=None, fail_on=None, down_for=0):
+        self.crash_on = crash_on
+        self.fail_on = fail_on
+        self.down_for = down_for
+        self.added = []
+        self.kwargs = []
+
+    def user_add(self, email, **kwargs):
+        if email == self.crash_on:
+            raise Crash()
+        if email == self.fail_on:
+            raise ValueError('refused')
+        if self.down_for:
+            self.down_for -= 1
+            raise CircuitOpenError('circuit open')
+        self.added.append(email)
+        self.kwargs.append(kwargs)
+
+
+class ImporterTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def write(self, name, lines):
+        path = os.path.join(self.directory, name)
+        with open(path, 'ab') as stream:
+            stream.write(''.join(line + '\n' for line in lines))
+        return path
+
+    def run_import(self, client, path, **kwargs):
+        return Importer(client, 'users', path, max_workers=1,
+                        **kwargs).run()
+
+    def test_imports_every_record(self):
+        path = self.write('users.csv', ['email,zipcode', 'a@x,1', 'b@x,2'])
+        client = FakeClient()
+
+        result = self.run_import(client, path)
+        self.assertEqual(result.succeeded, 2)
+        self.assertEqual(client.added, ['a@x', 'b@x'])
+
+    def test_resumes_after_crash(self):
+        emails = ['%s@x' % name for name in 'abcde']
+        path = self.write('users.jsonl',
+                          [json.dumps({'email': e}) for e in emails])
+
+        self.run_import(FakeClient(crash_on='c@x'), path)
+        client = FakeClient()
+        self.run_import(client, path)
+
+        # Everything from the record in flight on, none before.
+        self.assertEqual(client.added, emails[2:])
+
+    def test_resumes_csv_with_its_header(self):
+        path = self.write('users.csv', ['email,zipcode', 'a@x,1'])
+        self.run_import(FakeClient(), path)
+        self.write('users.csv', ['b@x,2'])
+
+        client = FakeClient()
+        self.run_import(client, path)
+        self.assertEqual(client.added, ['b@x'])
+
+    def test_failed_records_are_written_out_and_not_retried(self):
+        path = self.write('users.csv', ['email', 'a@x', 'b@x', 'c@x'])
+
+        result = self.run_import(FakeClient(fail_on='b@x'), path)
+        self.assertEqual(result.failures, 1)
+        with open(path + '.errors') as errors:
+            failure = json.loads(errors.readline())
+        self.assertEqual(failure, {'email': 'b@x'})
+
+        client = FakeClient()
+        self.run_import(client, path)
+        self.assertEqual(client.added, [])
+
+    def test_restart_ignores_the_checkpoint(self):
+        path = self.write('users.csv', ['email', 'a@x'])
+        self.run_import(FakeClient(), path)
+
+        client = FakeClient()
+        Importer(client, 'users', path, max_workers=1).run(restart=True)
+        self.assertEqual(client.added, ['a@x'])
+
+    def test_transient_failures_are_retried(self):
+        path = self.write('users.csv', ['email', 'a@x', 'b@x'])
+        client = FakeClient(down_for=3)
+
+        result = self.run_import(client, path,
+                                 retry=RetryPolicy(5, backoff=0.001))
+        self.assertEqual(result.failures, 0)
+        self.assertEqual(client.added, ['a@x', 'b@x'])
+
+    def test_errors_file_can_be_imported(self):
+        path = self.write('users.csv', ['email,zipcode,plan',
+                                        'a@x,1,gold'])
+        self.run_import(FakeClient(down_for=1), path, retry=False)
+
+        client = FakeClient()
+        result = self.run_import(client, path + '.errors')
+        self.assertEqual(result.succeeded, 1)
+        self.assertEqual(client.added, ['a@x'])
+        self.assertEqual(client.kwargs, [
+            {'zipcode': '1', 'data_dict': {'plan': 'gold'}}
+        ])
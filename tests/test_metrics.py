@@ -0,0 +1,32 @@
+import unittest
+
+from simplerelevance.api import SimpleRelevance
+from tests.fakes import FakeTransport
+
+
+class ClientMetricsTest(unittest.TestCase):
+    def setUp(self):
+        self.client = SimpleRelevance('key', 'business',
+                                      transport=FakeTransport())
+        self.addCleanup(self.client.close)
+
+    def test_requests_are_counted_by_endpoint(self):
+        self.client.items()
+        self.client.users()
+
+        stats = self.client.stats()
+        self.assertEqual(stats['items/']['GET']['requests'], 1)
+        self.assertEqual(stats['users/']['GET']['requests'], 1)
+
+    def test_predictions_are_counted_apart_from_items(self):
+        self.client.items()
+        self.client.predictions('a@x')
+        self.client.predictions('b@x')
+
+        stats = self.client.stats()
+        self.assertEqual(stats['items/']['GET']['requests'], 1)
+        self.assertEqual(stats['predictions']['GET']['requests'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,226 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+import urllib2
+import urlparse
+
+from simplerelevance.api import SimpleRelevance
+from simplerelevance.exceptions import APIError
+from simplerelevance.outbox import Outbox
+from simplerelevance.recommend import CooccurrenceEngine
+from simplerelevance.transport import Response
+from tests.fakes import FakeTransport
+
+
+class OutboxTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.delivered = []
+
+    def deliver(self, method, endpoint, data):
+        if data.get('refused'):
+            raise APIError(400, 'Bad Request')
+        if data.get('down'):
+            raise urllib2.URLError('connection refused')
+        self.delivered.append(data['n'])
+
+    def outbox(self, **kwargs):
+        outbox = Outbox(self.directory, **kwargs)
+        self.addCleanup(outbox.close, 0)
+        return outbox
+
+    def test_delivers_in_order(self):
+        outbox = self.outbox()
+        outbox.start(self.deliver)
+        for n in range(5):
+            outbox.append('POST', 'actions/', {'n': n})
+
+        self.assertTrue(outbox.flush(5))
+        self.assertEqual(self.delivered, range(5))
+
+    def test_resumes_after_crash(self):
+        # Appended, then the process dies before anything is delivered.
+        outbox = Outbox(self.directory)
+        for n in range(3):
+            outbox.append('POST', 'actions/', {'n': n})
+        # A record cut short by the crash.
+        outbox._writer.write('{"method": "POST", "endpo')
+        outbox._writer.flush()
+
+        outbox = self.outbox()
+        outbox.start(self.deliver)
+        outbox.append('POST', 'actions/', {'n': 3})
+
+        self.assertTrue(outbox.flush(5))
+        self.assertEqual(self.delivered, range(4))
+
+    def test_does_not_resend_after_restart(self):
+        outbox = self.outbox()
+        outbox.start(self.deliver)
+        for n in range(3):
+            outbox.append('POST', 'actions/', {'n': n})
+        outbox.close(5)
+
+        outbox = self.outbox()
+        outbox.start(self.deliver)
+        outbox.append('POST', 'actions/', {'n': 3})
+
+        self.assertTrue(outbox.flush(5))
+        self.assertEqual(self.delivered, range(4))
+
+    def test_refused_request_is_buried_at_once(self):
+        outbox = self.outbox(retry_delay=10)
+        outbox.start(self.deliver)
+        outbox.append('POST', 'actions/', {'refused': True})
+        outbox.append('POST', 'actions/', {'n': 1})
+
+        self.assertTrue(outbox.flush(1))
+        self.assertEqual(self.delivered, [1])
+        self.assertEqual(outbox.stats()['dead'], 1)
+        with open(os.path.join(self.directory, 'dead.log')) as dead:
+            self.assertIn('refused', dead.read())
+
+    def test_failing_request_is_retried_then_buried(self):
+        outbox = self.outbox(retry_delay=0.01, max_attempts=3)
+        outbox.start(self.deliver)
+        outbox.append('POST', 'actions/', {'down': True})
+        outbox.append('POST', 'actions/', {'n': 1})
+
+        self.assertTrue(outbox.flush(5))
+        self.assertEqual(self.delivered, [1])
+        self.assertEqual(outbox.stats()['dead'], 1)
+
+    def test_close_is_bounded_while_the_api_is_down(self):
+        outbox = Outbox(self.directory, retry_delay=10)
+        outbox.start(self.deliver)
+        outbox.append('POST', 'actions/', {'down': True})
+
+        started = time.time()
+        outbox.close(0.1)
+        self.assertLess(time.time() - started, 1)
+
+        # Left for the next start.
+        outbox = self.outbox()
+        self.assertNotEqual(outbox.stats()['position'],
+                            outbox.stats()['written'])
+
+    def test_hung_delivery_does_not_touch_the_next_checkpoint(self):
+        hung = threading.Event()
+        self.addCleanup(hung.set)
+        old = Outbox(self.directory)
+        old.start(lambda method, endpoint, data: hung.wait())
+        old.append('POST', 'actions/', {'n': 0})
+        old.close(0.1)
+
+        outbox = self.outbox()
+        outbox.start(self.deliver)
+        outbox.append('POST', 'actions/', {'n': 1})
+        self.assertTrue(outbox.flush(5))
+
+        hung.set()
+        old._thread.join(1)
+        self.assertEqual(self.delivered, [0, 1])
+        self.assertEqual(self.outbox().stats()['position'],
+                         outbox.stats()['position'])
+
+    def test_flusher_survives_a_failed_read(self):
+        outbox = self.outbox(retry_delay=0.01)
+        read_batch = outbox._read_batch
+        failures = []
+
+        def failing_read():
+            if not failures:
+                failures.append(1)
+                raise IOError('segment is gone')
+            return read_batch()
+
+        outbox._read_batch = failing_read
+        outbox.start(self.deliver)
+        outbox.append('POST', 'actions/', {'n': 0})
+
+        self.assertTrue(outbox.flush(5))
+        self.assertEqual(self.delivered, [0])
+        self.assertEqual(failures, [1])
+
+    def test_unreadable_record_is_buried(self):
+        outbox = self.outbox()
+        outbox._writer.write('{"method": \n')
+        outbox.append('POST', 'actions/', {'n': 1})
+        outbox.start(self.deliver)
+
+        self.assertTrue(outbox.flush(5))
+        self.assertEqual(self.delivered, [1])
+        self.assertEqual(outbox.stats()['dead'], 1)
+
+    def test_close_is_bounded_while_a_delivery_hangs(self):
+        hung = threading.Event()
+        self.addCleanup(hung.set)
+        outbox = Outbox(self.directory)
+        outbox.start(lambda method, endpoint, data: hung.wait())
+        outbox.append('POST', 'actions/', {'n': 0})
+
+        started = time.time()
+        outbox.close(0.1)
+        self.assertLess(time.time() - started, 1)
+
+
+class ClientOutboxTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.down = True
+        self.unknown_item = False
+        self.transport = FakeTransport(self.answer)
+
+    def answer(self, method, url, body, timeout):
+        if self.down:
+            raise urllib2.URLError('connection refused')
+        if method == 'GET' and 'items/' in url and self.unknown_item:
+            results = []
+        elif method == 'GET' and 'items/' in url:
+            results = [{'purchases': {'1': {'item_guid': 7}}}]
+        elif method == 'GET':
+            results = [{'guid': 9, 'external_id': 'u1'}]
+        else:
+            results = []
+        return Response(200, 'OK', {}, json.dumps({'results': results}))
+
+    def test_action_is_kept_while_the_api_is_down(self):
+        engine = CooccurrenceEngine()
+        client = SimpleRelevance('key', 'business', transport=self.transport,
+                                 outbox=Outbox(self.directory),
+                                 circuit_breaker=False, recommender=engine)
+        client.retry.backoff = 0
+        self.addCleanup(client.close, 0)
+
+        self.assertEqual(client.action_add(42, user_email='a@x'),
+                         {'queued': True})
+        self.assertEqual(engine.stats()['actions'], 0)
+
+        self.down = False
+        self.assertTrue(client.outbox.flush(5))
+        method, url, body = self.transport.requests[-1]
+        self.assertEqual(method, 'POST')
+        self.assertEqual(dict(urlparse.parse_qsl(body))['item_guid'], '7')
+        self.assertEqual(engine.stats()['actions'], 1)
+
+    def test_action_for_an_unknown_item_is_buried_at_once(self):
+        self.down = False
+        self.unknown_item = True
+        client = SimpleRelevance('key', 'business', transport=self.transport,
+                                 outbox=Outbox(self.directory,
+                                               retry_delay=10),
+                                 circuit_breaker=False)
+        self.addCleanup(client.close, 0)
+
+        client.action_add(42, user_email='a@x')
+        self.assertTrue(client.outbox.flush(1))
+        self.assertEqual(client.outbox.stats()['dead'], 1)
+        lookups = [url for method, url, body in self.transport.requests
+                   if 'items/' in url]
+        self.assertEqual(len(lookups), 1)
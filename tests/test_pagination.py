@@ -0,0 +1,59 @@
+import unittest
+
+from simplerelevance import pagination
+
+
+class Pages(object):
+    """
+    Serves ``records`` ``size`` at a time and counts the pages asked for.
+    """
+
+    def __init__(self, records, size, paged=True):
+        self.records = records
+        self.size = size
+        self.paged = paged
+        self.fetched = []
+
+    def __call__(self, page):
+        self.fetched.append(page)
+        if not self.paged:
+            return {'results': self.records[:self.size]}
+        start = (page - 1) * self.size
+        return {'results': self.records[start:start + self.size]}
+
+
+class IterPagesTest(unittest.TestCase):
+    def pages(self, fetch, page_size):
+        return list(pagination.iter_pages(fetch, page_size, prefetch=False))
+
+    def test_reads_until_a_short_page(self):
+        fetch = Pages(range(25), 10)
+        self.assertEqual(self.pages(fetch, 10), range(25))
+        self.assertEqual(fetch.fetched, [1, 2, 3])
+
+    def test_reads_an_empty_page_after_a_full_one(self):
+        fetch = Pages(range(20), 10)
+        self.assertEqual(self.pages(fetch, 10), range(20))
+        self.assertEqual(fetch.fetched, [1, 2, 3])
+
+    def test_prefetch_yields_the_same_records(self):
+        fetch = Pages(range(25), 10)
+        records = list(pagination.iter_pages(fetch, 10))
+        self.assertEqual(records, range(25))
+
+    def test_stops_after_a_page_longer_than_asked(self):
+        fetch = Pages(range(30), 30)
+        self.assertEqual(self.pages(fetch, 10), range(30))
+        self.assertEqual(fetch.fetched, [1])
+
+    def test_stops_when_a_page_repeats(self):
+        fetch = Pages(range(30), 10, paged=False)
+        self.assertEqual(self.pages(fetch, 10), range(10))
+        self.assertEqual(fetch.fetched, [1, 2])
+
+    def test_missing_results_end_the_pages(self):
+        self.assertEqual(self.pages(lambda page: {}, 10), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from simplerelevance.ratelimit import (FileTokenBucket, RateLimiter,
+                                       TokenBucket)
+
+
+class TokenBucketTest(unittest.TestCase):
+    def test_burst_then_refill(self):
+        bucket = TokenBucket(20, burst=3)
+        for _ in range(3):
+            self.assertTrue(bucket.acquire(timeout=0))
+        self.assertFalse(bucket.acquire(timeout=0))
+
+        time.sleep(0.06)
+        self.assertTrue(bucket.acquire(timeout=0))
+        self.assertFalse(bucket.acquire(timeout=0))
+
+    def test_waits_for_a_token(self):
+        bucket = TokenBucket(20, burst=1)
+        bucket.acquire()
+
+        started = time.time()
+        self.assertTrue(bucket.acquire(timeout=1))
+        self.assertGreaterEqual(time.time() - started, 0.04)
+
+    def test_rate_below_one_per_second_holds_a_token(self):
+        bucket = TokenBucket(0.5)
+
+        self.assertEqual(bucket.burst, 1)
+        self.assertTrue(bucket.acquire(timeout=0))
+        self.assertFalse(bucket.acquire(timeout=0.1))
+
+    def test_more_tokens_than_the_burst_are_refused(self):
+        self.assertRaises(ValueError, TokenBucket(10, burst=2).acquire, 3)
+
+
+class FileTokenBucketTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'bucket')
+
+    def test_instances_share_the_budget(self):
+        first = FileTokenBucket(self.path, 0.01, burst=2)
+        second = FileTokenBucket(self.path, 0.01, burst=2)
+
+        self.assertTrue(first.acquire(timeout=0))
+        self.assertTrue(second.acquire(timeout=0))
+        self.assertFalse(first.acquire(timeout=0))
+        self.assertFalse(second.acquire(timeout=0))
+
+
+class RateLimiterTest(unittest.TestCase):
+    def test_reads_and_writes_have_their_own_budget(self):
+        limiter = RateLimiter(reads=TokenBucket(0.01, burst=1),
+                              writes=TokenBucket(0.01, burst=1))
+
+        self.assertTrue(limiter.acquire('GET', 0))
+        self.assertFalse(limiter.acquire('GET', 0))
+        self.assertTrue(limiter.acquire('POST', 0))
+        self.assertFalse(limiter.acquire('DELETE', 0))
+
+    def test_unlimited_without_a_bucket(self):
+        limiter = RateLimiter(writes=TokenBucket(0.01, burst=1))
+
+        for _ in range(5):
+            self.assertTrue(limiter.acquire('GET', 0))
@@ -0,0 +1,99 @@
+import json
+import time
+import unittest
+import urllib2
+
+from simplerelevance.api import SimpleRelevance
+from simplerelevance.constants.actiontype import ActionType
+from simplerelevance.recommend import CooccurrenceEngine
+from simplerelevance.transport import Response
+from tests.fakes import FakeTransport
+
+SEED = [
+    {'user_guid': 'u1', 'item_guid': 'i1', 'action_type': 1},
+    {'user_guid': 'u1', 'item_guid': 'i2', 'action_type': 1},
+    {'user_guid': 'u2', 'item_guid': 'i1', 'action_type': 1},
+]
+
+
+class CooccurrenceEngineTest(unittest.TestCase):
+    def test_predicts_items_acted_on_together(self):
+        engine = CooccurrenceEngine()
+        engine.add_actions(SEED)
+
+        self.assertEqual([item for item, _ in engine.predict('u2')], ['i2'])
+        self.assertEqual(engine.predict('nobody'), [])
+
+    def test_stronger_actions_weigh_more(self):
+        engine = CooccurrenceEngine()
+        engine.add('a', 'i1')
+        engine.add('a', 'i2')
+        engine.add('b', 'i1', ActionType.PURCHASES)
+        engine.add('b', 'i3', ActionType.PURCHASES)
+        engine.add('c', 'i1')
+
+        self.assertEqual([item for item, _ in engine.predict('c')],
+                         ['i3', 'i2'])
+
+    def test_alias_merges_history(self):
+        engine = CooccurrenceEngine()
+        engine.add_actions(SEED)
+        engine.alias('u2', 'someone')
+        engine.add('someone', 'i3')
+
+        self.assertTrue(engine.knows('u2'))
+        self.assertEqual(engine.stats()['users'], 2)
+        self.assertIn('i2', [item for item, _ in engine.predict('someone')])
+
+    def test_least_recent_users_are_forgotten(self):
+        engine = CooccurrenceEngine(max_users=2)
+        for n in range(5):
+            engine.alias('email%d' % n, 'user%d' % n)
+            engine.add('user%d' % n, 'i1')
+        engine.add('user3', 'i2')
+
+        self.assertEqual(engine.stats()['users'], 2)
+        self.assertEqual(engine.stats()['aliases'], 2)
+        self.assertTrue(engine.knows('email3'))
+        self.assertFalse(engine.knows('user0'))
+
+
+class PredictionFallbackTest(unittest.TestCase):
+    def answer(self, method, url, body, timeout):
+        if 'email=' in url:
+            time.sleep(timeout or 0)
+            raise urllib2.URLError('timed out')
+        if 'items/' in url:
+            guid = url.rsplit('=', 1)[-1]
+            results = [{'purchases': {'1': {'item_guid': guid}}}]
+        else:
+            results = [{'guid': 'g', 'external_id': 'x'}]
+        return Response(200, 'OK', {}, json.dumps({'results': results}))
+
+    def setUp(self):
+        self.engine = CooccurrenceEngine()
+        self.client = SimpleRelevance(
+            'key', 'business', transport=FakeTransport(self.answer),
+            recommender=self.engine, prediction_budget=0.02
+        )
+        self.addCleanup(self.client.close)
+
+    def test_seeded_user_is_answered_locally(self):
+        self.engine.add_actions(SEED)
+        self.client.guid_cache.users.set(('user_email', 'u2@x'), 'u2')
+
+        predictions = self.client.predictions('u2@x')
+        self.assertEqual(predictions['source'], 'local')
+        self.assertEqual(predictions['results'][0]['item_guid'], 'i2')
+
+    def test_user_known_by_external_id_is_answered_locally(self):
+        self.client.action_add('i1', user_id='a')
+        self.client.action_add('i2', user_id='a')
+        self.client.user_add('b@x', user_id='b')
+        self.client.action_add('i1', user_id='b')
+
+        predictions = self.client.predictions('b@x')
+        self.assertEqual(predictions['results'][0]['item_guid'], 'i2')
+
+    def test_unknown_user_raises(self):
+        self.assertRaises(urllib2.URLError, self.client.predictions, 'c@x')
@@ -0,0 +1,220 @@
+import threading
+import time
+import unittest
+import urllib2
+
+from simplerelevance.api import SimpleRelevance
+from simplerelevance.exceptions import CircuitOpenError, DeadlineExceeded
+from simplerelevance.ratelimit import RateLimiter, TokenBucket
+from simplerelevance.retry import CircuitBreaker, HedgePolicy, RetryPolicy
+from simplerelevance.transport import Response
+from tests.fakes import FakeTransport
+
+
+def timing_out(method, url, body, timeout):
+    time.sleep(timeout or 0)
+    raise urllib2.URLError('timed out')
+
+
+class CircuitBreakerTest(unittest.TestCase):
+    def setUp(self):
+        self.breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+
+    def open(self):
+        self.breaker.failure()
+        self.breaker.failure()
+
+    def test_opens_after_threshold(self):
+        self.breaker.failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        self.breaker.allow()
+
+        self.breaker.failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.assertRaises(CircuitOpenError, self.breaker.allow)
+
+    def test_success_resets_failures(self):
+        self.breaker.failure()
+        self.breaker.success()
+        self.breaker.failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_half_open_lets_one_trial_through(self):
+        self.open()
+        time.sleep(0.06)
+
+        self.breaker.allow()
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertRaises(CircuitOpenError, self.breaker.allow)
+
+    def test_trial_outcome(self):
+        self.open()
+        time.sleep(0.06)
+        self.breaker.allow()
+        self.breaker.failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.assertRaises(CircuitOpenError, self.breaker.allow)
+
+        time.sleep(0.06)
+        self.breaker.allow()
+        self.breaker.success()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_release_gives_the_trial_back(self):
+        self.open()
+        time.sleep(0.06)
+        self.breaker.allow()
+
+        self.breaker.release()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.breaker.allow()
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+
+
+class ClientBreakerTest(unittest.TestCase):
+    def client(self, transport, **kwargs):
+        client = SimpleRelevance('key', 'business', transport=transport,
+                                 **kwargs)
+        self.addCleanup(client.close)
+        return client
+
+    def test_errors_open_the_breaker(self):
+        breaker = CircuitBreaker(2, 30)
+        client = self.client(
+            FakeTransport(lambda *args: Response(503, 'Down', {}, '')),
+            circuit_breaker=breaker
+        )
+        client.retry.backoff = 0
+
+        self.assertRaises(urllib2.URLError, client.users)
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertRaises(CircuitOpenError, client.users)
+
+    def test_refused_request_keeps_breaker_closed(self):
+        breaker = CircuitBreaker(1, 30)
+        client = self.client(
+            FakeTransport(lambda *args: Response(400, 'Bad', {}, '')),
+            circuit_breaker=breaker
+        )
+
+        self.assertRaises(urllib2.URLError, client.users)
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_too_many_requests_is_retried(self):
+        answers = [Response(429, 'Too Many Requests', {}, ''),
+                   Response(200, 'OK', {}, '{"results": []}')]
+        transport = FakeTransport(lambda *args: answers.pop(0))
+        breaker = CircuitBreaker(1, 30)
+        client = self.client(transport, circuit_breaker=breaker)
+        client.retry.backoff = 0
+
+        self.assertEqual(client.users(), {'results': []})
+        self.assertEqual(len(transport.requests), 2)
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_too_many_requests_does_not_count_as_success(self):
+        breaker = CircuitBreaker(2, 30)
+        client = self.client(
+            FakeTransport(lambda *args: Response(429, 'Slow down', {}, '')),
+            circuit_breaker=breaker, retry=RetryPolicy(max_attempts=1)
+        )
+        breaker.failure()
+
+        self.assertRaises(urllib2.URLError, client.users)
+        self.assertEqual(breaker.failures, 1)
+
+    def test_rate_limited_call_does_not_hold_the_trial(self):
+        breaker = CircuitBreaker(1, 0.05)
+        transport = FakeTransport()
+        client = self.client(
+            transport, circuit_breaker=breaker, timeout=0.05,
+            rate_limiter=RateLimiter(reads=TokenBucket(5, burst=1))
+        )
+        client.users()
+        breaker.failure()
+        time.sleep(0.06)
+
+        self.assertRaises(DeadlineExceeded, client.users)
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+        time.sleep(0.2)
+        client.users()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        self.assertEqual(len(transport.requests), 2)
+
+    def test_caller_deadline_is_not_an_api_failure(self):
+        breaker = CircuitBreaker(2, 30)
+        client = self.client(FakeTransport(timing_out),
+                             circuit_breaker=breaker)
+
+        for _ in range(4):
+            with client.deadline(0.01):
+                self.assertRaises(urllib2.URLError, client.users)
+
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_client_timeout_is_an_api_failure(self):
+        breaker = CircuitBreaker(2, 30)
+        client = self.client(FakeTransport(timing_out),
+                             circuit_breaker=breaker, timeout=0.01)
+
+        for _ in range(2):
+            self.assertRaises(urllib2.URLError, client.users)
+
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+
+class HedgingTest(unittest.TestCase):
+    def client(self, transport, **kwargs):
+        client = SimpleRelevance(
+            'key', 'business', transport=transport, single_flight=False,
+            hedging=HedgePolicy(budget=1.0, min_delay=0.02, max_delay=0.02,
+                                **kwargs)
+        )
+        self.addCleanup(client.close)
+        for _ in range(5):
+            client.users()
+        del transport.requests[:]
+        return client
+
+    def test_slow_request_is_hedged(self):
+        calls = []
+
+        def answer(method, url, body, timeout):
+            calls.append(url)
+            if len(calls) == 6:
+                time.sleep(0.5)
+            return Response(200, 'OK', {}, '{}')
+
+        transport = FakeTransport(answer)
+        client = self.client(transport)
+
+        started = time.time()
+        client.users()
+        self.assertLess(time.time() - started, 0.3)
+        self.assertEqual(len(transport.requests), 2)
+        self.assertEqual(client.hedging.stats()['won'], 1)
+
+    def test_fast_request_is_not_hedged(self):
+        transport = FakeTransport()
+        client = self.client(transport)
+
+        for _ in range(10):
+            client.users()
+        time.sleep(0.05)
+
+        self.assertEqual(len(transport.requests), 10)
+        self.assertEqual(client.hedging.stats()['hedged'], 0)
+
+    def test_busy_workers_do_not_queue_requests(self):
+        transport = FakeTransport(latency=0.1)
+        client = self.client(transport, max_workers=1)
+
+        threads = [threading.Thread(target=client.users) for _ in range(3)]
+        started = time.time()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertLess(time.time() - started, 0.18)
@@ -0,0 +1,127 @@
+import threading
+import time
+import unittest
+import urllib2
+
+from simplerelevance.api import SimpleRelevance
+from simplerelevance.exceptions import DeadlineExceeded
+from simplerelevance.singleflight import SingleFlight
+from simplerelevance.transport import Response
+from tests.fakes import FakeTransport
+
+
+class SingleFlightTest(unittest.TestCase):
+    def setUp(self):
+        self.flights = SingleFlight()
+        self.runs = []
+
+    def slow(self, result=None, error=None):
+        def call():
+            self.runs.append(1)
+            time.sleep(0.05)
+            if error is not None:
+                raise error
+            return result
+        return call
+
+    def in_threads(self, fn, count=5):
+        results = []
+
+        def run():
+            try:
+                results.append(fn())
+            except Exception as e:
+                results.append(e)
+
+        threads = [threading.Thread(target=run) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_concurrent_calls_share_one_run(self):
+        results = self.in_threads(
+            lambda: self.flights.do('key', self.slow(42))
+        )
+
+        self.assertEqual(results, [42] * 5)
+        self.assertEqual(len(self.runs), 1)
+        self.assertEqual(self.flights.stats(),
+                         {'calls': 5, 'coalesced': 4, 'in_flight': 0})
+
+    def test_concurrent_calls_share_the_exception(self):
+        error = ValueError('boom')
+        results = self.in_threads(
+            lambda: self.flights.do('key', self.slow(error=error))
+        )
+
+        self.assertEqual(results, [error] * 5)
+        self.assertEqual(len(self.runs), 1)
+
+    def test_calls_after_completion_run_again(self):
+        self.flights.do('key', self.slow(1))
+        self.flights.do('key', self.slow(2))
+
+        self.assertEqual(len(self.runs), 2)
+
+    def test_different_keys_do_not_wait(self):
+        results = self.in_threads(
+            lambda: self.flights.do(threading.current_thread().name,
+                                    self.slow(1))
+        )
+
+        self.assertEqual(results, [1] * 5)
+        self.assertEqual(len(self.runs), 5)
+
+    def test_follower_gives_up_at_its_timeout(self):
+        leader = threading.Thread(
+            target=self.flights.do, args=('key', self.slow(1))
+        )
+        leader.start()
+        time.sleep(0.01)
+
+        self.assertRaises(DeadlineExceeded, self.flights.do, 'key',
+                          self.slow(2), 0.01)
+        leader.join()
+
+    def test_follower_with_time_left_runs_after_leader_expires(self):
+        leader = threading.Thread(
+            target=self.in_threads,
+            args=(lambda: self.flights.do(
+                'key', self.slow(error=DeadlineExceeded('timed out')), 0.01
+            ), 1)
+        )
+        leader.start()
+        time.sleep(0.01)
+
+        self.assertEqual(self.flights.do('key', self.slow(2)), 2)
+        leader.join()
+        self.assertEqual(len(self.runs), 2)
+        self.assertEqual(self.flights.stats()['calls'], 2)
+
+    def test_client_follower_is_not_failed_by_leader_deadline(self):
+        def answer(method, url, body, timeout):
+            if timeout is not None and timeout < 0.1:
+                time.sleep(timeout)
+                raise urllib2.URLError('timed out')
+            time.sleep(0.1)
+            return Response(200, 'OK', {}, '{"results": [1]}')
+
+        client = SimpleRelevance('key', 'business',
+                                 transport=FakeTransport(answer),
+                                 circuit_breaker=False)
+        self.addCleanup(client.close)
+
+        def lead():
+            with client.deadline(0.05):
+                self.assertRaises(urllib2.URLError, client.items,
+                                  item_external_id=7)
+
+        leader = threading.Thread(target=lead)
+        leader.start()
+        time.sleep(0.01)
+
+        self.assertEqual(client.items(item_external_id=7),
+                         {'results': [1]})
+        leader.join()
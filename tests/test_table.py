@@ -0,0 +1,72 @@
+import unittest
+
+from simplerelevance import table
+from simplerelevance.table import ColumnTable
+
+RECORDS = [
+    {'user_guid': 'u1', 'item_guid': 'i1', 'action_type': 1},
+    {'user_guid': 'u2', 'item_guid': 'i1', 'action_type': 3},
+    {'user_guid': 'u1', 'item_guid': 'i2', 'action_type': 1},
+]
+
+
+class ColumnTableTest(unittest.TestCase):
+    def test_records_round_trip(self):
+        records = ColumnTable.from_records(RECORDS)
+
+        self.assertEqual(len(records), 3)
+        self.assertEqual(list(records), RECORDS)
+        self.assertEqual(records[-1], RECORDS[-1])
+        self.assertRaises(IndexError, records.__getitem__, 3)
+
+    def test_columns_are_typed(self):
+        records = ColumnTable.from_records(RECORDS)
+
+        self.assertIsInstance(records._columns['action_type'],
+                              table._NumberColumn)
+        self.assertIsInstance(records._columns['item_guid'],
+                              table._StringColumn)
+        self.assertEqual(records.strings('item_guid'), ['i1', 'i2'])
+
+    def test_number_column_falls_back_to_objects(self):
+        records = ColumnTable.from_records([
+            {'n': 1}, {'n': 2 ** 70}, {'n': 'three'}, {'n': 1.5},
+        ])
+
+        self.assertIsInstance(records._columns['n'], table._ObjectColumn)
+        self.assertEqual(records.column('n'), [1, 2 ** 70, 'three', 1.5])
+
+    def test_missing_number_falls_back_to_objects(self):
+        records = ColumnTable.from_records([{'n': 1}, {}])
+
+        self.assertEqual(records.column('n'), [1, None])
+
+    def test_field_first_seen_late_is_back_filled(self):
+        records = ColumnTable.from_records([
+            {'guid': 'a'}, {'guid': 'b'}, {'guid': 'c', 'email': 'c@x'},
+        ])
+
+        self.assertEqual(records.column('email'), [None, None, 'c@x'])
+        self.assertEqual(records[0], {'guid': 'a', 'email': None})
+        self.assertEqual(records.columns, ['email', 'guid'])
+
+    def test_fields_limit_the_columns(self):
+        records = ColumnTable.from_records(RECORDS, fields=('item_guid',))
+
+        self.assertEqual(records.columns, ['item_guid'])
+        self.assertEqual(records[1], {'item_guid': 'i1'})
+
+    def test_frozen_table_takes_no_more_records(self):
+        records = ColumnTable.from_records(RECORDS)
+        records.frozen = True
+
+        self.assertRaises(RuntimeError, records.append, RECORDS[0])
+        self.assertEqual(len(records), 3)
+
+    @unittest.skipIf(table.numpy is None, 'NumPy is not installed')
+    def test_to_numpy_freezes_number_columns(self):
+        records = ColumnTable.from_records(RECORDS)
+
+        self.assertEqual(list(records.to_numpy('action_type')), [1, 3, 1])
+        self.assertTrue(records.frozen)
+        self.assertRaises(RuntimeError, records.append, RECORDS[0])
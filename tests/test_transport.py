@@ -0,0 +1,164 @@
+import httplib
+import time
+import unittest
+import urllib2
+import urlparse
+import zlib
+
+from benchmarks.fake_server import FakeServer
+from simplerelevance.api import SimpleRelevance
+from simplerelevance.transport import GZIP_WBITS, PooledTransport
+from tests.fakes import FakeTransport
+
+
+class PooledTransportTest(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeServer(keep_alive=0.1).start()
+        self.addCleanup(self.server.stop)
+
+    def client(self, transport):
+        client = SimpleRelevance('key', 'business', transport=transport)
+        client.api_url = self.server.url
+        self.addCleanup(client.close)
+        return client
+
+    def test_write_after_server_closed_idle_connection(self):
+        client = self.client(PooledTransport(idle_timeout=60))
+        client.users()
+        time.sleep(0.3)
+
+        self.assertEqual(client.item_add('x')['results'][0]['name'], 'x')
+        self.assertEqual(client.circuit_breaker.failures, 0)
+
+    def test_connection_is_reused(self):
+        transport = PooledTransport()
+        client = self.client(transport)
+        client.users()
+        connection = transport._idle.values()[0][0][0]
+        client.item_add('x')
+
+        self.assertIs(transport._idle.values()[0][0][0], connection)
+
+    def test_idle_connection_is_evicted(self):
+        transport = PooledTransport(idle_timeout=0.05)
+        client = self.client(transport)
+        client.users()
+        time.sleep(0.1)
+        client.users()
+
+        self.assertEqual(transport._idle_count, 1)
+
+    def test_connections_in_use_are_closed_after_close(self):
+        transport = PooledTransport()
+        key = ('http', self.server.url.split('/')[2])
+        connection, _ = transport._acquire(key)
+        transport.close()
+        transport._release(key, connection, True)
+
+        self.assertEqual(transport._idle_count, 0)
+
+    def test_no_request_is_sent_after_close(self):
+        transport = PooledTransport()
+        client = self.client(transport)
+        transport.close()
+
+        self.assertRaises(urllib2.URLError, client.users)
+        self.assertEqual(transport._in_use, {})
+
+    def test_default_client_does_not_cap_connections(self):
+        client = SimpleRelevance('key', 'business')
+        self.addCleanup(client.close)
+
+        self.assertIsNone(client.transport.per_host)
+
+    def test_waiting_for_a_connection_is_bounded_by_the_timeout(self):
+        transport = PooledTransport(per_host=1)
+        key = ('http', self.server.url.split('/')[2])
+        connection, _ = transport._acquire(key)
+        self.addCleanup(transport._release, key, connection, False)
+
+        started = time.time()
+        self.assertRaises(urllib2.URLError, transport.request, 'GET',
+                          self.server.url + 'users/', timeout=0.05)
+        self.assertLess(time.time() - started, 1)
+
+    def test_slot_is_released_after_an_unexpected_error(self):
+        transport = PooledTransport(per_host=1)
+        client = self.client(transport)
+
+        self.assertRaises(UnicodeError, transport.request, 'POST',
+                          self.server.url + 'users/', u'name=\xe9', {}, 1)
+        self.assertEqual(transport._in_use.values(), [0])
+        client.users()
+
+
+class CompressionTest(unittest.TestCase):
+    def setUp(self):
+        self.transport = FakeTransport()
+        self.client = SimpleRelevance('key', 'business',
+                                      transport=self.transport,
+                                      compress_threshold=200)
+        self.addCleanup(self.client.close)
+
+    def sent(self):
+        (method, url, body), = self.transport.requests
+        headers, = self.transport.headers
+        return body, headers
+
+    def test_large_body_is_gzipped(self):
+        self.client.item_add('x' * 500)
+        body, headers = self.sent()
+
+        self.assertEqual(headers.get('Content-Encoding'), 'gzip')
+        data = dict(urlparse.parse_qsl(zlib.decompress(body, GZIP_WBITS)))
+        self.assertEqual(data['item_name'], 'x' * 500)
+
+    def test_small_body_is_sent_as_is(self):
+        self.client.item_add('x')
+        body, headers = self.sent()
+
+        self.assertNotIn('Content-Encoding', headers)
+        self.assertEqual(dict(urlparse.parse_qsl(body))['item_name'], 'x')
+
+    def test_delete_is_never_gzipped(self):
+        self.client.item_delete('x' * 500)
+        body, headers = self.sent()
+
+        self.assertNotIn('Content-Encoding', headers)
+        self.assertEqual(dict(urlparse.parse_qsl(body))['item_guid'],
+                         'x' * 500)
+
+
+class CompressedResponseTest(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeServer().start()
+        self.addCleanup(self.server.stop)
+        for n in range(100):
+            self.server.api.user({'email': 'user%d@x' % n})
+
+    def users(self, compress):
+        transport = PooledTransport(compress=compress)
+        self.addCleanup(transport.close)
+        return transport.request('GET', self.server.url + 'users/')
+
+    def test_gzip_response_is_decoded(self):
+        plain = self.users(False)
+        compressed = self.users(True)
+
+        self.assertNotIn('content-encoding', plain.headers)
+        self.assertNotIn('content-encoding', compressed.headers)
+        self.assertGreater(len(plain.body), 1024)
+        self.assertEqual(compressed.body, plain.body)
+
+    def test_server_compressed_the_response(self):
+        # Without this the test above would pass on plain responses too.
+        host, port = urlparse.urlparse(self.server.url)[1].split(':')
+        connection = httplib.HTTPConnection(host, int(port))
+        self.addCleanup(connection.close)
+        connection.request('GET', '/users/',
+                           headers={'Accept-Encoding': 'gzip'})
+        response = connection.getresponse()
+
+        self.assertEqual(response.getheader('content-encoding'), 'gzip')
+        self.assertEqual(zlib.decompress(response.read(), GZIP_WBITS),
+                         self.users(False).body)